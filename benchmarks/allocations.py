@@ -0,0 +1,119 @@
+'''
+    Allocation benchmark for the runtime value layer
+
+    Runs a numeric / object heavy script on the tree walking interpreter under
+    tracemalloc and reports :
+
+        - RuntimeVal objects constructed while evaluating
+        - bytes and blocks still held by the values once the program is done
+        - peak traced memory while evaluating
+
+    Only uses Parser / Interpreter / create_global_env, so it can be run 
+    against older checkouts to compare before / after.
+
+    usage (from the repo root) :
+
+        python benchmarks/allocations.py [--calls N]
+'''
+
+import os
+import sys
+import gc
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.parser import Parser
+from runtime.interpreter import Interpreter
+from runtime.environment import create_global_env
+from runtime.values.base import RuntimeVal
+from generator import name
+
+def make_source(calls : int) -> str :
+
+    # small integers, repeated literals and flags : the values that
+    # singletons and the small number cache are meant to absorb
+    lines = [
+        'fn point(x, y) { let flag = true; let none = null; { x, y, flag, none, sum : x + y, half : x / 2, twice : y * 2 } }',
+        'fn step(n) { (n * 2 + 1) % 7 - 3 }',
+    ]
+
+    for i in range(calls) :
+        lines.append(f'let {name("v", i)} = point({i % 50}, step({i % 10}));')
+
+    return '\n'.join(lines)
+
+def count_constructions(fn) -> int :
+
+    # counts every RuntimeVal constructed while fn runs by wrapping __init__
+    # of every RuntimeVal subclass
+    count = [0]
+    patched = []
+
+    def subclasses(cls) :
+        for sub in cls.__subclasses__() :
+            yield sub
+            yield from subclasses(sub)
+
+    for cls in [RuntimeVal] + list(subclasses(RuntimeVal)) :
+        if('__init__' not in cls.__dict__) :
+            continue
+
+        original = cls.__dict__['__init__']
+
+        def counting_init(self, *args, __original=original, __cls=cls, **kwargs) :
+            if(type(self) is __cls) :
+                count[0] += 1
+            __original(self, *args, **kwargs)
+
+        cls.__init__ = counting_init
+        patched.append((cls, original))
+
+    try :
+        fn()
+    finally :
+        for (cls, original) in patched :
+            cls.__init__ = original
+
+    return count[0]
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--calls', type=int, default=20000)
+    args = ap.parse_args()
+
+    src = make_source(args.calls)
+
+    program = Parser().generate_ast(src)
+    constructed = count_constructions(
+        lambda : Interpreter(create_global_env()).evaluate(program)
+    )
+
+    # fresh run for the memory numbers, the env is kept alive so that 
+    # everything the program built is still reachable
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    env = create_global_env()
+    Interpreter(env).evaluate(program)
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    retained = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+
+    print(f'calls               : {args.calls}')
+    print(f'RuntimeVals created : {constructed}')
+    print(f'retained            : {retained / 1024:10.1f} KB in {blocks} blocks')
+    print(f'peak traced         : {peak / 1024:10.1f} KB')
+
+if __name__ == '__main__' :
+    main()
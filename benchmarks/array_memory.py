@@ -0,0 +1,125 @@
+'''
+    Array memory benchmark
+
+    Measures, with tracemalloc, the memory held by an array of --size numbers :
+
+        - as an ArrayVal (runtime/values/array.py) : unboxed doubles in an
+          array('d')
+        - as a list of NumberVals, which is what every element would cost
+          if arrays held RuntimeVals like objects do
+
+    then the memory and time taken by --slices slices of half of it, which
+    share the doubles of the array instead of copying them, against slicing
+    the list. Last, the time each engine takes to read every element of a
+    slice of an array handed in by the host.
+
+    usage (from the repo root) :
+
+        python benchmarks/array_memory.py [--size N] [--slices N] [--reads N]
+'''
+
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runtime.values.derived import NumberVal
+from runtime.values.array import ArrayVal
+from runtime.values.convert import to_runtime
+from runtime.environment import create_global_env
+from frontend.parser import Parser
+from nanoscript import ENGINES
+from generator import name
+
+def retained(build) -> tuple :
+
+    # bytes still held once build() returns, and what it returned
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before, result)
+
+def timed(fn) -> float :
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def reader(count : int) -> str :
+
+    # reads every element of a[0:count] once, without loops : a chain of
+    # functions, each reading a few elements and calling the next one
+    step = 50
+    lines = []
+    for (n, start) in enumerate(range(0, count, step)) :
+        reads = ' + '.join(f'a[{i}]' for i in range(start, min(start + step, count)))
+        lines.append(f'fn {name("r", n)}(a) {{ {reads} }}')
+    calls = ' + '.join(f'{name("r", n)}(s)' for n in range(len(lines)))
+    return '\n'.join(lines) + f'\nlet s = data[0:{count}];\n{calls}'
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--size', type=int, default=1000000, help='elements of the array')
+    ap.add_argument('--slices', type=int, default=100, help='slices taken of it')
+    ap.add_argument('--reads', type=int, default=5000, help='elements read by the scripts')
+    args = ap.parse_args()
+
+    numbers = [float(i % 997) for i in range(args.size)]
+
+    (array_bytes, array) = retained(lambda : ArrayVal.of_numbers(numbers))
+    (boxed_bytes, boxed) = retained(lambda : [NumberVal(value) for value in numbers])
+
+    print(f'elements             : {args.size}')
+    print(f'ArrayVal (doubles)   : {array_bytes / 2**20:8.2f} MB ({array_bytes / args.size:5.1f} bytes / element)')
+    print(f'list of NumberVals   : {boxed_bytes / 2**20:8.2f} MB ({boxed_bytes / args.size:5.1f} bytes / element, {boxed_bytes / array_bytes:.1f}x more)')
+
+    half = args.size // 2
+    (view_bytes, views) = retained(lambda : [array.slice(i, i + half) for i in range(args.slices)])
+    (copy_bytes, copies) = retained(lambda : [boxed[i : i + half] for i in range(args.slices)])
+    view_time = timed(lambda : [array.slice(i, i + half) for i in range(args.slices)])
+    copy_time = timed(lambda : [boxed[i : i + half] for i in range(args.slices)])
+
+    print(f'\n{args.slices} slices of {half} elements')
+    print(f'ArrayVal (views)     : {view_bytes / 2**20:8.2f} MB {view_time * 1000:9.2f} ms')
+    print(f'list (copies)        : {copy_bytes / 2**20:8.2f} MB {copy_time * 1000:9.2f} ms')
+
+    del views, copies, boxed
+
+    # every engine reads the same elements of the same host array
+    source = reader(min(args.reads, args.size))
+    data = to_runtime(numbers)
+
+    print(f'\nreading {min(args.reads, args.size)} elements of a slice')
+    expected = None
+    for (engine_name, engine) in ENGINES.items() :
+        program = Parser().generate_ast(source)
+        interpreter = engine(create_global_env())
+
+        # the first run compiles the program for the engines that do
+        env = create_global_env()
+        env.decl_var('data', data, True)
+        interpreter.evaluate(program, env)
+
+        env = create_global_env()
+        env.decl_var('data', data, True)
+        start = time.perf_counter()
+        result = interpreter.evaluate(program, env)
+        elapsed = time.perf_counter() - start
+
+        if(expected is None) :
+            expected = result.value
+        assert result.value == expected, (engine_name, result.value, expected)
+
+        print(f'{engine_name:<20} : {elapsed * 1000:9.2f} ms')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,92 @@
+'''
+    Compiled AST cache benchmark
+
+    Generates a large script and compares how long it takes to get its
+    Program by :
+
+        - lexing + parsing the source (Parser.generate_ast)
+        - loading the .nsc file written by frontend/cache.py
+        - hitting the in-process LRU of the same cache
+
+    Every loaded Program is checked to be identical (to_dict) to the parsed one.
+
+    usage (from the repo root) :
+
+        python benchmarks/ast_cache.py [--functions N] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.parser import Parser
+from frontend.cache import ASTCache
+from generator import name
+
+def make_source(functions : int) -> str :
+
+    lines = []
+    for i in range(functions) :
+        fn = name('v', i)
+        lines.append(f'fn {fn}(x, y) {{')
+        lines.append(f'    let a = (x + {i}) * (y - 3) / 7 % 5;')
+        lines.append(f'    const b = {{ a, sum : x + y, nested : {{ c : a * 2 }} }};')
+        lines.append(f'    b.nested.c + b[a] - {fn}x(a, b.sum)')
+        lines.append('}')
+        lines.append(f'fn {fn}x(p, q) {{ p * q + 1 }}')
+
+    return '\n'.join(lines)
+
+def best_of(repeat : int, fn) -> tuple :
+    best = None
+    result = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (best, result)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--functions', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    source = make_source(args.functions)
+
+    with tempfile.TemporaryDirectory() as folder :
+        path = os.path.join(folder, 'script.ns')
+        f = open(path, 'w')
+        f.write(source)
+        f.close()
+
+        (parse, parsed) = best_of(args.repeat, lambda : Parser().generate_ast(source))
+
+        # first load writes the .nsc file
+        ASTCache().load(path)
+        (disk, loaded) = best_of(args.repeat, lambda : ASTCache().load(path))
+
+        cache = ASTCache()
+        cache.parse(source)
+        (memory, hit) = best_of(args.repeat, lambda : cache.parse(source))
+
+        expected = parsed.to_dict()
+        assert loaded.to_dict() == expected
+        assert hit.to_dict() == expected
+
+        size = os.path.getsize(ASTCache().cache_path(path))
+
+    print(f'source           : {len(source) // 1024} KB, .nsc : {size // 1024} KB')
+    print(f'lex + parse      : {parse * 1000:.1f} ms')
+    print(f'.nsc load        : {disk * 1000:.1f} ms ({parse / disk:.1f}x)')
+    print(f'in-process hit   : {memory * 1000:.1f} ms ({parse / memory:.1f}x)')
+
+if __name__ == '__main__' :
+    main()
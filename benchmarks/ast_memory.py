@@ -0,0 +1,100 @@
+'''
+    AST memory benchmark
+
+    Generates a large script and measures, with tracemalloc, the memory held
+    by its AST :
+
+        - as a tree of node objects (frontend/ast.py)
+        - packed into typed arrays (frontend/packed.py), once the object
+          tree has been dropped
+
+    and the time the tree walking interpreter takes to run each of them
+    (both must give the same result). When frontend/packed.py does not exist
+    (older checkouts) only the object tree is measured, which makes it easy
+    to compare before / after.
+
+    usage (from the repo root) :
+
+        python benchmarks/ast_memory.py [--functions N]
+'''
+
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.parser import Parser
+from frontend.ast import count_nodes
+from runtime.interpreter import Interpreter
+from runtime.environment import create_global_env
+from generator import name
+
+try :
+    from frontend.packed import pack
+except ImportError :
+    pack = None
+
+def make_source(functions : int) -> str :
+
+    lines = []
+    for i in range(functions) :
+        fn = name('v', i)
+        lines.append(f'fn {fn}(x, y) {{ let a = (x + {i % 100}) * (y - 3) / 7 % 5; const b = {{ a, sum : x + y }}; b.sum + b.a - a * 2 }}')
+        lines.append(f'let r{fn} = {fn}({i % 10}, {i % 7});')
+
+    return '\n'.join(lines)
+
+def retained(build) -> tuple :
+
+    # bytes still held once build() returns, and what it returned
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before, result)
+
+def timed(program) -> tuple :
+    start = time.perf_counter()
+    result = Interpreter(create_global_env()).evaluate(program)
+    return (time.perf_counter() - start, result)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--functions', type=int, default=5000)
+    args = parser.parse_args()
+
+    source = make_source(args.functions)
+
+    (tree_bytes, tree) = retained(lambda : Parser().generate_ast(source))
+    nodes = count_nodes(tree)
+
+    print(f'nodes            : {nodes}')
+    print(f'object tree      : {tree_bytes // 1024} KB ({tree_bytes / nodes:.0f} bytes / node)')
+
+    (tree_time, tree_result) = timed(tree)
+    del tree
+
+    if(pack is None) :
+        print(f'run (objects)    : {tree_time * 1000:.1f} ms')
+        return
+
+    (packed_bytes, packed) = retained(lambda : pack(Parser().generate_ast(source)))
+    print(f'packed arrays    : {packed_bytes // 1024} KB ({packed_bytes / nodes:.0f} bytes / node, {tree_bytes / packed_bytes:.1f}x smaller)')
+
+    (packed_time, packed_result) = timed(packed)
+    assert tree_result.to_dict() == packed_result.to_dict()
+
+    print(f'run (objects)    : {tree_time * 1000:.1f} ms')
+    print(f'run (packed)     : {packed_time * 1000:.1f} ms')
+
+if __name__ == '__main__' :
+    main()
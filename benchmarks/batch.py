@@ -0,0 +1,89 @@
+'''
+    Batch runner scaling benchmark
+
+    Writes a directory of generated scripts (each one a loop of function
+    calls over an object, heavy enough that running dominates compiling)
+    and runs it through batch.BatchRunner with 1, 2, 4 ... workers up to
+    the core count, reporting scripts per second and the speedup over one
+    worker. Every run is checked to give the same results.
+
+    usage (from the repo root) :
+
+        python benchmarks/batch.py [--scripts N] [--calls N] [--engine closure]
+'''
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from batch import BatchRunner, collect_scripts
+
+def make_source(seed : int, calls : int) -> str :
+
+    lines = [
+        f'const seed = {seed};',
+        'fn step(acc, x) { { total : acc.total + x * seed, count : acc.count + 1 } }',
+        'let acc = { total : 0, count : 0 };',
+    ]
+
+    for i in range(calls) :
+        lines.append(f'acc = step(acc, {i % 9})')
+
+    lines.append('acc')
+    return '\n'.join(lines)
+
+def measure(paths : list, engine : str, workers : int) -> tuple :
+
+    runner = BatchRunner(engine, workers, write_cache=False)
+
+    start = time.perf_counter()
+    records = sorted(runner.run(paths), key=lambda record : record['index'])
+    elapsed = time.perf_counter() - start
+
+    assert all(record['status'] == 'ok' for record in records), records
+    return (elapsed, [record['result'] for record in records])
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scripts', type=int, default=200)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--engine', default='closure', choices=['tree', 'vm', 'closure', 'unboxed'])
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as folder :
+
+        for i in range(args.scripts) :
+            f = open(os.path.join(folder, f'script{i}.txt'), 'w')
+            f.write(make_source(i, args.calls))
+            f.close()
+
+        paths = collect_scripts([folder])
+
+        workers = 1
+        baseline = None
+        expected = None
+
+        print(f'{len(paths)} scripts, {cores} cores')
+
+        while(True) :
+            (elapsed, results) = measure(paths, args.engine, workers)
+
+            if(baseline is None) :
+                (baseline, expected) = (elapsed, results)
+            assert results == expected
+
+            print(f'{workers:>3} workers : {len(paths) / elapsed:8.1f} scripts / s ({baseline / elapsed:.2f}x)')
+
+            if(workers >= cores) :
+                break
+            workers = min(workers * 2, cores)
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,78 @@
+'''
+    Columnar evaluation benchmark
+
+    Runs a pricing rule over --rows records with Engine.run_columns
+    (runtime/columnar.py), with and without NumPy, against Engine.run once
+    per record. Runs per record take too long at a million rows, so they
+    are timed on the first --sample records and scaled up.
+
+    Every way must give the same results for the sampled records.
+
+    usage (from the repo root) :
+
+        python benchmarks/columnar.py [--rows N] [--sample N] [--engine NAME]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import runtime.columnar as columnar
+import runtime.vectorized as vectorized
+from nanoscript import Engine, ENGINES
+
+SOURCE = '''
+let gross = price * qty;
+let tax = gross * rate / 100;
+{ gross, tax, total : gross + tax - discount }
+'''
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--rows', type=int, default=1000000)
+    ap.add_argument('--sample', type=int, default=20000, help='records run one at a time')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='closure')
+    args = ap.parse_args()
+
+    columns = {
+        'price' : [float(i % 500) + 1 for i in range(args.rows)],
+        'qty' : [float(i % 7) for i in range(args.rows)],
+        'discount' : [float(i % 3) for i in range(args.rows)],
+    }
+
+    engine = Engine(args.engine)
+    engine.define('rate', 20)
+    program = engine.compile(SOURCE)
+
+    print(f'{args.rows} records, {args.engine} engine\n')
+
+    numpy = vectorized.numpy
+    ways = [('numpy', numpy), ('python', None)] if numpy is not None else [('python', None)]
+    results = {}
+
+    for (name, module) in ways :
+        (vectorized.numpy, columnar.numpy) = (module, module)
+        start = time.perf_counter()
+        results[name] = engine.run_columns(program, columns)
+        print(f'columnar ({name:<6})  : {time.perf_counter() - start:9.3f} s')
+
+    (vectorized.numpy, columnar.numpy) = (numpy, numpy)
+
+    sample = min(args.sample, args.rows)
+    rows = []
+    start = time.perf_counter()
+    for i in range(sample) :
+        rows.append(engine.run(program, { name : values[i] for (name, values) in columns.items() }))
+    elapsed = (time.perf_counter() - start) * args.rows / sample
+    print(f'one run per record  : {elapsed:9.3f} s (from {sample} records)')
+
+    for result in results.values() :
+        for key in ('gross', 'tax', 'total') :
+            assert result[key][:sample] == [row[key] for row in rows], key
+
+if __name__ == '__main__' :
+    main()
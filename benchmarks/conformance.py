@@ -0,0 +1,227 @@
+'''
+    Conformance check and benchmark : an engine against the tree walker
+
+    Runs every program under --engine (the python transpiler by default)
+    and under the tree walking Interpreter, and checks they behave the same :
+    same printed output, same result, or the same error with the same
+    message. Every error has to be a NanoScriptError : a raw Python error
+    (ZeroDivisionError, KeyError ...) fails the check even when both
+    engines raise it. Programs :
+
+        tests/*.txt         the scripts that come with the repo
+        generated           every shape of benchmarks/generator.py
+        SNIPPETS            small programs for the error paths and the odd
+                            corners of the language (see below)
+        SESSIONS            programs run one after the other on the same
+                            env, like the lines of a REPL session
+
+    Then times both engines on the generated programs : the best of --repeat
+    runs of a program already compiled for the engine, and the first run,
+    which compiles it. Exits with 1 if any program behaves differently.
+
+    usage (from the repo root) :
+
+        python benchmarks/conformance.py [--engine python] [--size N] [--repeat N]
+'''
+
+import io
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import contextlib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.parser import Parser
+from runtime.environment import create_global_env
+from nanoscript import ENGINES
+from utils.errors import NanoScriptError
+from generator import generate, SHAPES
+
+SNIPPETS = {
+    'division by zero' : 'let a = 1; a / (a - 1)',
+    'arithmetic on null' : 'let a = null; a + 1',
+    'arithmetic on bools' : 'true * 3 + 2',
+    'redeclared' : 'let a = 1; let a = 2;',
+    'redeclared function' : 'fn f() { 1 } fn f() { 2 }',
+    'assign to const' : 'const a = 1; a = 2',
+    'assign to function' : 'fn f() { 1 } f = 2',
+    'assign to undeclared' : 'b = 2',
+    'assign to global const' : 'true = 1',
+    'undeclared' : 'let a = 1; a + b',
+    'used before declared' : 'let a = b; let b = 1;',
+    'local used before declared' : 'fn f() { let a = b; let b = 1; a } f()',
+    'arity (too few)' : 'fn f(a, b) { a + b } f(1)',
+    'arity (too many)' : 'fn f(a) { a } f(1, 2, 3)',
+    'not callable' : 'let a = 3; a(1)',
+    'missing property' : 'let o = { a : 1 }; o.b',
+    'property of a number' : 'let n = 4; n.foo',
+    'computed property' : 'let o = { a : 1 }; let k = 0; o[k]',
+    'dot and a parenthesised name' : 'let o = { a : 1 }; let a = 2; o.(a)',
+    'dot and a string' : 'let o = { a : 1 }; o."a"',
+    'dot and a number' : 'let o = { a : 1 }; o.1',
+    'object key' : 'let o = { a : 1 }; o[o]',
+    'closures' : 'fn make(x) { fn add(y) { x = x + y; x } add } let f = make(10); f(1); f(2)',
+    'shadowing' : 'let x = 1; fn f(x) { let y = x * 2; fn g() { x + y } g() } f(5) + x',
+    'evaluation order' : 'let a = 1; fn bump() { a = a * 10; a } a + bump() + a',
+    'argument order' : 'let a = 1; fn f(p, q) { p - q } f(a, a = 5)',
+    'globals from functions' : 'let c = 0; fn inc() { c = c + 1 } inc(); inc(); c',
+    'shorthand properties' : 'let a = 1; let b = 2; let o = { a, b, c : a + b }; o.c * o.b',
+    'nested objects' : 'let o = { inner : { v : 7 } }; o.inner.v + 1',
+    'natives' : 'print(1, 2); print({ a : 1 })',
+    'functions as values' : 'fn twice(f, x) { f(f(x)) } fn inc(x) { x + 1 } twice(inc, 1)',
+    'empty function' : 'fn f() {} f()',
+    'result of print' : 'print(3)',
+    'null in nested arithmetic' : 'let a = null; (a + 1) * 2 / 0',
+    'division in nested arithmetic' : 'let a = 2; let b = 0; a * (3 + a / b)',
+    'modulo' : 'let a = 7; a % 3 + 10 % a',
+    'modulo by zero' : 'let a = 7; a % (a - 7)',
+    'modulo by zero in a function' : 'fn f(a, b) { a % b } f(5, 2) + f(1, 0)',
+    'arrays' : 'let a = [1, 2, 3, 4]; let b = [a, { v : a[3] }, null]; a[0] + b[1].v + b[0][2] + a.length',
+    'array slices' : 'let a = [1, 2, 3, 4, 5]; let s = a[1:4]; print(s, s[1:], a[:2], a[3:1], a[0 - 9:9]); s[0] + s.length',
+    'array index out of range' : 'let a = [1, 2]; a[2]',
+    'array index not whole' : 'let a = [1, 2]; a[1 / 2]',
+    'array index not a number' : 'let a = [1, 2]; a[a]',
+    'array property' : 'let a = [1, 2]; a.size',
+    'slice bound' : 'let a = [1, 2]; a[0:null]',
+    'slice of a number' : 'let n = 1; n[0:1]',
+    'arithmetic on arrays' : 'let a = [1, 2, 3]; let b = a * 6 / 5 + 2; b - a % 2 + [1, 1, 1] * b',
+    'arithmetic on mixed arrays' : 'let a = [1, null]; a + 1',
+    'arrays of different lengths' : 'let a = [1, 2]; a + [1, 2, 3]',
+    'division by an array' : 'let a = [1, 0]; 1 / a',
+    'reductions' : 'let a = [4, 1, 3]; sum(a) + min(a) * 10 + max(a * a) * 100 + mean(a[1:]) * 1000',
+    'reduction of an empty array' : 'max([])',
+    'reduction of a number' : 'sum(3)',
+    'strings' : 'let a = "n = "; let b = a + 4 + ", half = " + 7 / 2; print(b, "x" + true + null) b',
+    'string escapes' : '"tab\\tquote\\" slash\\\\ line\\n"',
+    'string operators' : 'let s = "ab"; print(s - s, s * 2, s / 1, s % 2) s + [1]',
+    'string keys' : 'let o = { "first name" : "Ada", age : 36 }; o["first name"] + " " + o["age"]',
+    'long strings' : 'let s = "0123456789012345678901234567890123456789012345678901234567890123456789012345678901234567890123456789"; let t = s + s + s; fn twice(x) { x + x } twice(twice(t)) + "!"',
+    'empty strings' : 'let e = ""; (e + e) + (e + 5)',
+    'unknown escape' : '"a\\qb"',
+    'unterminated string' : 'let s = "abc',
+    'for loops' : 'let t = 0; for (i in 0 : 10) { let d = i * 2; t = t + d } t',
+    'while loops' : 'let n = 5; let t = 1; while (n) { t = t * n n = n - 1 } t',
+    'nested loops' : 'let t = 0; for (i in 1 : 4) { for (j in i : 4) { t = t * 10 + j } } t',
+    'loop without its variable' : 'let t = 0; for (i in 0 : 3) { t = t + 1 } t',
+    'empty range' : 'let t = 7; for (i in 5 : 2) { t = 0 } t',
+    'range from expressions' : 'let a = [1, 2, 3]; let t = 0; for (i in a.length - 3 : a.length) { t = t + a[i] } t',
+    'closures in loops' : 'let t = 0; for (i in 0 : 3) { fn f() { i * 10 } t = t + f() } t',
+    'closures from an earlier iteration' : 'fn z() { 0 } let h = z; let s = 0; for (i in 0 : 3) { s = s + h() let t = i * 10; fn g() { t } h = g } s',
+    'closures over an earlier iteration' : 'fn z() { 0 } let h = z; let s = 0; for (i in 0 : 3) { let t = i * 10; s = s + h() fn g() { t } h = g } s',
+    'closures over the loop variable' : 'fn z() { 0 } let h = z; let s = 0; for (i in 0 : 3) { s = s + h() fn g() { i } h = g } s',
+    'closures in while loops' : 'fn z() { 0 } let h = z; let s = 0; let n = 3; while (n) { n = n - 1 let t = n * 10; s = s + h() fn g() { t } h = g } s',
+    'closures in nested loops' : 'fn z() { 0 } let a = z; let s = 0; for (i in 0 : 2) { let u = i; for (j in 0 : 2) { fn g() { u * 10 + j } s = s * 100 + g() + a() a = g } } s',
+    'loop variable kept' : 'let o = 0; let a = 0; for (i in 0 : 3) { o = { i } a = [i, i * 2] } o.i + a[1]',
+    'loop invariants' : 'let k = 3; let t = 0; for (i in 0 : 4) { t = t + k * 2 + i } t',
+    'loop result' : 'let n = 2; while (n) { n = n - 1 }',
+    'falsy conditions' : 'let s = "ab"; let t = 0; while (s) { s = "" t = t + 1 } while (null) { t = 100 } while (t - 1) { t = t - 1 } t',
+    'loop scope' : 'for (i in 0 : 2) { let x = i; } x',
+    'loop variable is const' : 'for (i in 0 : 2) { i = 5 }',
+    'range bound' : 'for (i in 0 : "10") { print(i) }',
+    'loop keyword as name' : 'let for = 1;',
+}
+
+# every line runs on the env the lines before it left behind
+SESSIONS = {
+    'session : globals read by an earlier function' : ['let x = 4;', 'fn f() { x }', 'x = 10', 'f()'],
+    'session : globals written by an earlier function' : ['let x = 4;', 'fn f() { x = x + 1 }', 'f()', 'x'],
+    'session : strings of an earlier function' : ['fn f() { "ab" }', 'let s = "cd";', 'f() + s'],
+}
+
+def run(engine : str, source) -> str :
+
+    # everything the program does, as text : printed output, then the
+    # result or the error. a list of sources is a session
+    out = io.StringIO()
+    env = create_global_env()
+    interpreter = ENGINES[engine](env)
+
+    with contextlib.redirect_stdout(out) :
+        try :
+            for line in ([source] if isinstance(source, str) else source) :
+                result = interpreter.evaluate(Parser().generate_ast(line), env)
+                print('RESULT', result.to_dict() if result is not None else None)
+        except NanoScriptError as err :
+            print('ERROR', type(err).__name__, err)
+        except Exception as err :
+            print('CRASH', type(err).__name__, err)
+
+    # ids and addresses differ between runs
+    return re.sub(r' at 0x[0-9a-f]+', '', out.getvalue())
+
+def programs(size : int) -> dict :
+
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt'))) :
+        f = open(path, 'r')
+        sources[os.path.basename(path)] = f.read()
+        f.close()
+
+    for shape in list(SHAPES.keys()) + ['mixed'] :
+        sources[f'generated {shape}'] = generate(shape, size)
+
+    sources.update(SNIPPETS)
+    sources.update(SESSIONS)
+    return sources
+
+def timed(engine : str, source : str, repeat : int) -> tuple :
+
+    # (first run, best of the runs after it) : the first one includes
+    # compiling the program for the engine, the others reuse it
+    program = Parser().generate_ast(source)
+    interpreter = ENGINES[engine](create_global_env())
+
+    times = []
+    for _ in range(repeat + 1) :
+        env = create_global_env()
+        start = time.perf_counter()
+        interpreter.evaluate(program, env)
+        times.append(time.perf_counter() - start)
+
+    return (times[0], min(times[1:]))
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='python')
+    ap.add_argument('--size', type=int, default=300, help='size of the generated programs')
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    sources = programs(args.size)
+    failures = 0
+
+    for (name, source) in sources.items() :
+        expected = run('tree', source)
+        actual = run(args.engine, source)
+
+        if(actual != expected) :
+            failures += 1
+            print(f'MISMATCH {name}\n--- tree\n{expected}--- {args.engine}\n{actual}')
+        elif('CRASH' in actual) :
+            failures += 1
+            print(f'CRASH {name}\n{actual}')
+
+    print(f'{len(sources) - failures} / {len(sources)} programs behave the same under tree and {args.engine}\n')
+
+    for (name, source) in sources.items() :
+        if(not name.startswith('generated')) :
+            continue
+
+        (_, tree) = timed('tree', source, args.repeat)
+        (first, other) = timed(args.engine, source, args.repeat)
+        print(
+            f'{name:<24} tree {tree * 1000:9.2f} ms   {args.engine} {other * 1000:9.2f} ms ({tree / other:5.1f}x)'
+            f'   first run (compiling) {first * 1000:9.2f} ms'
+        )
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__' :
+    main()
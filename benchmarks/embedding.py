@@ -0,0 +1,82 @@
+'''
+    Embedding benchmark : one process per script vs one Engine
+
+    Runs the same small script many times with different globals, first the
+    way a host had to before (a fresh python process running the script for
+    every input) and then through a single nanoscript.Engine, where the
+    script is compiled once and only run for every input. Reports scripts
+    per second for both. The results of both are checked to be the same.
+
+    usage (from the repo root) :
+
+        python benchmarks/embedding.py [--engine closure] [--runs N] [--processes N]
+'''
+
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+from nanoscript import Engine
+
+SOURCE = '''
+fn score(a, b) { let s = a * a + b * 3; s / 2 }
+let result = { total : score(x, y), twice : score(x, y) * 2 };
+result
+'''
+
+# what a host ran for every input : start python, build an engine, run the script
+SUBPROCESS_SCRIPT = '''
+import sys, json
+sys.path.insert(0, sys.argv[1])
+from nanoscript import Engine
+print(json.dumps(Engine(sys.argv[2]).eval(sys.argv[3], globals=json.loads(sys.argv[4]))))
+'''
+
+def inputs(count : int) -> list :
+    return [{ 'x' : i % 17, 'y' : i % 5 } for i in range(count)]
+
+def per_process(engine : str, rows : list) -> tuple :
+
+    start = time.perf_counter()
+    results = []
+    for row in rows :
+        out = subprocess.run(
+            [sys.executable, '-c', SUBPROCESS_SCRIPT, SRC, engine, SOURCE, json.dumps(row)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout))
+
+    return (time.perf_counter() - start, results)
+
+def embedded(engine : str, rows : list) -> tuple :
+
+    start = time.perf_counter()
+    host = Engine(engine)
+    program = host.compile(SOURCE)
+    results = [host.run(program, globals=row) for row in rows]
+
+    return (time.perf_counter() - start, results)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine', default='closure', choices=['tree', 'vm', 'closure', 'unboxed'])
+    parser.add_argument('--runs', type=int, default=20000, help='scripts run through the engine')
+    parser.add_argument('--processes', type=int, default=20, help='scripts run one process each')
+    args = parser.parse_args()
+
+    (elapsed, expected) = per_process(args.engine, inputs(args.processes))
+    print(f'process per script : {args.processes / elapsed:10.1f} scripts / s')
+
+    (elapsed, results) = embedded(args.engine, inputs(args.runs))
+    assert results[:args.processes] == expected, (results[:args.processes], expected)
+    print(f'one engine         : {args.runs / elapsed:10.1f} scripts / s')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,181 @@
+'''
+    Synthetic NanoScript program generator
+
+    Builds programs of a given size and shape, for the benchmarks to run at
+    sizes tests/test.txt cannot reach. The same (shape, size, seed) always
+    gives the same program. Shapes :
+
+        expressions     long arithmetic expressions, nested up to --depth
+                        parentheses, folded into a running total
+        objects         object literals with --width keys (some nested),
+                        read back through member expressions
+        functions       many small functions, each calling a few of the
+                        ones declared before it
+        recursion       chains of --depth functions, each calling the next,
+                        entered over and over
+        mixed           all of the above, one after the other
+
+    size is the number of top level statements (roughly, lines) of work.
+    Every program evaluates to a number.
+
+    usage (from the repo root) :
+
+        python benchmarks/generator.py SHAPE [--size N] [--depth N] [--width N] [--seed N] [--output FILE]
+'''
+
+import random
+import argparse
+from typing import List
+
+OPERATORS = ['+', '-', '*']
+
+def name(prefix : str, index : int) -> str :
+
+    # identifiers are letters only : the index is spelled in base 26. the
+    # prefixes used never spell a keyword or a global (fn, let, null ...)
+    letters = ''
+    while(True) :
+        letters = chr(ord('a') + index % 26) + letters
+        index = index // 26
+        if(index == 0) :
+            break
+    return prefix + letters
+
+def expression(rng : random.Random, depth : int, leaves : List[str]) -> str :
+
+    # a chain of terms, one of which is a parenthesised sub-expression one
+    # level deeper (so the size grows with depth, not exponentially). numbers
+    # stay small and there is no division, so nothing overflows or divides by 0
+    terms = [
+        rng.choice(leaves) if leaves and rng.random() < 0.5 else str(rng.randint(1, 9))
+        for _ in range(rng.randint(2, 4))
+    ]
+
+    if(depth > 0) :
+        terms[rng.randrange(len(terms))] = '(' + expression(rng, depth - 1, leaves) + ')'
+
+    parts = [terms[0]]
+    for term in terms[1:] :
+        parts.append(rng.choice(OPERATORS))
+        parts.append(term)
+    return ' '.join(parts)
+
+def expressions(rng : random.Random, size : int, depth : int, width : int) -> List[str] :
+
+    lines = ['let total = 0;', 'let a = 3;', 'let b = 5;']
+    for _ in range(size) :
+        lines.append(f'total = ({expression(rng, depth, ["a", "b"])}) % 1000 + total % 7')
+    return lines
+
+def objects(rng : random.Random, size : int, depth : int, width : int) -> List[str] :
+
+    lines = ['let total = 0;']
+    keys = [name('k', i) for i in range(width)]
+
+    for i in range(size) :
+        obj = name('o', i)
+        props = [f'{key} : {rng.randint(0, 99)}' for key in keys]
+        props.append(f'inner : {{ {keys[0]} : {i % 13}, {keys[-1]} : 1 }}')
+        lines.append(f'let {obj} = {{ {", ".join(props)} }};')
+        lines.append(f'total = total + {obj}.{rng.choice(keys)} + {obj}.inner.{keys[0]}')
+
+    return lines
+
+def functions(rng : random.Random, size : int, depth : int, width : int) -> List[str] :
+
+    lines = ['let acc = 0;']
+    count = max(1, size // 2)
+
+    for i in range(count) :
+        fn = name('fun', i)
+        if(i == 0) :
+            body = 'x + 1'
+        else :
+            callees = [name('fun', rng.randrange(i)) for _ in range(rng.randint(1, 2))]
+            body = ' + '.join(f'{callee}(x)' for callee in callees) + f' - x * {rng.randint(1, 3)}'
+        lines.append(f'fn {fn}(x) {{ {body} }}')
+
+    for i in range(size - count) :
+        lines.append(f'acc = acc % 1000 + {name("fun", rng.randrange(count))}({i % 11})')
+
+    return lines
+
+def recursion(rng : random.Random, size : int, depth : int, width : int) -> List[str] :
+
+    # there are no conditionals, so a deep call stack is a chain of distinct
+    # functions, the last one returning without a call
+    lines = ['let acc = 0;']
+
+    for i in range(depth) :
+        fn = name('r', i)
+        body = f'{name("r", i + 1)}(x + 1) - x' if i < depth - 1 else 'x'
+        lines.append(f'fn {fn}(x) {{ {body} }}')
+
+    for i in range(size) :
+        lines.append(f'acc = acc % 1000 + {name("r", 0)}({i % 17})')
+
+    return lines
+
+# the variable each shape leaves its result in
+RESULTS = {
+    'expressions' : 'total',
+    'objects' : 'total',
+    'functions' : 'acc',
+    'recursion' : 'acc',
+}
+
+SHAPES = {
+    'expressions' : expressions,
+    'objects' : objects,
+    'functions' : functions,
+    'recursion' : recursion,
+}
+
+def generate(shape : str, size : int = 1000, depth : int = 8, width : int = 16, seed : int = 0) -> str :
+
+    rng = random.Random(seed)
+
+    if(shape == 'mixed') :
+        # one block of each, each in a function so their names never clash
+        lines = []
+        results = []
+        for (i, (block_shape, make)) in enumerate(SHAPES.items()) :
+            block = name('block', i)
+            body = make(rng, max(1, size // len(SHAPES)), depth, width)
+            lines.append(f'fn {block}() {{')
+            lines.extend('    ' + line for line in body)
+            lines.append(f'    {RESULTS[block_shape]}')
+            lines.append('}')
+            results.append(f'{block}()')
+        lines.append(' + '.join(results))
+        return '\n'.join(lines) + '\n'
+
+    if(shape not in SHAPES) :
+        raise ValueError(f'Unknown shape {shape}. Available shapes : {list(SHAPES.keys()) + ["mixed"]}')
+
+    lines = SHAPES[shape](rng, size, depth, width)
+    lines.append(RESULTS[shape])
+    return '\n'.join(lines) + '\n'
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('shape', choices=list(SHAPES.keys()) + ['mixed'])
+    ap.add_argument('--size', type=int, default=1000, help='top level statements')
+    ap.add_argument('--depth', type=int, default=8, help='expression nesting / call chain length')
+    ap.add_argument('--width', type=int, default=16, help='keys per object')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--output', default=None, help='file to write to (default : stdout)')
+    args = ap.parse_args()
+
+    source = generate(args.shape, args.size, args.depth, args.width, args.seed)
+
+    if(args.output) :
+        f = open(args.output, 'w')
+        f.write(source)
+        f.close()
+    else :
+        print(source, end='')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,129 @@
+'''
+    Resource governor overhead benchmark
+
+    Runs the same script over and over on the tree walking interpreter and
+    on the vm, each without a governor, with a governor whose Budget sets no
+    limits (pure accounting) and with one that sets every limit high enough
+    not to be hit. Reports the best time of each and the overhead over the
+    plain engine. The results of every run are checked to be the same, and
+    every engine is checked to stop each of the RUNAWAY programs, and the
+    governed tree interpreter to forget the programs it no longer runs.
+
+    usage (from the repo root) :
+
+        python benchmarks/governor.py [--calls N] [--repeat N]
+'''
+
+import gc
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from frontend.parser import Parser
+from runtime.interpreter import Interpreter
+from runtime.vm import VM
+from runtime.governor import Budget, Governor, GovernedInterpreter
+from runtime.environment import Environment, create_global_env
+from utils.errors import FuelExhaustedError
+
+# programs that never finish on their own : a governor has to stop them
+RUNAWAY = {
+    'empty loop' : 'for (i in 0 : 100000000) { }',
+    'endless while' : 'let t = 0; while (1) { t = t + 1 }',
+}
+
+def check() -> None :
+
+    for name in ('tree', 'vm') :
+        for (label, source) in RUNAWAY.items() :
+            engine = make_engine(name, Budget(fuel=100_000, timeout=5))
+            try :
+                engine.evaluate(Parser().generate_ast(source))
+            except FuelExhaustedError :
+                continue
+            raise AssertionError(f'{name} did not stop {label}')
+
+    # what the tree interpreter works out about a program goes with it
+    engine = make_engine('tree', Budget(fuel=10 ** 9))
+    for i in range(100) :
+        engine.evaluate(Parser().generate_ast(f'fn f(a) {{ a * {i} }} for (k in 0 : 3) {{ f(k) }}'), create_global_env())
+    gc.collect()
+    assert len(engine._costs) == 0, len(engine._costs)
+
+def make_source(calls : int) -> str :
+
+    lines = [
+        'const scale = 3;',
+        'fn point(x, y) { { x : x * scale, y : y + scale } }',
+        'fn dot(a, b) { a.x * b.x + a.y * b.y }',
+        'let total = 0;',
+    ]
+
+    for i in range(calls) :
+        lines.append(f'total = total + dot(point({i % 7}, {i % 3}), point({i % 5}, 1)) % 11')
+
+    lines.append('total')
+    return '\n'.join(lines)
+
+def make_engine(name : str, budget : Budget) :
+
+    env = create_global_env()
+
+    if(name == 'tree') :
+        return Interpreter(env) if budget is None else GovernedInterpreter(env, Governor(budget))
+    return VM(env) if budget is None else VM(env, governor=Governor(budget))
+
+def measure(program, engine) -> tuple :
+
+    # like a host running the same script again and again : a fresh scope,
+    # and whatever the engine worked out about the program is reused
+    if(getattr(engine, 'governor', None) is not None) :
+        engine.governor.start()
+
+    env = Environment(parent=engine.global_env)
+
+    start = time.perf_counter()
+    result = engine.evaluate(program, env)
+    return (time.perf_counter() - start, result.value)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    check()
+    source = make_source(args.calls)
+    budgets = [
+        ('no governor', None),
+        ('no limits', Budget()),
+        ('all limits', Budget(fuel=10 ** 9, timeout=3600, max_depth=1000, max_allocations=10 ** 9)),
+    ]
+
+    for name in ('tree', 'vm') :
+
+        # the configurations take turns, so that noise on the machine is
+        # spread over all of them. the best time of each is kept
+        best = [None] * len(budgets)
+        expected = None
+        runs = [(Parser().generate_ast(source), make_engine(name, budget)) for (_, budget) in budgets]
+
+        for _ in range(args.repeat) :
+            for (i, (label, budget)) in enumerate(budgets) :
+                (elapsed, result) = measure(*runs[i])
+
+                if(expected is None) :
+                    expected = result
+                assert result == expected, (result, expected)
+
+                best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+
+        for (i, (label, budget)) in enumerate(budgets) :
+            print(f'{name:<4} {label:<12} : {best[i] * 1000:8.1f} ms ({(best[i] / best[0] - 1) * 100:+.1f}%)')
+
+if __name__ == '__main__' :
+    main()
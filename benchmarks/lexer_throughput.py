@@ -0,0 +1,105 @@
+'''
+    Throughput benchmark : master pattern scanner vs the old per-character lexer
+
+    The old lexer is kept here (and only here) as the baseline. Both are run on
+    the same source and the token streams are checked to be identical before 
+    anything is timed.
+
+    usage (from the repo root) :
+
+        python benchmarks/lexer_throughput.py [--size KB] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from frontend.lexer import Token, TokenType, KEYWORDS, tokenize
+from utils.match import isint, isalpha, isskippable
+
+SINGLE_CHAR_TOKENS = {
+    '(' : TokenType.OpenParam, ')' : TokenType.CloseParam,
+    '{' : TokenType.OpenBrace, '}' : TokenType.CloseBrace,
+    '[' : TokenType.OpenBracket, ']' : TokenType.CloseBracket,
+    ':' : TokenType.Colon, ';' : TokenType.SemiColon,
+    ',' : TokenType.Comma, '.' : TokenType.Dot, '=' : TokenType.Equals,
+}
+
+def legacy_tokenize(src : str) :
+
+    # same algorithm as the lexer this benchmark replaced : one character at a 
+    # time, regex match per character, lexemes built with +=
+    tokens = []
+    ptr = 0
+
+    while(ptr < len(src)) :
+        if(src[ptr] in SINGLE_CHAR_TOKENS) :
+            tokens.append(Token(src[ptr], SINGLE_CHAR_TOKENS[src[ptr]]))
+            ptr += 1
+        elif(src[ptr] in '+-*/%') :
+            tokens.append(Token(src[ptr], TokenType.BinaryOperator))
+            ptr += 1
+        elif(isint(src[ptr])) :
+            num = ""
+            while(ptr < len(src) and isint(src[ptr])) :
+                num += src[ptr]
+                ptr += 1
+            tokens.append(Token(num, TokenType.Number))
+        elif(isalpha(src[ptr])) :
+            s = ""
+            while(ptr < len(src) and isalpha(src[ptr])) :
+                s += src[ptr]
+                ptr += 1
+            tokens.append(Token(s, KEYWORDS.get(s, TokenType.Identifier)))
+        elif(isskippable(src[ptr])) :
+            ptr += 1
+        else :
+            raise ValueError(f'Unrecognised character found in source : {src[ptr]}')
+
+    tokens.append(Token("EOF", TokenType.EOF))
+    return tokens
+
+def make_source(size_kb : int) -> str :
+
+    tests_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests')
+    with open(os.path.join(tests_dir, 'test.txt'), 'r') as f :
+        unit = f.read()
+
+    copies = max(1, (size_kb * 1024) // len(unit))
+    return '\n'.join([unit] * copies)
+
+def best_of(fn, src : str, repeat : int) -> float :
+    best = float('inf')
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        fn(src)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--size', type=int, default=256, help='source size in KB')
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    src = make_source(args.size)
+
+    old = [(t.type, t.value) for t in legacy_tokenize(src)]
+    new = [(t.type, t.value) for t in tokenize(src)]
+    assert old == new, 'token streams differ'
+
+    mb = len(src) / (1024 * 1024)
+    t_old = best_of(legacy_tokenize, src, args.repeat)
+    t_new = best_of(tokenize, src, args.repeat)
+
+    print(f'source  : {len(src)} chars, {len(new)} tokens')
+    print(f'legacy  : {t_old * 1000:9.2f} ms  ({mb / t_old:7.2f} MB/s)')
+    print(f'scanner : {t_new * 1000:9.2f} ms  ({mb / t_new:7.2f} MB/s)')
+    print(f'speedup : {t_old / t_new:.2f}x')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,84 @@
+'''
+    Loop benchmark
+
+    Runs loops of --iterations iterations (10 million by default) :
+
+        counted         for (i in 0 : n) { t = t + i * 2 + k * 3 }
+        unused          for (i in 0 : n) { t = t + k * 3 }
+                        the body never reads i, so it is never bound
+        while           while (n) { t = t + k * 3  n = n - 1 }
+
+    and times the run (not the compile, best of --repeat) under every
+    engine, as parsed and optimized. k * 3 does not change from one
+    iteration to the next : the optimizer hoists it out of the loop and
+    computes it once (loop-invariant-hoisting, frontend/optimizer.py).
+    The tree walker takes minutes at the default size, pass it to
+    --engines with fewer --iterations.
+
+    usage (from the repo root) :
+
+        python benchmarks/loops.py [--iterations N] [--engines vm,closure] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from nanoscript import Engine
+
+SHAPES = {
+    'counted' : 'let k = 3; let t = 0; for (i in 0 : {n}) {{ t = t + i * 2 + k * 3 }} t',
+    'unused' : 'let k = 3; let t = 0; for (i in 0 : {n}) {{ t = t + k * 3 }} t',
+    'while' : 'let k = 3; let t = 0; let n = {n}; while (n) {{ t = t + k * 3  n = n - 1 }} t',
+}
+
+def expected(shape : str, n : int) -> float :
+    if(shape == 'counted') :
+        return n * (n - 1) + 9 * n
+    return 9 * n
+
+def timed(engine : Engine, source : str, repeat : int) -> tuple :
+
+    # (best of the runs, result)
+    compiled = engine.compile(source)
+    times = []
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        result = engine.run(compiled)
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--iterations', type=int, default=10_000_000)
+    ap.add_argument('--engines', default='vm,closure,unboxed,python', help='comma separated engines')
+    ap.add_argument('--shapes', default=','.join(SHAPES.keys()), help='comma separated shapes')
+    ap.add_argument('--repeat', type=int, default=1)
+    args = ap.parse_args()
+
+    n = args.iterations
+
+    for name in args.engines.split(',') :
+        plain = Engine(name)
+        optimized = Engine(name, optimize=True)
+
+        for shape in args.shapes.split(',') :
+            source = SHAPES[shape].format(n=n)
+
+            (before, result) = timed(plain, source, args.repeat)
+            (after, optimized_result) = timed(optimized, source, args.repeat)
+
+            assert result == optimized_result == expected(shape, n), (result, optimized_result)
+
+            print(
+                f'{name:<8} {shape:<8} {n:>10} iterations : '
+                f'{before:8.2f} s ({before / n * 1e9:6.0f} ns / iteration)   '
+                f'optimized {after:8.2f} s ({after / n * 1e9:6.0f} ns / iteration, {before / after:4.2f}x)'
+            )
+
+if __name__ == '__main__' :
+    main()
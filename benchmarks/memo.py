@@ -0,0 +1,96 @@
+'''
+    Memoization benchmark for pure function calls
+
+    Runs a script that keeps calling a few pure helpers with a small set of
+    arguments on the tree walking interpreter, without a memo cache and with
+    MemoCache instances of a few sizes, and reports the time taken and the
+    cache statistics. The results of every run are checked to be the same,
+    and so are the results of the CHECKS programs with and without a cache.
+
+    usage (from the repo root) :
+
+        python benchmarks/memo.py [--calls N] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from frontend.parser import Parser
+from runtime.interpreter import Interpreter
+from runtime.memo import MemoCache
+from runtime.environment import create_global_env
+
+# programs whose result a memo cache must not change
+CHECKS = {
+    'closures are not shared' : 'fn make(x) { fn add(y) { x = x + y x } add } let f = make(10); let g = make(10); f(1) g(1)',
+    'counters are not shared' : 'fn counter(s) { fn next() { s = s + 1 s } next } let a = counter(0); a() let b = counter(0); b() + a() * 10',
+    'primitive results' : 'fn square(x) { x * x } square(3) + square(3)',
+}
+
+def check() -> None :
+
+    for (name, source) in CHECKS.items() :
+        results = []
+        for memo in (None, MemoCache()) :
+            result = Interpreter(create_global_env(), memo=memo).evaluate(Parser().generate_ast(source))
+            results.append(result.to_dict())
+
+        assert results[0] == results[1], (name, results)
+
+def make_source(calls : int) -> str :
+
+    lines = [
+        'const scale = 3;',
+        'fn add(x, y) { x + y }',
+        'fn mult(x, y) { x * y }',
+        'fn poly(x) { let a = mult(x, x); add(mult(a, x), mult(scale, a)) - add(x, 7) }',
+        'fn score(x, y) { add(poly(x), mult(poly(y), 2)) }',
+        'let total = 0;',
+    ]
+
+    for i in range(calls) :
+        lines.append(f'total = total + score({i % 12}, {i % 5})')
+
+    lines.append('total')
+    return '\n'.join(lines)
+
+def measure(source : str, memo_size : int, repeat : int) -> tuple :
+
+    best = None
+    for _ in range(repeat) :
+        program = Parser().generate_ast(source)
+        memo = MemoCache(memo_size) if memo_size else None
+        interpreter = Interpreter(create_global_env(), memo=memo)
+
+        start = time.perf_counter()
+        result = interpreter.evaluate(program)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return (best, result.value, memo.stats() if memo else None)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    check()
+    source = make_source(args.calls)
+
+    (baseline, expected, _) = measure(source, 0, args.repeat)
+    print(f'no memo          : {baseline * 1000:.1f} ms')
+
+    for size in (8, 64, 1024) :
+        (elapsed, result, stats) = measure(source, size, args.repeat)
+        assert result == expected, (result, expected)
+        print(f'memo size {size:<6} : {elapsed * 1000:.1f} ms ({baseline / elapsed:.2f}x) {stats}')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,123 @@
+'''
+    Streaming pipeline benchmark
+
+    Writes CSV and JSONL files of --sizes records, runs a rule over each
+    with src/pipeline.py and reports, per file :
+
+        - records / second
+        - the peak memory traced (tracemalloc) while streaming it, which
+          must not grow with the number of records
+
+    and first checks the CSV FIELDS are read back as the values they hold.
+
+    usage (from the repo root) :
+
+        python benchmarks/pipeline.py [--sizes 10000,100000] [--engine NAME]
+'''
+
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from nanoscript import Engine, ENGINES
+from pipeline import Pipeline, read_records, read_csv
+
+SOURCE = '''
+let gross = price * qty;
+{ gross, net : gross - discount, vip : flag }
+'''
+
+# CSV text -> the value the record holds. only plain decimals are numbers
+FIELDS = {
+    '12' : 12.0,
+    '-3.5' : -3.5,
+    '.5' : 0.5,
+    '1e3' : 1000.0,
+    '007' : 7.0,
+    '' : None,
+    'null' : None,
+    'true' : True,
+    'nan' : 'nan',
+    'Nan' : 'Nan',
+    'Inf' : 'Inf',
+    '-infinity' : '-infinity',
+    '1_000' : '1_000',
+    ' 7' : ' 7',
+    '0x10' : '0x10',
+    '1e999' : '1e999',
+    '12abc' : '12abc',
+}
+
+def check(engine : Engine) -> None :
+
+    lines = ['value'] + [f'"{text}"' for text in FIELDS]
+    records = list(read_csv(io.StringIO('\n'.join(lines) + '\n')))
+    assert [record['value'] for record in records] == list(FIELDS.values()), records
+
+    # and every result is valid JSON (no NaN)
+    pipeline = Pipeline(engine, engine.compile('{ value }'))
+    for output in pipeline.run(iter(records)) :
+        json.dumps(output, allow_nan=False)
+    assert pipeline.counts == { 'ok' : len(FIELDS), 'error' : 0 }, pipeline.counts
+
+def write(path : str, format : str, count : int) -> None :
+
+    with open(path, 'w', newline='') as f :
+        if(format == 'csv') :
+            f.write('id,price,qty,discount,flag\n')
+        for i in range(count) :
+            (price, qty, discount, flag) = (i % 500 + 1, i % 7, i % 3, i % 2 == 0)
+            if(format == 'csv') :
+                f.write(f'{i},{price},{qty},{discount},{"true" if flag else "false"}\n')
+            else :
+                f.write(json.dumps({ 'id' : i, 'price' : price, 'qty' : qty, 'discount' : discount, 'flag' : flag }) + '\n')
+
+def stream(engine : Engine, path : str, format : str) -> Pipeline :
+
+    pipeline = Pipeline(engine, engine.compile(SOURCE))
+
+    with open(path, 'r', newline='') as f, open(os.devnull, 'w') as out :
+        for output in pipeline.run(read_records(f, format)) :
+            out.write(json.dumps(output) + '\n')
+
+    return pipeline
+
+def traced(engine : Engine, path : str, format : str) -> int :
+
+    # a second run : tracemalloc slows down the one it watches
+    tracemalloc.start()
+    stream(engine, path, format)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='10000,100000', help='comma separated record counts')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='closure')
+    args = ap.parse_args()
+
+    engine = Engine(args.engine)
+    check(engine)
+
+    with tempfile.TemporaryDirectory() as tmp :
+        for format in ('csv', 'jsonl') :
+            for count in [int(size) for size in args.sizes.split(',')] :
+                path = os.path.join(tmp, f'records.{format}')
+                write(path, format, count)
+
+                pipeline = stream(engine, path, format)
+                peak = traced(engine, path, format)
+                assert pipeline.counts == { 'ok' : count, 'error' : 0 }, pipeline.counts
+
+                print(f'{format:<6} {count:>9} records : {pipeline.rate:10.0f} / s   peak {peak / 2**10:8.1f} KB')
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,79 @@
+'''
+    Streaming benchmark : a script run whole against the same script streamed
+
+    Writes a generated script (benchmarks/generator.py) of --size statements
+    to a temporary file and runs it under --engine :
+
+        whole       read the file, parse it into one Program, evaluate it
+                    (what repl.py run does)
+        streamed    repl.py stream : one top level statement at a time, as
+                    the file is read (python src/repl.py SCRIPT --stream)
+
+    and reports the time and, with tracemalloc, the peak memory of each. The
+    two must give the same result. The shape has to keep its state in
+    globals, since the statements of a streamed script are run one by one.
+
+    usage (from the repo root) :
+
+        python benchmarks/streaming.py [--size N] [--engine closure] [--shape expressions]
+'''
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.parser import Parser
+from runtime.environment import create_global_env
+from nanoscript import ENGINES
+from repl import stream
+from generator import generate
+
+def whole(path : str, engine : str) :
+    f = open(path, 'r')
+    source = f.read()
+    f.close()
+    return ENGINES[engine](create_global_env()).evaluate(Parser().generate_ast(source))
+
+def measured(fn, *args) -> tuple :
+
+    # (result, seconds, peak bytes)
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (result, elapsed, peak)
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--size', type=int, default=5000, help='top level statements')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='closure')
+    ap.add_argument('--shape', choices=['expressions', 'objects', 'recursion'], default='expressions')
+    args = ap.parse_args()
+
+    (fd, path) = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(fd, 'w') as f :
+        f.write(generate(args.shape, args.size))
+
+    try :
+        print(f'{args.shape} : {args.size} statements, {os.path.getsize(path) / 1024:.0f} KB, {args.engine}')
+
+        (expected, whole_time, whole_peak) = measured(whole, path, args.engine)
+        (result, stream_time, stream_peak) = measured(stream, path, args.engine)
+        assert result.value == expected.value, (result.value, expected.value)
+
+        print(f'whole     : {whole_time:8.2f} s   peak {whole_peak / 1024:10.1f} KB')
+        print(f'streamed  : {stream_time:8.2f} s   peak {stream_peak / 1024:10.1f} KB ({whole_peak / stream_peak:.1f}x less)')
+    finally :
+        os.remove(path)
+
+if __name__ == '__main__' :
+    main()
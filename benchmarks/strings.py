@@ -0,0 +1,108 @@
+'''
+    String concatenation benchmark
+
+    Builds one large string two ways, like a templating script would :
+
+        statements      let s1 = s0 + piece; let s2 = s1 + piece; ...
+                        --pieces statements, each one adding to the last
+        chain           s + piece + piece + ... in one expression of
+                        --terms pieces, run --pieces / --terms times
+
+    and times the run (not the compile, best of --repeat) under every
+    engine, with the rope (runtime/values/string.py) and with every +
+    copying both sides into a new string, which is what the rope avoids.
+    Copying is quadratic in the length of the result, the rope is linear :
+    doubling --pieces doubles the rope times.
+
+    usage (from the repo root) :
+
+        python benchmarks/strings.py [--pieces 2000,4000,8000] [--terms 200] [--engines tree,closure] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import runtime.values.string as string
+from nanoscript import Engine, ENGINES
+
+TEXT = '<li class="item">{{ name }}</li>\n'
+
+# TEXT as a string literal
+PIECE = TEXT.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def statements(pieces : int) -> str :
+    lines = [f'let s{_name(0)} = "";']
+    for i in range(1, pieces + 1) :
+        lines.append(f'let s{_name(i)} = s{_name(i - 1)} + "{PIECE}";')
+    lines.append(f's{_name(pieces)}')
+    return '\n'.join(lines)
+
+def chain(pieces : int, terms : int) -> str :
+    lines = ['let s = "";']
+    for _ in range(pieces // terms) :
+        lines.append('s = s + ' + ' + '.join([f'"{PIECE}"'] * terms))
+    lines.append('s')
+    return '\n'.join(lines)
+
+def _name(i : int) -> str :
+    # identifiers are letters only
+    digits = ''
+    while(True) :
+        (i, digit) = divmod(i, 26)
+        digits = chr(ord('a') + digit) + digits
+        if(i == 0) :
+            return digits
+
+ROPE_MIN = string.ROPE_MIN
+
+def timed(engine : Engine, source : str, rope_min : float, repeat : int) -> tuple :
+
+    # (best of the runs, length of the result)
+    compiled = engine.compile(source)
+    string.ROPE_MIN = rope_min
+    try :
+        times = []
+        for _ in range(repeat) :
+            start = time.perf_counter()
+            result = engine.run(compiled)
+            times.append(time.perf_counter() - start)
+        return (min(times), len(result))
+    finally :
+        string.ROPE_MIN = ROPE_MIN
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--pieces', default='2000,4000,8000', help='comma separated number of pieces')
+    ap.add_argument('--terms', type=int, default=200, help='pieces per expression in the chain')
+    ap.add_argument('--engines', default=','.join(ENGINES.keys()), help='comma separated engines')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    for name in args.engines.split(',') :
+        engine = Engine(name)
+
+        for shape in ('statements', 'chain') :
+            for pieces in [int(size) for size in args.pieces.split(',')] :
+                if(shape == 'statements') :
+                    source = statements(pieces)
+                else :
+                    pieces -= pieces % args.terms
+                    source = chain(pieces, args.terms)
+
+                (rope, length) = timed(engine, source, ROPE_MIN, args.repeat)
+                (copied, copied_length) = timed(engine, source, float('inf'), args.repeat)
+
+                assert length == copied_length == pieces * len(TEXT), (length, copied_length)
+
+                print(
+                    f'{name:<8} {shape:<10} {pieces:>7} pieces ({length / 2**10:7.0f} KB) : '
+                    f'rope {rope * 1000:9.2f} ms   copied {copied * 1000:9.2f} ms ({copied / rope:5.1f}x)'
+                )
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,180 @@
+'''
+    Benchmark suite : lexer, parser and engines on generated programs
+
+    Generates one program per shape (see benchmarks/generator.py) at each of
+    the requested sizes and times, separately :
+
+        tokenize        frontend.lexer.tokenize(source)
+        parse           Parser().generate_ast(source), lexing included
+        evaluate        <engine>.evaluate(program) on a fresh global env, for
+                        each engine asked for. for vm / closure / unboxed this
+                        includes compiling the program for that engine
+
+    Every timing is the best of --repeat runs (the median is stored too).
+    The results of all the engines are checked to agree.
+
+    Results are written as JSON along with the commit, Python version and
+    the options used, so that runs on two commits can be compared :
+
+        python benchmarks/suite.py --output before.json
+        (change something)
+        python benchmarks/suite.py --output after.json --compare before.json
+
+    usage (from the repo root) :
+
+        python benchmarks/suite.py [--sizes 100,1000] [--shapes expressions,objects]
+                                   [--engines tree,vm] [--repeat N] [--output FILE] [--compare FILE]
+'''
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frontend.lexer import tokenize
+from frontend.parser import Parser
+from runtime.environment import create_global_env
+from nanoscript import ENGINES
+from generator import generate, SHAPES
+
+def commit() -> str :
+    try :
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError :
+        return None
+
+def timed(fn, repeat : int) -> tuple :
+
+    # (best, median, last result) over repeat calls
+    times = []
+    result = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), statistics.median(times), result)
+
+def evaluate(engine : str, source : str) :
+
+    # a fresh tree every time : the engines annotate the one they are given
+    program = Parser().generate_ast(source)
+    interpreter = ENGINES[engine](create_global_env())
+
+    def run() :
+        return interpreter.evaluate(program)
+
+    return run
+
+def bench(shape : str, size : int, engines : list, repeat : int, depth : int, width : int) -> dict :
+
+    source = generate(shape, size, depth, width)
+
+    (tok_best, tok_median, tokens) = timed(lambda : tokenize(source), repeat)
+    (parse_best, parse_median, _) = timed(lambda : Parser().generate_ast(source), repeat)
+
+    entry = {
+        'shape' : shape,
+        'size' : size,
+        'chars' : len(source),
+        'tokens' : len(tokens),
+        'tokenize_ms' : { 'best' : tok_best * 1000, 'median' : tok_median * 1000 },
+        'parse_ms' : { 'best' : parse_best * 1000, 'median' : parse_median * 1000 },
+        'evaluate_ms' : {},
+    }
+
+    expected = None
+    for engine in engines :
+        times = []
+        for _ in range(repeat) :
+            run = evaluate(engine, source)
+            start = time.perf_counter()
+            result = run()
+            times.append(time.perf_counter() - start)
+
+        if(expected is None) :
+            expected = result.value
+        assert result.value == expected, (engine, result.value, expected)
+
+        entry['evaluate_ms'][engine] = { 'best' : min(times) * 1000, 'median' : statistics.median(times) * 1000 }
+
+    entry['result'] = expected
+    return entry
+
+def timings(entry : dict) -> dict :
+
+    # flat name -> best time of one entry, for printing and comparing
+    flat = { 'tokenize' : entry['tokenize_ms']['best'], 'parse' : entry['parse_ms']['best'] }
+    for (engine, times) in entry['evaluate_ms'].items() :
+        flat[f'evaluate:{engine}'] = times['best']
+    return flat
+
+def report(results : list, baseline : dict = None) -> None :
+
+    # baseline : (shape, size) -> entry of an earlier run
+    for entry in results :
+        key = (entry['shape'], entry['size'])
+        old = timings(baseline[key]) if baseline and key in baseline else {}
+
+        print(f'\n{entry["shape"]} x {entry["size"]} ({entry["chars"]} chars, {entry["tokens"]} tokens)')
+        for (name, best) in timings(entry).items() :
+            line = f'  {name:<18} {best:10.2f} ms'
+            if(name in old) :
+                line += f'   was {old[name]:10.2f} ms ({best / old[name]:.2f}x)'
+            print(line)
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='100,1000', help='comma separated program sizes')
+    ap.add_argument('--shapes', default=','.join(list(SHAPES.keys()) + ['mixed']), help='comma separated shapes')
+    ap.add_argument('--engines', default='tree,vm,closure', help='comma separated engines')
+    ap.add_argument('--depth', type=int, default=8, help='expression nesting / call chain length')
+    ap.add_argument('--width', type=int, default=16, help='keys per object')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--output', default=None, help='JSON file to write the results to')
+    ap.add_argument('--compare', default=None, help='JSON file of an earlier run to compare with')
+    args = ap.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    shapes = args.shapes.split(',')
+    engines = args.engines.split(',')
+
+    for engine in engines :
+        if(engine not in ENGINES) :
+            ap.error(f'unknown engine {engine}')
+
+    results = [bench(shape, size, engines, args.repeat, args.depth, args.width) for shape in shapes for size in sizes]
+
+    baseline = None
+    if(args.compare) :
+        f = open(args.compare, 'r')
+        baseline = { (entry['shape'], entry['size']) : entry for entry in json.load(f)['results'] }
+        f.close()
+
+    report(results, baseline)
+
+    if(args.output) :
+        run = {
+            'commit' : commit(),
+            'date' : datetime.now(timezone.utc).isoformat(),
+            'python' : platform.python_version(),
+            'platform' : platform.platform(),
+            'options' : vars(args),
+            'results' : results,
+        }
+        f = open(args.output, 'w')
+        json.dump(run, f, indent=2)
+        f.close()
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,76 @@
+'''
+    Arithmetic benchmark for the unboxed closure engine
+
+    Runs a numeric heavy script (a long chain of calls to small arithmetic
+    functions, nothing but locals and numbers) on the boxed closure engine
+    and on the unboxed one and reports the time each takes to evaluate it.
+    Both results are checked to be the same number.
+
+    usage (from the repo root) :
+
+        python benchmarks/unboxed_arith.py [--calls N] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from frontend.parser import Parser
+from runtime.closure import ClosureInterpreter
+from runtime.unboxed import UnboxedInterpreter
+from runtime.environment import create_global_env
+
+def make_source(calls : int) -> str :
+
+    lines = [
+        'fn poly(x) { let a = x * x; let b = a * x - 3 * a + 2 * x - 7; (b % 1000) / 3 + a / (x + 1) }',
+        'fn mix(x, y) { let s = poly(x) + poly(y); let d = s - x * y; d / 2 + (s % 17) }',
+        'let total = 0;',
+    ]
+
+    for i in range(calls) :
+        lines.append(f'total = total + mix({i % 97}, {i % 13 + 1})')
+
+    lines.append('total')
+    return '\n'.join(lines)
+
+def measure(engine, program, repeat : int) -> tuple :
+
+    best = None
+    result = None
+    for _ in range(repeat) :
+        interpreter = engine(create_global_env())
+        interpreter.compile(program)
+
+        start = time.perf_counter()
+        result = interpreter.evaluate(program)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return (best, result)
+
+def main() :
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    program = Parser().generate_ast(make_source(args.calls))
+
+    (boxed, boxed_result) = measure(ClosureInterpreter, program, args.repeat)
+    (unboxed, unboxed_result) = measure(UnboxedInterpreter, program, args.repeat)
+
+    assert boxed_result.value == unboxed_result.value, (boxed_result.value, unboxed_result.value)
+
+    print(f'calls            : {args.calls}')
+    print(f'boxed closures   : {boxed * 1000:.1f} ms')
+    print(f'unboxed closures : {unboxed * 1000:.1f} ms')
+    print(f'speedup          : {boxed / unboxed:.2f}x')
+
+if __name__ == '__main__' :
+    main()
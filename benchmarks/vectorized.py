@@ -0,0 +1,101 @@
+'''
+    Vectorized array arithmetic benchmark
+
+    Times prices * 6 / 5 + fee and sum(prices) on an array of --size numbers
+    handed in by the host, run by the tree walking interpreter :
+
+        numpy           runtime/vectorized.py with NumPy (when installed)
+        python          the same, with NumPy switched off
+        boxed           what the same work costs one element at a time, the
+                        way a NanoScript-level loop would do it : a NumberVal
+                        per element and per operator
+
+    All three must give the same result.
+
+    usage (from the repo root) :
+
+        python benchmarks/vectorized.py [--size N] [--repeat N]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import runtime.vectorized as vectorized
+from frontend.parser import Parser
+from runtime.interpreter import Interpreter
+from runtime.environment import create_global_env
+from runtime.values.convert import to_runtime
+from runtime.values.make import make_number
+
+SOURCE = 'let total = prices * 6 / 5 + fee; sum(total)'
+
+def best(fn, repeat : int) -> tuple :
+    times = []
+    result = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+def script(prices) :
+
+    program = Parser().generate_ast(SOURCE)
+
+    def run() :
+        env = create_global_env()
+        env.decl_var('prices', prices, True)
+        env.decl_var('fee', make_number(2.0), True)
+        return Interpreter(env).evaluate(program).value
+
+    return run
+
+def boxed(prices) :
+
+    # one NumberVal per element and per operator, summed in order
+    def run() :
+        fee = make_number(2.0)
+        six = make_number(6.0)
+        five = make_number(5.0)
+        total = 0.0
+        for value in prices.elements() :
+            total += make_number(make_number(make_number(value.value * six.value).value / five.value).value + fee.value).value
+        return total
+
+    return run
+
+def main() :
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--size', type=int, default=1000000)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    prices = to_runtime([float(i % 1000) for i in range(args.size)])
+    numpy = vectorized.numpy
+    results = {}
+
+    print(f'{SOURCE}  ({args.size} elements)\n')
+
+    if(numpy is not None) :
+        (elapsed, results['numpy']) = best(script(prices), args.repeat)
+        print(f'numpy    {elapsed * 1000:10.2f} ms')
+
+    vectorized.numpy = None
+    (elapsed, results['python']) = best(script(prices), args.repeat)
+    vectorized.numpy = numpy
+    print(f'python   {elapsed * 1000:10.2f} ms')
+
+    (elapsed, results['boxed']) = best(boxed(prices), max(1, args.repeat // 2))
+    print(f'boxed    {elapsed * 1000:10.2f} ms')
+
+    # sums can differ in the last bits : NumPy adds pairwise, the others in order
+    for (name, result) in results.items() :
+        assert abs(result - results['python']) <= 1e-9 * abs(results['python']), (name, result, results['python'])
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,242 @@
+import io
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional
+
+from nanoscript import Engine, ENGINES, GOVERNED_ENGINES
+from runtime.governor import Budget
+from frontend.cache import ASTCache
+from utils.errors import NanoScriptError
+
+'''
+
+    - runs a batch of independent scripts in parallel, on a pool of worker
+      processes :
+
+            python batch.py ../tests 'scripts/*.ns' --workers 8 --output results.jsonl
+
+    - targets are script files, directories (every file matching --pattern
+      in them) or glob patterns
+    - each worker builds one Engine when it starts (imports, prelude) and
+      reuses it for every script it is handed, so a script costs a compile
+      and a run, not a process. compiled ASTs go to the .nsc cache like
+      repl.py, so an unchanged script is not parsed again on the next batch
+    - one JSON object per script is written as soon as it finishes (so in
+      completion order, "index" is the position in the batch) :
+
+            {"index", "path", "status", "result", "error", "output", "compile_ms", "run_ms"}
+
+      status is "ok", "error" (a NanoScriptError, the script's own fault) or
+      "crash" (anything else, including the worker process dying). output is
+      whatever the script printed
+    - --fuel, --timeout, --max-depth and --max-allocations put every script
+      under a Budget (tree and vm engines), so a runaway script ends with an
+      "error" record instead of holding its worker. the record then also
+      has a "usage" entry
+    - one script failing never affects the others. if a worker process dies
+      the pool is rebuilt, and the scripts that were still pending are run
+      again one at a time to find the one that took it down
+
+'''
+
+# ------------------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------------------
+
+# one per worker process, built by _init_worker
+_engine : Optional[Engine] = None
+
+def _init_worker(engine : str, optimize : bool, cache_dir : Optional[str], write_cache : bool, budget : Optional[Budget]) -> None :
+
+    global _engine
+    _engine = Engine(engine, optimize, cache=ASTCache(cache_dir=cache_dir, write=write_cache), budget=budget)
+
+    # warm up : the first compile / run pays for lazily built tables and caches
+    _engine.run(_engine.compile('fn warm(x) { x * 2 } let w = { a : warm(1) }; w'))
+
+def jsonable(value : Any) -> Any :
+
+    if(value is None or isinstance(value, (bool, int, float, str))) :
+        return value
+    if(isinstance(value, dict)) :
+        return { key : jsonable(item) for (key, item) in value.items() }
+    if(isinstance(value, list)) :
+        return [jsonable(item) for item in value]
+
+    # functions and other values without a Python counterpart
+    return repr(value)
+
+def _error(err : BaseException) -> Dict[str, str] :
+    return { 'type' : type(err).__name__, 'message' : str(err) }
+
+def run_script(index : int, path : str) -> Dict[str, Any] :
+
+    record = {
+        'index' : index, 'path' : path, 'status' : 'ok', 'result' : None,
+        'error' : None, 'output' : '', 'compile_ms' : None, 'run_ms' : None,
+    }
+
+    output = io.StringIO()
+
+    try :
+        with contextlib.redirect_stdout(output) :
+            start = time.perf_counter()
+            compiled = _engine.compile_file(path)
+            record['compile_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+            start = time.perf_counter()
+            result = _engine.run(compiled)
+            record['run_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+        record['result'] = jsonable(result)
+
+    except NanoScriptError as err :
+        record['status'] = 'error'
+        record['error'] = _error(err)
+
+    except Exception as err :
+        record['status'] = 'crash'
+        record['error'] = _error(err)
+        record['error']['traceback'] = traceback.format_exc()
+
+    record['output'] = output.getvalue()
+
+    if(_engine.governor is not None and record['compile_ms'] is not None) :
+        record['usage'] = _engine.governor.usage()
+
+    return record
+
+# ------------------------------------------------------------------------------
+# Host side
+# ------------------------------------------------------------------------------
+
+def collect_scripts(targets : List[str], pattern : str = '*.txt') -> List[str] :
+
+    paths = []
+    for target in targets :
+        if(os.path.isdir(target)) :
+            matches = glob.glob(os.path.join(target, '**', pattern), recursive=True)
+        elif(os.path.isfile(target)) :
+            matches = [target]
+        else :
+            matches = glob.glob(target, recursive=True)
+        paths.extend(sorted(path for path in matches if os.path.isfile(path)))
+
+    # a script given twice (eg. by a directory and a glob) runs once
+    return list(dict.fromkeys(paths))
+
+class BatchRunner() :
+
+    def __init__(
+            self, engine : str = 'closure', workers : Optional[int] = None, optimize : bool = False,
+            cache_dir : Optional[str] = None, write_cache : bool = True, budget : Optional[Budget] = None
+        ) -> None:
+
+        if(engine not in ENGINES) :
+            raise ValueError(f'Unknown engine {engine}. Available engines : {list(ENGINES.keys())}')
+        if(budget is not None and engine not in GOVERNED_ENGINES) :
+            raise ValueError(f'Budgets are only enforced by the {" and ".join(GOVERNED_ENGINES)} engines, not {engine}')
+
+        self.workers = workers or os.cpu_count() or 1
+        self.initargs = (engine, optimize, cache_dir, write_cache, budget)
+
+    def _pool(self, workers : int) -> ProcessPoolExecutor :
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=self.initargs)
+
+    def run(self, paths : List[str]) -> Iterator[Dict[str, Any]] :
+
+        # yields the record of every script as soon as it is done
+        pending = yield from self._run_pooled(list(enumerate(paths)))
+
+        if(pending) :
+            yield from self._run_isolated(pending)
+
+    def _run_pooled(self, jobs : List[tuple]) :
+
+        # returns the jobs that never finished because a worker died
+        pool = self._pool(self.workers)
+        futures = { pool.submit(run_script, index, path) : (index, path) for (index, path) in jobs }
+        pending = []
+
+        try :
+            while(futures) :
+                (done, _) = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done :
+                    job = futures.pop(future)
+                    try :
+                        yield future.result()
+                    except BrokenProcessPool :
+                        pending.append(job)
+        finally :
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        return sorted(pending)
+
+    def _run_isolated(self, jobs : List[tuple]) :
+
+        # one script at a time, so the one that kills the worker is known
+        pool = self._pool(1)
+
+        try :
+            for (index, path) in jobs :
+                try :
+                    yield pool.submit(run_script, index, path).result()
+                except BrokenProcessPool as err :
+                    yield {
+                        'index' : index, 'path' : path, 'status' : 'crash', 'result' : None,
+                        'error' : { 'type' : type(err).__name__, 'message' : 'worker process died while running the script' },
+                        'output' : '', 'compile_ms' : None, 'run_ms' : None,
+                    }
+                    pool.shutdown(wait=True)
+                    pool = self._pool(1)
+        finally :
+            pool.shutdown(wait=True)
+
+if __name__ == '__main__' :
+
+    ap = argparse.ArgumentParser(description='Run many NanoScript scripts in parallel')
+    ap.add_argument('targets', nargs='+', help='scripts, directories or glob patterns')
+    ap.add_argument('--pattern', default='*.txt', help='files picked up in directories (default : *.txt)')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='closure', help='execution engine')
+    ap.add_argument('--workers', type=int, default=None, help='worker processes (default : one per core)')
+    ap.add_argument('--optimize', action='store_true', help='run the AST optimizer before executing')
+    ap.add_argument('--cache-dir', default=None, metavar='DIR', help='where .nsc files go (default : __nscache__ next to each script)')
+    ap.add_argument('--no-cache', action='store_true', help='do not write .nsc files')
+    ap.add_argument('--output', default=None, help='JSONL file to write to (default : stdout)')
+    ap.add_argument('--fuel', type=int, default=None, help='units of work a script may use (nodes / instructions)')
+    ap.add_argument('--timeout', type=float, default=None, metavar='SECONDS', help='wall clock time a script may run for')
+    ap.add_argument('--max-depth', type=int, default=None, help='nested calls a script may make')
+    ap.add_argument('--max-allocations', type=int, default=None, help='values and scopes a script may create')
+    args = ap.parse_args()
+
+    budget = None
+    if(any(limit is not None for limit in (args.fuel, args.timeout, args.max_depth, args.max_allocations))) :
+        budget = Budget(args.fuel, args.timeout, args.max_depth, args.max_allocations)
+
+    paths = collect_scripts(args.targets, args.pattern)
+    runner = BatchRunner(args.engine, args.workers, args.optimize, args.cache_dir, not args.no_cache, budget)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    counts = { 'ok' : 0, 'error' : 0, 'crash' : 0 }
+    start = time.perf_counter()
+
+    try :
+        for record in runner.run(paths) :
+            counts[record['status']] += 1
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally :
+        if(out is not sys.stdout) :
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed else 0
+    print(f'{len(paths)} scripts in {elapsed:.2f} s ({rate:.1f} / s) with {runner.workers} workers: {counts}', file=sys.stderr)
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import sys
+from typing import List, Optional, Set
 from enum import Enum
 from abc import ABC
 
@@ -9,18 +10,23 @@ class NodeType(Enum):
     Program = "Program"
     VariableDecl = "VariableDecl"
     FunctionDecl = "FunctionDecl"
+    WhileStmt = "WhileStmt"
+    ForStmt = "ForStmt"
 
     # Expressions
     AssignmentExpr = "AssignmentExpr"
     BinaryExpr = "BinaryExpr"
     MemberExpr = "MemberExpr"
     CallExpr = "CallExpr"
+    SliceExpr = "SliceExpr"
 
     # Literals
     Identifier = "Identifier"
     NumericalLiteral = "NumericLiteral"
+    StringLiteral = "StringLiteral"
     PropertyLiteral = "PropertyLiteral"
     ObjectLiteral = "ObjectLiteral" 
+    ArrayLiteral = "ArrayLiteral"
 
 
 # ------------------------------------------------------------------------------
@@ -28,6 +34,8 @@ class NodeType(Enum):
 # ------------------------------------------------------------------------------
 
 class Stmt(ABC):
+    __slots__ = ('kind', '__weakref__')
+
     def __init__(self, kind: NodeType):
         self.kind = kind
 
@@ -35,6 +43,8 @@ class Stmt(ABC):
         return {'kind': self.kind.value}
 
 class Program(Stmt):
+    __slots__ = ('body',)
+
     def __init__(self):
         super().__init__(NodeType.Program)
         self.body: List[Stmt] = []
@@ -43,38 +53,148 @@ class Program(Stmt):
         body = [stmt.to_dict() for stmt in self.body]
         return {'kind': self.kind.value, 'body': body}
 
+    @classmethod
+    def from_dict(cls, d):
+        program = cls()
+        program.body = [node_from_dict(stmt) for stmt in d['body']]
+        return program
+
 class VariableDecl(Stmt):
+    __slots__ = ('identifier', 'value', 'constant', 'address')
+
     def __init__(self, identifier: str, value: 'Expr', constant: bool) -> None:
         super().__init__(NodeType.VariableDecl)
         self.identifier = identifier
         self.value = value 
         self.constant = constant
 
+        # (depth, slot) filled in by frontend/resolver.py. None for globals
+        self.address = None
+
     def to_dict(self):
         # print('REACHED : ', self.value)
         value = self.value.to_dict() if self.value is not None else None
         return {'kind': self.kind.value, 'identifier': self.identifier, 'value': value, 'constant': self.constant}
 
+    @classmethod
+    def from_dict(cls, d):
+        value = node_from_dict(d['value']) if d['value'] is not None else None
+        return cls(d['identifier'], value, d['constant'])
+
 class FunctionDecl(Stmt):
+    __slots__ = ('name', 'parameters', 'body', 'compiled', 'address', 'frame_size', 'pure')
+
     def __init__(self, name : str, parameters: List[str], body : List[Stmt]) -> None:
         super().__init__(NodeType.FunctionDecl)
         self.name = name
         self.parameters = parameters
         self.body = body
 
+        # compiled bodies, filled in (once per compiler mode) by runtime/closure.py
+        self.compiled = {}
+
+        # filled in by frontend/resolver.py : where the function name lives
+        # and how many slots a call frame of this function needs
+        self.address = None
+        self.frame_size = 0
+
+        # filled in by frontend/purity.py
+        self.pure = False
+
     def to_dict(self):
         body = [stmt.to_dict() for stmt in self.body]
         return {'kind': self.kind.value, 'name': self.name, 'parameters': self.parameters, 'body': body}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['name'], list(d['parameters']), [node_from_dict(stmt) for stmt in d['body']])
+
+class WhileStmt(Stmt):
+    __slots__ = ('condition', 'body', 'invariants', 'frame_size', 'captures')
+
+    def __init__(self, condition : 'Expr', body : List[Stmt]) -> None:
+        super().__init__(NodeType.WhileStmt)
+        self.condition = condition
+        self.body = body
+
+        # declarations hoisted out of the body by frontend/optimizer.py :
+        # they run once, before the first iteration
+        self.invariants : List[VariableDecl] = []
+
+        # slots of the loop's scope, filled in by frontend/resolver.py
+        self.frame_size = 0
+
+        # whether an iteration's scope can outlive it, see captures_scope
+        self.captures = None
+
+    def to_dict(self):
+        body = [stmt.to_dict() for stmt in self.body]
+        invariants = [decl.to_dict() for decl in self.invariants]
+        return {'kind': self.kind.value, 'condition': self.condition.to_dict(), 'body': body, 'invariants': invariants}
+
+    @classmethod
+    def from_dict(cls, d):
+        loop = cls(node_from_dict(d['condition']), [node_from_dict(stmt) for stmt in d['body']])
+        loop.invariants = [node_from_dict(decl) for decl in d.get('invariants', ())]
+        return loop
+
+class ForStmt(Stmt):
+    __slots__ = ('variable', 'start', 'end', 'body', 'invariants', 'address', 'frame_size', 'bound', 'captures', 'escapes')
+
+    def __init__(self, variable : str, start : 'Expr', end : 'Expr', body : List[Stmt]) -> None:
+        super().__init__(NodeType.ForStmt)
+
+        # for (variable in start : end) { body } : variable goes from start
+        # up to, but not including, end in steps of 1
+        self.variable = variable
+        self.start = start
+        self.end = end
+        self.body = body
+
+        # same as WhileStmt
+        self.invariants : List[VariableDecl] = []
+
+        # filled in by frontend/resolver.py : where the variable lives and
+        # how many slots the loop's scope needs
+        self.address = None
+        self.frame_size = 0
+
+        # whether the body can see the variable at all, see binds_variable,
+        # and the same as WhileStmt
+        self.bound = None
+        self.captures = None
+
+        # whether the variable's value can outlive its iteration, see
+        # counter_escapes
+        self.escapes = None
+
+    def to_dict(self):
+        body = [stmt.to_dict() for stmt in self.body]
+        invariants = [decl.to_dict() for decl in self.invariants]
+        return {
+            'kind': self.kind.value, 'variable': self.variable, 'start': self.start.to_dict(), 'end': self.end.to_dict(),
+            'body': body, 'invariants': invariants
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        loop = cls(sys.intern(d['variable']), node_from_dict(d['start']), node_from_dict(d['end']), [node_from_dict(stmt) for stmt in d['body']])
+        loop.invariants = [node_from_dict(decl) for decl in d.get('invariants', ())]
+        return loop
+
 # ------------------------------------------------------------------------------
 # Expressions 
 # ------------------------------------------------------------------------------
 
 class Expr(Stmt):
+    __slots__ = ()
+
     def __init__(self, kind: NodeType):
         super().__init__(kind)
 
 class BinaryExpr(Expr):
+    __slots__ = ('left', 'right', 'operator')
+
     def __init__(self, left: Expr, right: Expr, operator: str):
         super().__init__(NodeType.BinaryExpr)
         self.left = left
@@ -84,7 +204,13 @@ class BinaryExpr(Expr):
     def to_dict(self):
         return {'kind': self.kind.value, 'left': self.left.to_dict(), 'right': self.right.to_dict(), 'operator': self.operator}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(node_from_dict(d['left']), node_from_dict(d['right']), d['operator'])
+
 class AssignmentExpr(Expr):
+    __slots__ = ('assignee', 'value', 'address')
+
     def __init__(self, assignee : Expr, value : Expr):
         super().__init__(NodeType.AssignmentExpr)
 
@@ -92,19 +218,38 @@ class AssignmentExpr(Expr):
         self.assignee = assignee
         self.value = value
 
+        # (depth, slot) of the assignee, filled in by frontend/resolver.py
+        self.address = None
+
     def to_dict(self):
         value = self.value.to_dict() if self.value is not None else None
         return {'kind': self.kind.value, 'assignee': self.assignee.to_dict(), 'value': value}
 
+    @classmethod
+    def from_dict(cls, d):
+        value = node_from_dict(d['value']) if d['value'] is not None else None
+        return cls(node_from_dict(d['assignee']), value)
+
 class Identifier(Expr):
+    __slots__ = ('symbol', 'address')
+
     def __init__(self, symbol: str):
         super().__init__(NodeType.Identifier)
         self.symbol = symbol
 
+        # (depth, slot) filled in by frontend/resolver.py. None for globals
+        self.address = None
+
     def to_dict(self):
         return {'kind': self.kind.value, 'symbol': self.symbol}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['symbol'])
+
 class CallExpr(Expr):
+    __slots__ = ('args', 'caller')
+
     def __init__(self, args : List[Expr], caller : Expr):
         super().__init__(NodeType.CallExpr)
         self.args = args
@@ -116,7 +261,13 @@ class CallExpr(Expr):
         args = [arg.to_dict() for arg in self.args]
         return {'kind': self.kind.value, 'args' : args, 'caller' : self.caller.to_dict()}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls([node_from_dict(arg) for arg in d['args']], node_from_dict(d['caller']))
+
 class MemberExpr(Expr):
+    __slots__ = ('object', 'property', 'computed', 'cache')
+
     def __init__(self, object: Expr, property : Expr, computed : bool):
         super().__init__(NodeType.MemberExpr)
         self.object = object
@@ -125,9 +276,39 @@ class MemberExpr(Expr):
         # for cases like foo["bar"]() or foo[baz()]()
         self.computed = computed
 
+        # inline cache for this access site (runtime/values/shape.py), 
+        # created the first time the interpreter evaluates it
+        self.cache = None
+
     def to_dict(self):
         return {'kind': self.kind.value, 'object' : self.object.to_dict(), 'property' : self.property.to_dict(), 'computed' : self.computed}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(node_from_dict(d['object']), node_from_dict(d['property']), d['computed'])
+
+class SliceExpr(Expr):
+    __slots__ = ('object', 'start', 'end')
+
+    def __init__(self, object: Expr, start : Optional[Expr], end : Optional[Expr]):
+        super().__init__(NodeType.SliceExpr)
+        self.object = object
+
+        # a[start:end], either bound can be left out (a[:end], a[start:])
+        self.start = start
+        self.end = end
+
+    def to_dict(self):
+        start = self.start.to_dict() if self.start is not None else None
+        end = self.end.to_dict() if self.end is not None else None
+        return {'kind': self.kind.value, 'object' : self.object.to_dict(), 'start' : start, 'end' : end}
+
+    @classmethod
+    def from_dict(cls, d):
+        start = node_from_dict(d['start']) if d['start'] is not None else None
+        end = node_from_dict(d['end']) if d['end'] is not None else None
+        return cls(node_from_dict(d['object']), start, end)
+
 
 # ------------------------------------------------------------------------------
 # Literals 
@@ -135,24 +316,64 @@ class MemberExpr(Expr):
 
 
 class NumericLiteral(Expr):
+    __slots__ = ('value', 'runtime_value')
+
     def __init__(self, value: float):
         super().__init__(NodeType.NumericalLiteral)
         self.value = value
 
+        # the NumberVal for this literal, built once by the interpreter
+        self.runtime_value = None
+
+    def to_dict(self):
+        return {'kind': self.kind.value, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['value'])
+
+class StringLiteral(Expr):
+    __slots__ = ('value', 'runtime_value')
+
+    def __init__(self, value: str):
+        super().__init__(NodeType.StringLiteral)
+
+        # interned by the lexer
+        self.value = value
+
+        # the StringVal for this literal, built once by the interpreter
+        self.runtime_value = None
+
     def to_dict(self):
         return {'kind': self.kind.value, 'value': self.value}
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(sys.intern(d['value']))
+
 class PropertyLiteral(Expr):
+    __slots__ = ('key', 'value', 'address')
+
     def __init__(self, key : str, value : Optional[Expr] = None):
         super().__init__(NodeType.PropertyLiteral)
         self.key = key
         self.value = value
 
+        # (depth, slot) of the variable used by the short hand { key }
+        self.address = None
+
     def to_dict(self):
         value = self.value.to_dict() if self.value is not None else None
-        return {'kind': self.kind.value, 'value': self.value.to_dict()}
+        return {'kind': self.kind.value, 'key': self.key, 'value': value}
+
+    @classmethod
+    def from_dict(cls, d):
+        value = node_from_dict(d['value']) if d['value'] is not None else None
+        return cls(sys.intern(d['key']), value)
 
 class ObjectLiteral(Expr):
+    __slots__ = ('properties',)
+
     def __init__(self, properties: List[PropertyLiteral]):
         super().__init__(NodeType.ObjectLiteral)
         self.properties = properties
@@ -160,3 +381,176 @@ class ObjectLiteral(Expr):
     def to_dict(self):
         properties = [prop.to_dict() for prop in self.properties]
         return {'kind': self.kind.value, 'properties': properties}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls([node_from_dict(prop) for prop in d['properties']])
+
+class ArrayLiteral(Expr):
+    __slots__ = ('elements',)
+
+    def __init__(self, elements: List[Expr]):
+        super().__init__(NodeType.ArrayLiteral)
+        self.elements = elements
+
+    def to_dict(self):
+        elements = [element.to_dict() for element in self.elements]
+        return {'kind': self.kind.value, 'elements': elements}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls([node_from_dict(element) for element in d['elements']])
+
+
+# ------------------------------------------------------------------------------
+# Traversal 
+# ------------------------------------------------------------------------------
+
+# fields of each node that hold child nodes (either a node, a list of nodes or None)
+CHILD_FIELDS = {
+    NodeType.Program : ('body',),
+    NodeType.VariableDecl : ('value',),
+    NodeType.FunctionDecl : ('body',),
+    NodeType.WhileStmt : ('invariants', 'condition', 'body'),
+    NodeType.ForStmt : ('start', 'end', 'invariants', 'body'),
+    NodeType.AssignmentExpr : ('assignee', 'value'),
+    NodeType.BinaryExpr : ('left', 'right'),
+    NodeType.CallExpr : ('args', 'caller'),
+    NodeType.MemberExpr : ('object', 'property'),
+    NodeType.SliceExpr : ('object', 'start', 'end'),
+    NodeType.PropertyLiteral : ('value',),
+    NodeType.ObjectLiteral : ('properties',),
+    NodeType.ArrayLiteral : ('elements',),
+}
+
+def iter_children(node : Stmt):
+    for field in CHILD_FIELDS.get(node.kind, ()) :
+        child = getattr(node, field)
+        if(isinstance(child, list)) :
+            yield from child
+        elif(child is not None) :
+            yield child
+
+def count_nodes(node : Stmt) -> int :
+    count = 0
+    stack = [node]
+    while(stack) :
+        current = stack.pop()
+        count += 1
+        stack.extend(iter_children(current))
+    return count
+
+def mentions(nodes : List[Stmt], name : str) -> bool :
+
+    # whether name is read, written or declared anywhere in the nodes,
+    # nested functions included. o.name counts too : it only has to err on
+    # the safe side
+    stack = list(nodes)
+    while(stack) :
+        node = stack.pop()
+        kind = node.kind
+
+        if(kind == NodeType.Identifier and node.symbol == name) :
+            return True
+        elif(kind == NodeType.VariableDecl and node.identifier == name) :
+            return True
+        elif(kind == NodeType.FunctionDecl and (node.name == name or name in node.parameters)) :
+            return True
+        elif(kind == NodeType.PropertyLiteral and node.value is None and node.key == name) :
+            return True
+        elif(kind == NodeType.ForStmt and node.variable == name) :
+            return True
+
+        stack.extend(iter_children(node))
+
+    return False
+
+def binds_variable(loop : ForStmt) -> bool :
+
+    # a loop whose body never mentions its variable runs without binding
+    # it, so counting costs nothing but the counter itself
+    if(loop.bound is None) :
+        loop.bound = mentions(loop.body, loop.variable)
+    return loop.bound
+
+def captures_scope(loop : Stmt) -> bool :
+
+    # a function declared in the body keeps the scope it was declared in,
+    # and can outlive the iteration that declared it (h = g). such a loop
+    # runs every iteration in a scope of its own, the others reuse one
+    if(loop.captures is None) :
+        loop.captures = _declares_function(loop.body)
+    return loop.captures
+
+def _declares_function(nodes : List[Stmt]) -> bool :
+    stack = list(nodes)
+    while(stack) :
+        node = stack.pop()
+        if(node.kind == NodeType.FunctionDecl) :
+            return True
+        stack.extend(iter_children(node))
+    return False
+
+def counter_escapes(loop : ForStmt) -> bool :
+
+    # whether the body keeps the variable's value beyond the expression
+    # reading it (let a = i, f(i), { i }, a function ...). if all it does is
+    # compute with the number (i * 2, a[i], a[i : n]), the engines that box
+    # numbers can bind one NumberVal for the whole run and update it
+    if(loop.escapes is None) :
+        loop.escapes = _escapes(loop.body, loop.variable)
+    return loop.escapes
+
+def _escapes(nodes : List[Stmt], name : str) -> bool :
+
+    # a parent is always seen before its children
+    used : Set[int] = set()
+    stack = list(nodes)
+    while(stack) :
+        node = stack.pop()
+        kind = node.kind
+
+        if(kind == NodeType.Identifier) :
+            if(node.symbol == name and id(node) not in used) :
+                return True
+        elif(kind == NodeType.BinaryExpr) :
+            used.update((id(node.left), id(node.right)))
+        elif(kind == NodeType.MemberExpr and node.computed) :
+            used.add(id(node.property))
+        elif(kind == NodeType.SliceExpr) :
+            used.update((id(node.start), id(node.end)))
+        elif(kind == NodeType.FunctionDecl) :
+            return True
+        elif(kind == NodeType.VariableDecl and node.identifier == name) :
+            return True
+        elif(kind == NodeType.PropertyLiteral and node.value is None and node.key == name) :
+            return True
+        elif(kind == NodeType.ForStmt and node.variable == name) :
+            return True
+
+        stack.extend(iter_children(node))
+
+    return False
+
+NODE_CLASSES = {
+    NodeType.Program : Program,
+    NodeType.VariableDecl : VariableDecl,
+    NodeType.FunctionDecl : FunctionDecl,
+    NodeType.WhileStmt : WhileStmt,
+    NodeType.ForStmt : ForStmt,
+    NodeType.AssignmentExpr : AssignmentExpr,
+    NodeType.BinaryExpr : BinaryExpr,
+    NodeType.CallExpr : CallExpr,
+    NodeType.MemberExpr : MemberExpr,
+    NodeType.SliceExpr : SliceExpr,
+    NodeType.Identifier : Identifier,
+    NodeType.NumericalLiteral : NumericLiteral,
+    NodeType.StringLiteral : StringLiteral,
+    NodeType.PropertyLiteral : PropertyLiteral,
+    NodeType.ObjectLiteral : ObjectLiteral,
+    NodeType.ArrayLiteral : ArrayLiteral,
+}
+
+def node_from_dict(d) -> Stmt :
+    # inverse of to_dict : node_from_dict(node.to_dict()) rebuilds the node
+    return NODE_CLASSES[NodeType(d['kind'])].from_dict(d)
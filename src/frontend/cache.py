@@ -0,0 +1,462 @@
+import os
+import gc
+import sys
+import marshal
+import hashlib
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+from .ast import *
+from .parser import Parser
+
+'''
+
+    - compiled AST cache, the .pyc of NanoScript. a parsed Program is
+      written to a .nsc file and loaded back without running the lexer or
+      the parser again
+    - an .nsc file is :
+
+            MAGIC (4 bytes) | FORMAT_VERSION (2 bytes) | sha256 of the source (32 bytes) | payload
+
+      the payload is the tree flattened (see Encoder) into four streams,
+      serialized with marshal :
+
+            ops         one byte per node, its NODE_CODE, children first
+            strings     every distinct name and string literal, once. they
+                        are interned again when loaded, like the lexer does
+            ints        string indexes, counts and flags, as array bytes of
+                        the narrowest type that fits (typecode stored too)
+            floats      numeric literals, as array('d') bytes
+
+      a file whose magic, version or hash does not match the current source
+      is ignored (and rewritten)
+    - by default the file goes into a __nscache__ directory next to the
+      source, like __pycache__. pass cache_dir to keep them all in one place
+    - in front of the files sits an in-process LRU keyed by the same hash,
+      so parsing the same source twice in one process is a lookup. it keeps
+      the encoded tree and decodes a fresh Program on every hit, since the
+      optimizer and the engines annotate / rewrite the Program they are given
+
+'''
+
+MAGIC = b'NSC\x00'
+
+# bump whenever the encoding below or the AST changes shape
+FORMAT_VERSION = 4
+
+HEADER_SIZE = len(MAGIC) + 2 + 32
+
+# node codes used in the payload
+(
+    PROGRAM, VARIABLE_DECL, FUNCTION_DECL, ASSIGNMENT_EXPR, BINARY_EXPR, MEMBER_EXPR,
+    CALL_EXPR, IDENTIFIER, NUMERIC_LITERAL, PROPERTY_LITERAL, OBJECT_LITERAL, SLICE_EXPR,
+    ARRAY_LITERAL, STRING_LITERAL, WHILE_STMT, FOR_STMT
+) = range(16)
+
+def source_hash(source : str) -> bytes :
+    return hashlib.sha256(source.encode('utf-8')).digest()
+
+class Encoder() :
+
+    # flattens a tree into the streams of the payload, children first
+    # (post order) so that the decoder can rebuild it with a plain stack
+
+    def __init__(self) -> None:
+        self.ops = bytearray()
+        self.ints = array('I')
+        self.floats = array('d')
+        self.strings : Dict[str, int] = {}
+
+    def _string(self, value : str) -> None :
+        index = self.strings.get(value)
+        if(index is None) :
+            index = len(self.strings)
+            self.strings[value] = index
+        self.ints.append(index)
+
+    def encode(self, node : Stmt) -> tuple :
+        self._encode(node)
+
+        # ints are stored as narrow as the largest one allows
+        largest = max(self.ints, default=0)
+        typecode = 'B' if largest < (1 << 8) else 'H' if largest < (1 << 16) else 'I'
+        ints = array(typecode, self.ints)
+
+        return (bytes(self.ops), tuple(self.strings), typecode, ints.tobytes(), self.floats.tobytes())
+
+    def _encode(self, node : Stmt) -> None :
+
+        kind = node.kind
+
+        if(kind == NodeType.Program) :
+            for stmt in node.body :
+                self._encode(stmt)
+            self.ops.append(PROGRAM)
+            self.ints.append(len(node.body))
+
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value is not None) :
+                self._encode(node.value)
+            self.ops.append(VARIABLE_DECL)
+            self._string(node.identifier)
+            self.ints.append(node.value is not None)
+            self.ints.append(node.constant)
+
+        elif(kind == NodeType.FunctionDecl) :
+            for stmt in node.body :
+                self._encode(stmt)
+            self.ops.append(FUNCTION_DECL)
+            self._string(node.name)
+            self.ints.append(len(node.parameters))
+            for param in node.parameters :
+                self._string(param)
+            self.ints.append(len(node.body))
+
+        elif(kind == NodeType.AssignmentExpr) :
+            self._encode(node.assignee)
+            self._encode(node.value)
+            self.ops.append(ASSIGNMENT_EXPR)
+
+        elif(kind == NodeType.BinaryExpr) :
+            self._encode(node.left)
+            self._encode(node.right)
+            self.ops.append(BINARY_EXPR)
+            self._string(node.operator)
+
+        elif(kind == NodeType.MemberExpr) :
+            self._encode(node.object)
+            self._encode(node.property)
+            self.ops.append(MEMBER_EXPR)
+            self.ints.append(node.computed)
+
+        elif(kind == NodeType.CallExpr) :
+            for arg in node.args :
+                self._encode(arg)
+            self._encode(node.caller)
+            self.ops.append(CALL_EXPR)
+            self.ints.append(len(node.args))
+
+        elif(kind == NodeType.Identifier) :
+            self.ops.append(IDENTIFIER)
+            self._string(node.symbol)
+
+        elif(kind == NodeType.NumericalLiteral) :
+            self.ops.append(NUMERIC_LITERAL)
+            self.floats.append(node.value)
+
+        elif(kind == NodeType.StringLiteral) :
+            self.ops.append(STRING_LITERAL)
+            self._string(node.value)
+
+        elif(kind == NodeType.PropertyLiteral) :
+            if(node.value is not None) :
+                self._encode(node.value)
+            self.ops.append(PROPERTY_LITERAL)
+            self._string(node.key)
+            self.ints.append(node.value is not None)
+
+        elif(kind == NodeType.ObjectLiteral) :
+            for prop in node.properties :
+                self._encode(prop)
+            self.ops.append(OBJECT_LITERAL)
+            self.ints.append(len(node.properties))
+
+        elif(kind == NodeType.SliceExpr) :
+            self._encode(node.object)
+            if(node.start is not None) :
+                self._encode(node.start)
+            if(node.end is not None) :
+                self._encode(node.end)
+            self.ops.append(SLICE_EXPR)
+            self.ints.append(node.start is not None)
+            self.ints.append(node.end is not None)
+
+        elif(kind == NodeType.ArrayLiteral) :
+            for element in node.elements :
+                self._encode(element)
+            self.ops.append(ARRAY_LITERAL)
+            self.ints.append(len(node.elements))
+
+        elif(kind == NodeType.WhileStmt) :
+            self._encode(node.condition)
+            for decl in node.invariants :
+                self._encode(decl)
+            for stmt in node.body :
+                self._encode(stmt)
+            self.ops.append(WHILE_STMT)
+            self.ints.append(len(node.invariants))
+            self.ints.append(len(node.body))
+
+        elif(kind == NodeType.ForStmt) :
+            self._encode(node.start)
+            self._encode(node.end)
+            for decl in node.invariants :
+                self._encode(decl)
+            for stmt in node.body :
+                self._encode(stmt)
+            self.ops.append(FOR_STMT)
+            self._string(node.variable)
+            self.ints.append(len(node.invariants))
+            self.ints.append(len(node.body))
+
+        else :
+            raise ValueError(f'cannot encode {kind}')
+
+def encode(program : Program) -> tuple :
+    return Encoder().encode(program)
+
+def decode(encoded : tuple) -> Program :
+
+    (ops, strings, typecode, ints, floats) = encoded
+    strings = tuple(map(sys.intern, strings))
+
+    int_stream = array(typecode)
+    int_stream.frombytes(ints)
+    float_stream = array('d')
+    float_stream.frombytes(floats)
+
+    next_int = iter(int_stream).__next__
+    next_float = iter(float_stream).__next__
+
+    stack : List[Stmt] = []
+    push = stack.append
+    pop = stack.pop
+
+    # every node pops its children and pushes itself. the tree is acyclic,
+    # so the cyclic gc has nothing to find : it is paused while the (many)
+    # nodes are created instead of scanning them over and over
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try :
+        for code in ops :
+            if(code == IDENTIFIER) :
+                push(Identifier(strings[next_int()]))
+
+            elif(code == NUMERIC_LITERAL) :
+                push(NumericLiteral(next_float()))
+
+            elif(code == STRING_LITERAL) :
+                push(StringLiteral(strings[next_int()]))
+
+            elif(code == BINARY_EXPR) :
+                right = pop()
+                push(BinaryExpr(pop(), right, strings[next_int()]))
+
+            elif(code == MEMBER_EXPR) :
+                prop = pop()
+                push(MemberExpr(pop(), prop, bool(next_int())))
+
+            elif(code == CALL_EXPR) :
+                caller = pop()
+                count = next_int()
+                args = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(CallExpr(args, caller))
+
+            elif(code == ASSIGNMENT_EXPR) :
+                value = pop()
+                push(AssignmentExpr(pop(), value))
+
+            elif(code == PROPERTY_LITERAL) :
+                key = strings[next_int()]
+                push(PropertyLiteral(key, pop() if next_int() else None))
+
+            elif(code == OBJECT_LITERAL) :
+                count = next_int()
+                properties = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(ObjectLiteral(properties))
+
+            elif(code == SLICE_EXPR) :
+                has_start = next_int()
+                end = pop() if next_int() else None
+                start = pop() if has_start else None
+                push(SliceExpr(pop(), start, end))
+
+            elif(code == ARRAY_LITERAL) :
+                count = next_int()
+                elements = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(ArrayLiteral(elements))
+
+            elif(code == VARIABLE_DECL) :
+                identifier = strings[next_int()]
+                value = pop() if next_int() else None
+                push(VariableDecl(identifier, value, bool(next_int())))
+
+            elif(code == FUNCTION_DECL) :
+                name = strings[next_int()]
+                parameters = [strings[next_int()] for _ in range(next_int())]
+                count = next_int()
+                body = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(FunctionDecl(name, parameters, body))
+
+            elif(code == WHILE_STMT) :
+                invariants = next_int()
+                count = next_int()
+                body = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                loop = WhileStmt(None, body)
+                loop.invariants = stack[len(stack) - invariants:]
+                del stack[len(stack) - invariants:]
+                loop.condition = pop()
+                push(loop)
+
+            elif(code == FOR_STMT) :
+                variable = strings[next_int()]
+                invariants = next_int()
+                count = next_int()
+                body = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                loop = ForStmt(variable, None, None, body)
+                loop.invariants = stack[len(stack) - invariants:]
+                del stack[len(stack) - invariants:]
+                loop.end = pop()
+                loop.start = pop()
+                push(loop)
+
+            elif(code == PROGRAM) :
+                count = next_int()
+                program = Program()
+                program.body = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(program)
+
+            else :
+                raise ValueError(f'unknown node code {code}')
+    finally :
+        if(enabled) :
+            gc.enable()
+
+    return pop()
+
+def dumps(encoded : tuple, digest : bytes) -> bytes :
+    return MAGIC + FORMAT_VERSION.to_bytes(2, 'little') + digest + marshal.dumps(encoded)
+
+def loads(data : bytes, digest : bytes) -> Optional[tuple] :
+
+    # None when the file was written for another source or format
+    if(len(data) < HEADER_SIZE or data[:4] != MAGIC) :
+        return None
+    if(int.from_bytes(data[4:6], 'little') != FORMAT_VERSION) :
+        return None
+    if(data[6:HEADER_SIZE] != digest) :
+        return None
+
+    try :
+        payload = marshal.loads(data[HEADER_SIZE:])
+    except (EOFError, ValueError, TypeError) :
+        return None
+
+    if(not isinstance(payload, tuple) or len(payload) != 5) :
+        return None
+
+    return payload
+
+class ASTCache() :
+
+    def __init__(self, cache_dir : Optional[str] = None, maxsize : int = 64, write : bool = True) -> None:
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self.write = write
+
+        # sha256 of the source -> encoded tree
+        self.entries : 'OrderedDict[bytes, tuple]' = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def cache_path(self, path : str) -> str :
+
+        if(self.cache_dir is not None) :
+            name = os.path.abspath(path).replace(os.sep, '_').strip('_')
+            return os.path.join(self.cache_dir, f'{name}.nsc')
+
+        (folder, name) = os.path.split(os.path.abspath(path))
+        return os.path.join(folder, '__nscache__', f'{name}.nsc')
+
+    def _remember(self, digest : bytes, encoded : tuple) -> None :
+        self.entries[digest] = encoded
+        self.entries.move_to_end(digest)
+        if(len(self.entries) > self.maxsize) :
+            self.entries.popitem(last=False)
+
+    def _parse(self, source : str, digest : bytes) -> tuple :
+
+        encoded = self.entries.get(digest)
+        if(encoded is not None) :
+            self.hits += 1
+            self.entries.move_to_end(digest)
+            return (encoded, None)
+
+        self.misses += 1
+        program = Parser().generate_ast(source)
+
+        try :
+            encoded = encode(program)
+        except RecursionError :
+            # too deeply nested to be cached, hand out the parsed tree as is
+            return (None, program)
+
+        self._remember(digest, encoded)
+        return (encoded, program)
+
+    def parse(self, source : str) -> Program :
+
+        # Parser().generate_ast(source), through the in-process LRU
+        (encoded, program) = self._parse(source, source_hash(source))
+        return program if program is not None else decode(encoded)
+
+    def load(self, path : str) -> Program :
+
+        # parses the file at path, through the LRU and the .nsc file next to it
+        f = open(path, 'r')
+        source = f.read()
+        f.close()
+
+        digest = source_hash(source)
+        nsc = self.cache_path(path)
+
+        if(digest not in self.entries) :
+            encoded = self._read(nsc, digest)
+            if(encoded is not None) :
+                self.disk_hits += 1
+                self._remember(digest, encoded)
+                return decode(encoded)
+
+        (encoded, program) = self._parse(source, digest)
+
+        # only a tree that was just parsed needs to be written out
+        if(program is not None and encoded is not None and self.write) :
+            self._write(nsc, encoded, digest)
+
+        return program if program is not None else decode(encoded)
+
+    def _read(self, nsc : str, digest : bytes) -> Optional[tuple] :
+
+        if(not os.path.exists(nsc)) :
+            return None
+
+        f = open(nsc, 'rb')
+        data = f.read()
+        f.close()
+
+        return loads(data, digest)
+
+    def _write(self, nsc : str, encoded : tuple, digest : bytes) -> None :
+
+        # write to a temporary file first so that a reader never sees half a file
+        try :
+            os.makedirs(os.path.dirname(nsc), exist_ok=True)
+            tmp = f'{nsc}.{os.getpid()}.tmp'
+            f = open(tmp, 'wb')
+            f.write(dumps(encoded, digest))
+            f.close()
+            os.replace(tmp, nsc)
+        except OSError :
+            # a read only checkout just runs without the cache
+            pass
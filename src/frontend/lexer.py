@@ -1,11 +1,16 @@
+import re
+import sys
+import mmap
+import codecs
 from enum import Enum, auto
-from typing import List, Dict
+from typing import List, Dict, Iterator
 
-from utils.match import isint, isalpha, isskippable
+from utils.errors import LexerError
 
 class TokenType(Enum) :
     Number = auto()
     Identifier = auto()
+    String = auto()
     
 
     # ( and )
@@ -33,13 +38,19 @@ class TokenType(Enum) :
     Let = auto()
     Const = auto()
     Fn = auto()
+    While = auto()
+    For = auto()
+    In = auto()
 
     EOF = auto()
 
 KEYWORDS : Dict[str, TokenType] = {
     "let" : TokenType.Let,
     "const" : TokenType.Const,
-    "fn" : TokenType.Fn
+    "fn" : TokenType.Fn,
+    "while" : TokenType.While,
+    "for" : TokenType.For,
+    "in" : TokenType.In,
 }
 
 class Token() :
@@ -47,106 +58,163 @@ class Token() :
         self.value = value
         self.type = type
 
-def tokenize(source) -> List[Token] :
+# single character tokens. looked up directly instead of walking an if / elif chain
+SYMBOLS : Dict[str, TokenType] = {
+    '(' : TokenType.OpenParam,
+    ')' : TokenType.CloseParam,
+    '{' : TokenType.OpenBrace,
+    '}' : TokenType.CloseBrace,
+    '[' : TokenType.OpenBracket,
+    ']' : TokenType.CloseBracket,
+    ':' : TokenType.Colon,
+    ';' : TokenType.SemiColon,
+    ',' : TokenType.Comma,
+    '.' : TokenType.Dot,
+    '+' : TokenType.BinaryOperator,
+    '-' : TokenType.BinaryOperator,
+    '*' : TokenType.BinaryOperator,
+    '/' : TokenType.BinaryOperator,
+    '%' : TokenType.BinaryOperator,
+    '=' : TokenType.Equals,
+}
 
-    tokens: List[Token] = []
-    src : str = source
-    ptr : int = 0
-
-    while(ptr < len(src)) :
-        if(src[ptr] == '(') :
-            token = Token(src[ptr], TokenType.OpenParam)
-            tokens.append(token)
-            ptr += 1
-
-        elif(src[ptr] == ')') :
-            token = Token(src[ptr], TokenType.CloseParam)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] == '{') :
-            token = Token(src[ptr], TokenType.OpenBrace)
-            tokens.append(token)
-            ptr += 1
-
-        elif(src[ptr] == '}') :
-            token = Token(src[ptr], TokenType.CloseBrace)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] == '[') :
-            token = Token(src[ptr], TokenType.OpenBracket)
-            tokens.append(token)
-            ptr += 1
-
-        elif(src[ptr] == ']') :
-            token = Token(src[ptr], TokenType.CloseBracket)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] == ':') :
-            token = Token(src[ptr], TokenType.Colon)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] == ';') :
-            token = Token(src[ptr], TokenType.SemiColon)
-            tokens.append(token)
-            ptr += 1
-
-        elif(src[ptr] == ',') :
-            token = Token(src[ptr], TokenType.Comma)
-            tokens.append(token)
-            ptr += 1
-
-        elif(src[ptr] == '.') :
-            token = Token(src[ptr], TokenType.Dot)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] in '+-*/%') :
-            token = Token(src[ptr], TokenType.BinaryOperator)
-            tokens.append(token)
-            ptr += 1
-        
-        elif(src[ptr] == '=') :
-            token = Token(src[ptr], TokenType.Equals)
-            tokens.append(token)
-            ptr += 1
-
-
-
-        else :
-            # handle mutli-character token (eg. number, let, etc)
-
-            if(isint(src[ptr])) :
-                num = ""
-                while(ptr < len(src) and isint(src[ptr])) :
-                    num += src[ptr]
-                    ptr += 1
-            
-                tokens.append(Token(num, TokenType.Number))
-        
-            elif(isalpha(src[ptr])) :
-                s = ""
-                while(ptr < len(src) and isalpha(src[ptr])) :
-                    s += src[ptr]
-                    ptr += 1
-                
-                if(s not in KEYWORDS) :
-                    tokens.append(Token(s, TokenType.Identifier))
-                else :
-                    tokens.append(Token(s, KEYWORDS[s]))
-
-            elif(isskippable(src[ptr])) :
-                ptr += 1
-            
-            else :
-                print("Unrecognised character found in source : ", src[ptr])
-                exit(0)
-    
-    tokens.append(Token("EOF", TokenType.EOF))
-    return tokens
+# one compiled master pattern for the whole language. the order of the 
+# alternatives matters since the regex engine picks the first one that 
+# matches. lexemes are sliced straight out of the source by the match 
+# instead of being built character by character
+TOKEN_PATTERN = re.compile(r'''
+      (?P<number>\d+)
+    | (?P<identifier>[a-zA-Z]+)
+    | (?P<skip>[ \t\n\r]+)
+    | (?P<symbol>[(){}\[\]:;,.+\-*/%=])
+    | (?P<string>"(?:[^"\\\n]|\\[^\n])*")
+    | (?P<unterminated>")
+    | (?P<unknown>.)
+''', re.VERBOSE | re.DOTALL)
+
+# string literals live on one line, a line break in one is written \n
+ESCAPES : Dict[str, str] = {
+    'n' : '\n',
+    't' : '\t',
+    'r' : '\r',
+    '"' : '"',
+    '\\' : '\\',
+}
+
+ESCAPE_PATTERN = re.compile(r'\\(.)')
+
+def _escape(match : re.Match) -> str :
+    char = match.group(1)
+    if(char not in ESCAPES) :
+        raise LexerError(f'Unknown escape sequence in string literal : \\{char}')
+    return ESCAPES[char]
+
+def _string(lexeme : str) -> str :
+    # the text of a string literal. it is interned, like identifiers, so
+    # that keys and literals with the same text are the same str object
+    body = lexeme[1:-1]
+    if('\\' in body) :
+        body = ESCAPE_PATTERN.sub(_escape, body)
+    return sys.intern(body)
+
+def _scan(source : str) -> Iterator[Token] :
+
+    # yields the tokens of a piece of source that is known to not end 
+    # halfway through a token. no EOF token is produced here
+    for match in TOKEN_PATTERN.finditer(source) :
+        kind = match.lastgroup
+        lexeme = match.group()
+
+        if(kind == 'symbol') :
+            yield Token(lexeme, SYMBOLS[lexeme])
+
+        elif(kind == 'identifier') :
+            yield Token(sys.intern(lexeme), KEYWORDS.get(lexeme, TokenType.Identifier))
+
+        elif(kind == 'number') :
+            yield Token(lexeme, TokenType.Number)
+
+        elif(kind == 'string') :
+            yield Token(_string(lexeme), TokenType.String)
+
+        elif(kind == 'unterminated') :
+            raise LexerError('Unterminated string literal')
+
+        elif(kind == 'unknown') :
+            raise LexerError(f'Unrecognised character found in source : {lexeme}')
+
+def scan(source : str) -> Iterator[Token] :
+
+    # lazy version of tokenize : tokens are produced only when the parser asks for them
+    yield from _scan(source)
+    yield Token("EOF", TokenType.EOF)
+
+# the longest run of a line that ends right after whitespace or a symbol
+# outside of a string : no token continues past that point. the rest may
+# be a number, an identifier or a string that goes on in the next chunk
+SAFE_CUT_PATTERN = re.compile(r'''
+    (?: "(?:[^"\\\n]|\\[^\n])*" | [^"\n] )*
+    [ \t\r(){}\[\]:;,.+\-*/%=]
+''', re.VERBOSE)
+
+def _safe_cut(buffer : str) -> int :
+
+    # strings never span lines : only the last line can end inside one
+    start = buffer.rfind('\n') + 1
+    match = SAFE_CUT_PATTERN.match(buffer, start)
+    return match.end() if match else start
+
+def scan_stream(stream, chunk_size : int = 64 * 1024) -> Iterator[Token] :
+
+    # streams tokens out of anything with a read(n) method : text or binary 
+    # files and mmap objects. only one chunk (plus the unfinished token at 
+    # its end) is held in memory at any point in time
+    decoder = None
+    pending = ''
+
+    while(True) :
+        chunk = stream.read(chunk_size)
+        at_end = not chunk
+
+        if(isinstance(chunk, (bytes, bytearray))) :
+            if(decoder is None) :
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk, final=at_end)
+
+        buffer = pending + chunk
+
+        if(at_end) :
+            yield from _scan(buffer)
+            break
+
+        # whitespace and symbols end the token before them, so everything
+        # up to the last one that is not in a string can be scanned safely.
+        # the rest waits for the next chunk since a number, an identifier
+        # or a string may continue there
+        cut = _safe_cut(buffer)
+        pending = buffer[cut:]
+        yield from _scan(buffer[:cut])
+
+    yield Token("EOF", TokenType.EOF)
+
+def scan_file(path : str, chunk_size : int = 64 * 1024) -> Iterator[Token] :
+
+    # memory maps the file so that the OS pages it in as the scanner advances
+    with open(path, 'rb') as f :
+        try :
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError :
+            # empty files cannot be mapped
+            source = f
+
+        try :
+            yield from scan_stream(source, chunk_size)
+        finally :
+            if(source is not f) :
+                source.close()
+
+def tokenize(source) -> List[Token] :
+    return list(scan(source))
 
 def print_tokens(tokens : List[Token]) -> None :
 
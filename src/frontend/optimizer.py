@@ -0,0 +1,462 @@
+import sys
+from typing import List, Dict, Set, Optional
+
+from .ast import *
+from utils.errors import OptimizerError
+
+'''
+
+    - optimization pipeline that runs on the Program between the parser
+      and the interpreter. every pass rewrites the tree in place and can be
+      switched on or off by name
+    - passes :
+
+        constant-folding            4 * (3 + 2)           ->  20
+                                    "ab" + "c"            ->  "abc"
+        const-propagation           const a = 2; a * 3    ->  const a = 2; 2 * 3
+        algebraic-simplification    (x - y) * 1           ->  x - y
+        loop-invariant-hoisting     for (i in 0 : n) { t = t + k * 2 }
+                                                          ->  for (i in 0 : n) { t = t + inv1 }
+                                                              with const inv1 = k * 2 run once,
+                                                              before the first iteration
+
+    - every rewrite keeps the program's behaviour, errors included :
+        - divisions / modulos by 0 are never folded, they still fail at run time
+        - identities are only applied when the other operand is known to
+          evaluate to a number (or null, which the identities preserve too),
+          since obj * 1 and (s + t) * 1 with strings are null and not obj
+        - a const is only propagated to reads that are guaranteed to run
+          after its declaration and that no other declaration can shadow
+        - an expression is only hoisted out of a loop when evaluating it
+          early cannot fail nor give another value : its names are declared
+          before the loop, never assigned and never re-declared in the loop,
+          every operator has a literal operand and divides by a literal
+          other than 0 (so no length mismatch, no division by 0)
+
+'''
+
+def _fold(operator : str, left : float, right : float) -> Optional[float] :
+
+    if(operator == '+') :
+        return left + right
+    elif(operator == '-') :
+        return left - right
+    elif(operator == '*') :
+        return left * right
+    elif(operator == '/' and right != 0) :
+        return left / right
+    elif(operator == '%' and right != 0) :
+        return left % right
+
+    return None
+
+class Pass() :
+
+    name : str = 'pass'
+
+    def __init__(self) -> None:
+        # how many nodes this pass has rewritten so far
+        self.rewrites = 0
+
+    def run(self, program : Program) -> None :
+        program.body = [self.transform(stmt) for stmt in program.body]
+
+    def transform(self, node : Stmt) -> Stmt :
+
+        # rewrites the children first (post-order), then the node itself
+        for field in CHILD_FIELDS.get(node.kind, ()) :
+            child = getattr(node, field)
+            if(isinstance(child, list)) :
+                setattr(node, field, [self.transform(c) for c in child])
+            elif(child is not None) :
+                setattr(node, field, self.transform(child))
+
+        result = self.visit(node)
+        if(result is not node) :
+            self.rewrites += 1
+
+        return result
+
+    def visit(self, node : Stmt) -> Stmt :
+        return node
+
+class ConstantFolding(Pass) :
+
+    name = 'constant-folding'
+
+    def visit(self, node : Stmt) -> Stmt :
+
+        if(
+            node.kind == NodeType.BinaryExpr and
+            node.left.kind == NodeType.NumericalLiteral and
+            node.right.kind == NodeType.NumericalLiteral
+        ) :
+            value = _fold(node.operator, node.left.value, node.right.value)
+            if(value is not None) :
+                return NumericLiteral(value=value)
+
+        # "a" + "b" : the text is joined once, here
+        if(
+            node.kind == NodeType.BinaryExpr and node.operator == '+' and
+            node.left.kind == NodeType.StringLiteral and
+            node.right.kind == NodeType.StringLiteral
+        ) :
+            return StringLiteral(value=sys.intern(node.left.value + node.right.value))
+
+        return node
+
+class AlgebraicSimplification(Pass) :
+
+    name = 'algebraic-simplification'
+
+    def _numeric(self, node : Expr) -> bool :
+        # a BinaryExpr other than + evaluates to a number, an array of
+        # numbers or null, none of which x * 1, x / 1 or x - 0 change. a +
+        # may be a string, which they turn into null
+        return node.kind == NodeType.NumericalLiteral or (node.kind == NodeType.BinaryExpr and node.operator != '+')
+
+    def _is(self, node : Expr, value : float) -> bool :
+        return node.kind == NodeType.NumericalLiteral and node.value == value
+
+    def visit(self, node : Stmt) -> Stmt :
+
+        if(node.kind != NodeType.BinaryExpr) :
+            return node
+
+        (left, right, op) = (node.left, node.right, node.operator)
+
+        # x * 1, x / 1, x - 0 and 1 * x. x + 0 is left alone : -0.0 + 0 is 0.0
+        if(op in ('*', '/') and self._is(right, 1) and self._numeric(left)) :
+            return left
+        if(op == '-' and self._is(right, 0) and self._numeric(left)) :
+            return left
+        if(op == '*' and self._is(left, 1) and self._numeric(right)) :
+            return right
+
+        return node
+
+class ConstScope() :
+
+    def __init__(self, declared : Set[str], parent : Optional['ConstScope']) -> None:
+        # every name declared anywhere in this scope, and the consts whose
+        # declaration has been passed so far
+        self.declared = declared
+        self.consts : Dict[str, float] = {}
+        self.parent = parent
+
+class ConstPropagation(Pass) :
+
+    name = 'const-propagation'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._scope : Optional[ConstScope] = None
+
+    def _declared_in(self, body : List[Stmt], parameters : List[str] = ()) -> Set[str] :
+        names = set(parameters)
+        for stmt in body :
+            if(stmt.kind == NodeType.VariableDecl) :
+                names.add(stmt.identifier)
+            elif(stmt.kind == NodeType.FunctionDecl) :
+                names.add(stmt.name)
+        return names
+
+    def _value_of(self, name : str) -> Optional[float] :
+
+        # the innermost scope that declares the name decides, even if its
+        # declaration has not been reached yet (then nothing is propagated)
+        scope = self._scope
+        while(scope is not None) :
+            if(name in scope.declared) :
+                return scope.consts.get(name)
+            scope = scope.parent
+
+        return None
+
+    def run(self, program : Program) -> None :
+        self._scope = ConstScope(self._declared_in(program.body), None)
+        program.body = [self.transform(stmt) for stmt in program.body]
+        self._scope = None
+
+    def transform(self, node : Stmt) -> Stmt :
+
+        kind = node.kind
+
+        if(kind == NodeType.Identifier) :
+            value = self._value_of(node.symbol)
+            if(value is None) :
+                return node
+
+            self.rewrites += 1
+            return NumericLiteral(value=value)
+
+        elif(kind == NodeType.AssignmentExpr) :
+            # the assignee is a write, never replace it
+            node.value = self.transform(node.value)
+            if(node.assignee.kind != NodeType.Identifier) :
+                node.assignee = self.transform(node.assignee)
+            return node
+
+        elif(kind == NodeType.MemberExpr) :
+            # in foo.bar, bar is a property name and not a read of bar
+            node.object = self.transform(node.object)
+            if(node.computed) :
+                node.property = self.transform(node.property)
+            return node
+
+        elif(kind == NodeType.PropertyLiteral) :
+            if(node.value is None) :
+                # { foo } reads foo
+                value = self._value_of(node.key)
+                if(value is not None) :
+                    self.rewrites += 1
+                    node.value = NumericLiteral(value=value)
+            else :
+                node.value = self.transform(node.value)
+            return node
+
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value is not None) :
+                node.value = self.transform(node.value)
+
+            if(node.constant and node.value is not None and node.value.kind == NodeType.NumericalLiteral) :
+                self._scope.consts[node.identifier] = node.value.value
+            return node
+
+        elif(kind == NodeType.FunctionDecl) :
+            # the body can only run once the declaration has run, so every
+            # const that has been passed by now is visible from inside it
+            self._scope = ConstScope(self._declared_in(node.body, node.parameters), self._scope)
+            node.body = [self.transform(stmt) for stmt in node.body]
+            self._scope = self._scope.parent
+            return node
+
+        elif(kind == NodeType.ForStmt or kind == NodeType.WhileStmt) :
+            # the bounds belong to the enclosing scope, the rest to the
+            # loop's own, where the variable shadows whatever it names
+            if(kind == NodeType.ForStmt) :
+                node.start = self.transform(node.start)
+                node.end = self.transform(node.end)
+                names = self._declared_in(node.invariants + node.body, [node.variable])
+            else :
+                names = self._declared_in(node.invariants + node.body)
+
+            self._scope = ConstScope(names, self._scope)
+            node.invariants = [self.transform(decl) for decl in node.invariants]
+            if(kind == NodeType.WhileStmt) :
+                node.condition = self.transform(node.condition)
+            node.body = [self.transform(stmt) for stmt in node.body]
+            self._scope = self._scope.parent
+            return node
+
+        return super().transform(node)
+
+LITERALS = (NodeType.NumericalLiteral, NodeType.StringLiteral)
+
+class LoopInvariantHoisting(Pass) :
+
+    name = 'loop-invariant-hoisting'
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        # hoisted expressions are declared as inv1, inv2 ... identifiers
+        # are letters only, so these never clash with the program's names
+        self._hoisted = 0
+        self._assigned : Set[str] = set()
+
+    def run(self, program : Program) -> None :
+
+        # a name assigned anywhere (a closure included) is not invariant
+        self._assigned = set()
+        stack : List[Stmt] = [program]
+        while(stack) :
+            node = stack.pop()
+            if(node.kind == NodeType.AssignmentExpr and node.assignee.kind == NodeType.Identifier) :
+                self._assigned.add(node.assignee.symbol)
+            stack.extend(iter_children(node))
+
+        self._visit_body(program.body, set())
+
+    def _visit_body(self, body : List[Stmt], declared : Set[str]) -> None :
+
+        # declared : the names that are sure to be declared by the time the
+        # statement being visited runs
+        declared = set(declared)
+
+        for stmt in body :
+            kind = stmt.kind
+
+            if(kind == NodeType.VariableDecl) :
+                declared.add(stmt.identifier)
+
+            elif(kind == NodeType.FunctionDecl) :
+                declared.add(stmt.name)
+                self._visit_body(stmt.body, declared | set(stmt.parameters))
+
+            elif(kind == NodeType.ForStmt or kind == NodeType.WhileStmt) :
+                # outer loops first, so that what they hoist is visible to
+                # the loops nested in them
+                self._hoist(stmt, declared)
+
+                inner = declared | { decl.identifier for decl in stmt.invariants }
+                if(kind == NodeType.ForStmt) :
+                    inner.add(stmt.variable)
+                self._visit_body(stmt.body, inner)
+
+    def _declared_inside(self, loop : Stmt) -> Set[str] :
+
+        names : Set[str] = { loop.variable } if loop.kind == NodeType.ForStmt else set()
+        stack = list(loop.body)
+        if(loop.kind == NodeType.WhileStmt) :
+            stack.append(loop.condition)
+
+        while(stack) :
+            node = stack.pop()
+            kind = node.kind
+
+            if(kind == NodeType.VariableDecl) :
+                names.add(node.identifier)
+            elif(kind == NodeType.FunctionDecl) :
+                names.add(node.name)
+                names.update(node.parameters)
+            elif(kind == NodeType.ForStmt) :
+                names.add(node.variable)
+
+            stack.extend(iter_children(node))
+
+        return names
+
+    def _invariant(self, node : Expr, allowed : Set[str]) -> bool :
+
+        kind = node.kind
+
+        if(kind == NodeType.Identifier) :
+            return node.symbol in allowed
+        if(kind != NodeType.BinaryExpr) :
+            return kind in LITERALS
+
+        (left, right) = (node.left, node.right)
+
+        if(left.kind not in LITERALS and right.kind not in LITERALS) :
+            return False
+        if(node.operator in ('/', '%') and not (right.kind == NodeType.NumericalLiteral and right.value != 0)) :
+            return False
+
+        return self._invariant(left, allowed) and self._invariant(right, allowed)
+
+    def _reads(self, node : Expr) -> bool :
+        if(node.kind == NodeType.BinaryExpr) :
+            return self._reads(node.left) or self._reads(node.right)
+        return node.kind == NodeType.Identifier
+
+    def _hoist(self, loop : Stmt, declared : Set[str]) -> None :
+
+        inside = self._declared_inside(loop)
+        own = { decl.identifier for decl in loop.invariants }
+        allowed = (declared | own) - inside - self._assigned
+
+        # what was hoisted already, in an earlier round
+        names = { repr(decl.value.to_dict()) : decl.identifier for decl in loop.invariants if decl.value is not None }
+        taken = declared | own | inside
+
+        def site(node : Stmt) -> Stmt :
+
+            kind = node.kind
+
+            # function bodies run when they are called, not once per iteration
+            if(kind == NodeType.FunctionDecl) :
+                return node
+
+            if(kind == NodeType.BinaryExpr and self._reads(node) and self._invariant(node, allowed)) :
+                key = repr(node.to_dict())
+                name = names.get(key)
+
+                if(name is None) :
+                    self._hoisted += 1
+                    while(f'inv{self._hoisted}' in taken) :
+                        self._hoisted += 1
+
+                    name = f'inv{self._hoisted}'
+                    taken.add(name)
+                    names[key] = name
+                    loop.invariants.append(VariableDecl(name, node, True))
+
+                self.rewrites += 1
+                return Identifier(name)
+
+            for field in CHILD_FIELDS.get(kind, ()) :
+                child = getattr(node, field)
+                if(isinstance(child, list)) :
+                    setattr(node, field, [site(c) for c in child])
+                elif(child is not None) :
+                    setattr(node, field, site(child))
+
+            return node
+
+        if(loop.kind == NodeType.WhileStmt) :
+            loop.condition = site(loop.condition)
+        loop.body = [site(stmt) for stmt in loop.body]
+
+class OptimizationReport() :
+
+    def __init__(self) -> None:
+        self.nodes_before = 0
+        self.nodes_after = 0
+        self.removed_by_pass : Dict[str, int] = {}
+        self.rounds = 0
+
+    @property
+    def nodes_removed(self) -> int :
+        return self.nodes_before - self.nodes_after
+
+    def to_dict(self) :
+        return {
+            'nodes_before' : self.nodes_before,
+            'nodes_after' : self.nodes_after,
+            'nodes_removed' : self.nodes_removed,
+            'removed_by_pass' : self.removed_by_pass,
+            'rounds' : self.rounds,
+        }
+
+PASSES = [ConstantFolding, ConstPropagation, AlgebraicSimplification, LoopInvariantHoisting]
+
+class Optimizer() :
+
+    def __init__(self, disabled : Set[str] = (), max_rounds : int = 4) -> None:
+
+        for name in disabled :
+            if(name not in [p.name for p in PASSES]) :
+                raise OptimizerError(f'Unknown pass {name}. Available passes : {[p.name for p in PASSES]}')
+
+        self.passes : List[Pass] = [p() for p in PASSES if p.name not in disabled]
+        self.max_rounds = max_rounds
+
+    def optimize(self, program : Program) -> OptimizationReport :
+
+        # passes feed each other (a propagated const can be folded, a fold
+        # can create a new const), so the pipeline runs until nothing changes
+        report = OptimizationReport()
+        report.nodes_before = count_nodes(program)
+        report.removed_by_pass = { p.name : 0 for p in self.passes }
+
+        current = report.nodes_before
+
+        for _ in range(self.max_rounds) :
+            report.rounds += 1
+            changed = False
+
+            for p in self.passes :
+                rewrites = p.rewrites
+                p.run(program)
+                after = count_nodes(program)
+
+                changed = changed or (p.rewrites != rewrites)
+                report.removed_by_pass[p.name] += current - after
+                current = after
+
+            if(not changed) :
+                break
+
+        report.nodes_after = current
+        return report
@@ -0,0 +1,397 @@
+from array import array
+from typing import List, Dict, Any
+
+from .ast import *
+
+'''
+
+    - compact, struct-of-arrays layout of a Program for very large scripts.
+      instead of one Python object per node, every node is an index into a
+      few typed arrays :
+
+            kinds       array('B')  kind code of the node
+            a, b, c     array('i')  operands, whose meaning depends on the kind :
+                                    child node index, string / number pool
+                                    index, list offset, flag (-1 when unused)
+            lists       array('i')  [count, item, item ...] for child lists
+                                    and parameter lists
+            strings                 pool of names and string literals, each
+                                    stored once
+            numbers     array('d')  pool of numeric literals
+
+    - pack(program) returns a lightweight view of the root. views are
+      subclasses of the node classes (a view of a BinaryExpr is a
+      BinaryExpr) whose fields are properties reading the arrays, so the
+      engines, the resolver and the analyses run on them unchanged. views
+      are created on access and dropped right after, only the arrays stay
+    - two views of the same node compare (and hash) equal
+    - a packed tree is read only, except for the annotations the engines
+      and the static passes add (address, cache, ...), which are kept per
+      node index in PackedTree.annotations. run the optimizer before packing
+
+'''
+
+KIND_CODES : Dict[NodeType, int] = {
+    NodeType.Program : 0,
+    NodeType.VariableDecl : 1,
+    NodeType.FunctionDecl : 2,
+    NodeType.AssignmentExpr : 3,
+    NodeType.BinaryExpr : 4,
+    NodeType.MemberExpr : 5,
+    NodeType.CallExpr : 6,
+    NodeType.Identifier : 7,
+    NodeType.NumericalLiteral : 8,
+    NodeType.PropertyLiteral : 9,
+    NodeType.ObjectLiteral : 10,
+    NodeType.SliceExpr : 11,
+    NodeType.ArrayLiteral : 12,
+    NodeType.StringLiteral : 13,
+    NodeType.WhileStmt : 14,
+    NodeType.ForStmt : 15,
+}
+
+NONE = -1
+
+class PackedTree() :
+
+    def __init__(self) -> None:
+        self.kinds = array('B')
+        self.a = array('i')
+        self.b = array('i')
+        self.c = array('i')
+        self.lists = array('i')
+        self.strings : List[str] = []
+        self.numbers = array('d')
+
+        # annotation name -> node index -> value
+        self.annotations : Dict[str, Dict[int, Any]] = {}
+
+        self.root = NONE
+        self._string_index : Dict[str, int] = {}
+
+    def view(self, index : int) -> Stmt :
+        return VIEWS[self.kinds[index]](self, index)
+
+    def node_count(self) -> int :
+        return len(self.kinds)
+
+    # packing
+
+    def _add(self, kind : NodeType, a : int = NONE, b : int = NONE, c : int = NONE) -> int :
+        self.kinds.append(KIND_CODES[kind])
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        return len(self.kinds) - 1
+
+    def _string(self, value : str) -> int :
+        index = self._string_index.get(value)
+        if(index is None) :
+            index = len(self.strings)
+            self.strings.append(value)
+            self._string_index[value] = index
+        return index
+
+    def _list(self, items : List[int]) -> int :
+        offset = len(self.lists)
+        self.lists.append(len(items))
+        self.lists.extend(items)
+        return offset
+
+    def _optional(self, node : Optional[Stmt]) -> int :
+        return self._pack(node) if node is not None else NONE
+
+    def _pack(self, node : Stmt) -> int :
+
+        kind = node.kind
+
+        # children are packed first, so that their indexes are known
+        if(kind == NodeType.Program) :
+            return self._add(kind, self._list([self._pack(stmt) for stmt in node.body]))
+        elif(kind == NodeType.VariableDecl) :
+            return self._add(kind, self._string(node.identifier), self._optional(node.value), int(node.constant))
+        elif(kind == NodeType.FunctionDecl) :
+            parameters = self._list([self._string(param) for param in node.parameters])
+            body = self._list([self._pack(stmt) for stmt in node.body])
+            return self._add(kind, self._string(node.name), parameters, body)
+        elif(kind == NodeType.AssignmentExpr) :
+            return self._add(kind, self._pack(node.assignee), self._pack(node.value))
+        elif(kind == NodeType.BinaryExpr) :
+            return self._add(kind, self._pack(node.left), self._pack(node.right), self._string(node.operator))
+        elif(kind == NodeType.MemberExpr) :
+            return self._add(kind, self._pack(node.object), self._pack(node.property), int(node.computed))
+        elif(kind == NodeType.CallExpr) :
+            return self._add(kind, self._list([self._pack(arg) for arg in node.args]), self._pack(node.caller))
+        elif(kind == NodeType.Identifier) :
+            return self._add(kind, self._string(node.symbol))
+        elif(kind == NodeType.NumericalLiteral) :
+            self.numbers.append(node.value)
+            return self._add(kind, len(self.numbers) - 1)
+        elif(kind == NodeType.StringLiteral) :
+            return self._add(kind, self._string(node.value))
+        elif(kind == NodeType.PropertyLiteral) :
+            return self._add(kind, self._string(node.key), self._optional(node.value))
+        elif(kind == NodeType.ObjectLiteral) :
+            return self._add(kind, self._list([self._pack(prop) for prop in node.properties]))
+        elif(kind == NodeType.SliceExpr) :
+            return self._add(kind, self._pack(node.object), self._optional(node.start), self._optional(node.end))
+        elif(kind == NodeType.ArrayLiteral) :
+            return self._add(kind, self._list([self._pack(element) for element in node.elements]))
+        elif(kind == NodeType.WhileStmt) :
+            invariants = self._list([self._pack(decl) for decl in node.invariants])
+            body = self._list([self._pack(stmt) for stmt in node.body])
+            return self._add(kind, self._pack(node.condition), invariants, body)
+        elif(kind == NodeType.ForStmt) :
+            # one list for the bounds followed by the invariants
+            operands = [self._pack(node.start), self._pack(node.end)] + [self._pack(decl) for decl in node.invariants]
+            body = self._list([self._pack(stmt) for stmt in node.body])
+            return self._add(kind, self._string(node.variable), self._list(operands), body)
+
+        raise ValueError(f'cannot pack {kind}')
+
+def pack(program : Program) -> Program :
+    tree = PackedTree()
+    tree.root = tree._pack(program)
+    tree._string_index = {}
+    return tree.view(tree.root)
+
+# ------------------------------------------------------------------------------
+# Views
+# ------------------------------------------------------------------------------
+
+# properties that read one operand of the viewed node, in a given way
+
+def _node(operand : str) :
+    def get(self) :
+        return self._tree.view(getattr(self._tree, operand)[self._index])
+    return property(get)
+
+def _optional_node(operand : str) :
+    def get(self) :
+        index = getattr(self._tree, operand)[self._index]
+        return self._tree.view(index) if index != NONE else None
+    return property(get)
+
+def _nodes(operand : str) :
+    def get(self) :
+        tree = self._tree
+        offset = getattr(tree, operand)[self._index]
+        return [tree.view(index) for index in tree.lists[offset + 1 : offset + 1 + tree.lists[offset]]]
+    return property(get)
+
+def _item(operand : str, position : int) :
+    def get(self) :
+        tree = self._tree
+        return tree.view(tree.lists[getattr(tree, operand)[self._index] + 1 + position])
+    return property(get)
+
+def _nodes_from(operand : str, position : int) :
+    def get(self) :
+        tree = self._tree
+        offset = getattr(tree, operand)[self._index]
+        return [tree.view(index) for index in tree.lists[offset + 1 + position : offset + 1 + tree.lists[offset]]]
+    return property(get)
+
+def _string(operand : str) :
+    def get(self) :
+        return self._tree.strings[getattr(self._tree, operand)[self._index]]
+    return property(get)
+
+def _strings(operand : str) :
+    def get(self) :
+        tree = self._tree
+        offset = getattr(tree, operand)[self._index]
+        return [tree.strings[index] for index in tree.lists[offset + 1 : offset + 1 + tree.lists[offset]]]
+    return property(get)
+
+def _flag(operand : str) :
+    def get(self) :
+        return bool(getattr(self._tree, operand)[self._index])
+    return property(get)
+
+def _number(operand : str) :
+    def get(self) :
+        return self._tree.numbers[getattr(self._tree, operand)[self._index]]
+    return property(get)
+
+def _annotation(name : str, default = None, factory = None) :
+
+    # read / write per node storage for what the passes and engines attach
+    # to nodes. factory builds mutable defaults (which are then kept)
+    def get(self) :
+        values = self._tree.annotations.get(name)
+        if(values is not None and self._index in values) :
+            return values[self._index]
+        if(factory is None) :
+            return default
+        value = factory()
+        self._tree.annotations.setdefault(name, {})[self._index] = value
+        return value
+
+    def set(self, value) :
+        self._tree.annotations.setdefault(name, {})[self._index] = value
+
+    return property(get, set)
+
+def _init(self, tree : PackedTree, index : int) -> None :
+    self._tree = tree
+    self._index = index
+
+def _eq(self, other) -> bool :
+    return other.__class__ is self.__class__ and other._tree is self._tree and other._index == self._index
+
+def _hash(self) -> int :
+    return hash((id(self._tree), self._index))
+
+class ProgramView(Program) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.Program
+    body = _nodes('a')
+
+class VariableDeclView(VariableDecl) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.VariableDecl
+    identifier = _string('a')
+    value = _optional_node('b')
+    constant = _flag('c')
+    address = _annotation('address')
+
+class FunctionDeclView(FunctionDecl) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.FunctionDecl
+    name = _string('a')
+    parameters = _strings('b')
+    body = _nodes('c')
+    compiled = _annotation('compiled', factory=dict)
+    address = _annotation('address')
+    frame_size = _annotation('frame_size', 0)
+    pure = _annotation('pure', False)
+
+class AssignmentExprView(AssignmentExpr) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.AssignmentExpr
+    assignee = _node('a')
+    value = _node('b')
+    address = _annotation('address')
+
+class BinaryExprView(BinaryExpr) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.BinaryExpr
+    left = _node('a')
+    right = _node('b')
+    operator = _string('c')
+
+class MemberExprView(MemberExpr) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.MemberExpr
+    object = _node('a')
+    property = _node('b')
+    computed = _flag('c')
+    cache = _annotation('cache')
+
+class CallExprView(CallExpr) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.CallExpr
+    args = _nodes('a')
+    caller = _node('b')
+
+class IdentifierView(Identifier) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.Identifier
+    symbol = _string('a')
+    address = _annotation('address')
+
+class NumericLiteralView(NumericLiteral) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.NumericalLiteral
+    value = _number('a')
+    runtime_value = _annotation('runtime_value')
+
+class StringLiteralView(StringLiteral) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.StringLiteral
+    value = _string('a')
+    runtime_value = _annotation('runtime_value')
+
+class PropertyLiteralView(PropertyLiteral) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.PropertyLiteral
+    key = _string('a')
+    value = _optional_node('b')
+    address = _annotation('address')
+
+class ObjectLiteralView(ObjectLiteral) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.ObjectLiteral
+    properties = _nodes('a')
+
+class SliceExprView(SliceExpr) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.SliceExpr
+    object = _node('a')
+    start = _optional_node('b')
+    end = _optional_node('c')
+
+class ArrayLiteralView(ArrayLiteral) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.ArrayLiteral
+    elements = _nodes('a')
+
+class WhileStmtView(WhileStmt) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.WhileStmt
+    condition = _node('a')
+    invariants = _nodes('b')
+    body = _nodes('c')
+    frame_size = _annotation('frame_size', 0)
+
+class ForStmtView(ForStmt) :
+    __slots__ = ('_tree', '_index')
+    (__init__, __eq__, __hash__) = (_init, _eq, _hash)
+
+    kind = NodeType.ForStmt
+    variable = _string('a')
+    start = _item('b', 0)
+    end = _item('b', 1)
+    invariants = _nodes_from('b', 2)
+    body = _nodes('c')
+    address = _annotation('address')
+    frame_size = _annotation('frame_size', 0)
+    bound = _annotation('bound')
+
+# view class for each kind code
+VIEWS = [
+    ProgramView, VariableDeclView, FunctionDeclView, AssignmentExprView, BinaryExprView, MemberExprView,
+    CallExprView, IdentifierView, NumericLiteralView, PropertyLiteralView, ObjectLiteralView, SliceExprView,
+    ArrayLiteralView, StringLiteralView, WhileStmtView, ForStmtView,
+]
@@ -1,8 +1,10 @@
-from typing import List, cast
+from typing import List, Iterator, cast
 
-from .ast import Stmt, Program, Expr, BinaryExpr, Identifier, NumericLiteral, VariableDecl, AssignmentExpr, PropertyLiteral, ObjectLiteral, CallExpr, MemberExpr, FunctionDecl
+from .ast import NodeType, Stmt, Program, Expr, BinaryExpr, Identifier, NumericLiteral, StringLiteral, VariableDecl, AssignmentExpr, PropertyLiteral, ObjectLiteral, CallExpr, MemberExpr, FunctionDecl, SliceExpr, ArrayLiteral, WhileStmt, ForStmt
 
-from .lexer import TokenType, Token, tokenize
+from .lexer import TokenType, Token, scan, scan_stream
+
+from utils.errors import ParserError
 
 '''
     order of precedence : 
@@ -27,7 +29,9 @@ from .lexer import TokenType, Token, tokenize
     It always passes through the stack. Technically speaking, this 
     would be the grammar of this language at this point :
 
-        Stmt                := Expr | VariableDecl | FunctionDecl
+        Stmt                := Expr | VariableDecl | FunctionDecl | WhileStmt | ForStmt
+        WhileStmt           := while ( Expr ) { Stmt* }
+        ForStmt             := for ( Identifier in Expr : Expr ) { Stmt* }
         Expr                := AssignmentExpr
         AssignmentExpr      := AssignmentExpr | ObjectExpr
         ObjectExpr          := Expr | AdditiveExpr
@@ -38,28 +42,36 @@ from .lexer import TokenType, Token, tokenize
 class Parser():
 
     def __init__(self) -> None:
-        self._tokens: List[Token] = []
-        self._ptr: int = 0
+
+        # tokens are pulled one at a time from the lexer. the parser never 
+        # needs to look further than the current token, so that is all the 
+        # lookahead we keep around
+        self._tokens: Iterator[Token] = iter(())
+        self._current: Token = Token("EOF", TokenType.EOF)
+
+    def _reset(self, tokens: Iterator[Token]) -> None:
+        self._tokens = tokens
+        self._current = next(self._tokens, Token("EOF", TokenType.EOF))
 
     def _not_eof(self) -> bool:
-        return self._tokens[self._ptr].type != TokenType.EOF
+        return self._current.type != TokenType.EOF
 
     def _at(self) -> Token:
-        return self._tokens[self._ptr]
+        return self._current
 
     def _eat(self) -> Token:
-        prev = self._at()
-        self._ptr += 1
+        prev = self._current
+
+        # once the stream is exhausted we keep pointing at EOF
+        self._current = next(self._tokens, prev)
         return prev
 
     def _expect(self, type: TokenType, err: str):
         prev = self._at()
         if (not prev or prev.type != type):
-            print(f'\n[PARSER ERROR] : \n {err}, \n Expected : {type}, \nReceived : ({prev.value}, {prev.type})')
-            exit(0)
+            raise ParserError(f'{err}, Expected : {type}, Received : ({prev.value}, {prev.type})')
 
-        self._ptr += 1
-        return prev
+        return self._eat()
 
     def _parse_stmt(self) -> Stmt:
 
@@ -69,6 +81,10 @@ class Parser():
             return self._parse_variable_decl()
         elif(token_type == TokenType.Fn) :
             return self._parse_function_decl()
+        elif(token_type == TokenType.While) :
+            return self._parse_while_stmt()
+        elif(token_type == TokenType.For) :
+            return self._parse_for_stmt()
         else :
             return self._parse_expr()
 
@@ -85,8 +101,7 @@ class Parser():
         if(token_type == TokenType.SemiColon) :
             self._eat()  # expect semi-colon
             if(is_constant) :
-                print('\n\n[PARSER ERROR] : Must assign value to constant expressions. No value provided')
-                exit(0)
+                raise ParserError('Must assign value to constant expressions. No value provided')
             
             return VariableDecl(
                 identifier=identifier,
@@ -130,10 +145,8 @@ class Parser():
         params : List[str] = []
 
         for arg in args :
-            # TOOD : use isinstance() here
-            if(isinstance(arg.kind, Identifier)) :
-                print(f'\n[PARSER ERROR] : Inside function decl parameters are expected to be of type string : {arg.kind}')
-                exit(0)
+            if(arg.kind != NodeType.Identifier) :
+                raise ParserError(f'Inside function decl parameters are expected to be of type string : {arg.kind}')
         
             params.append(cast(Identifier, arg).symbol)
 
@@ -162,6 +175,88 @@ class Parser():
             body=body
         )
 
+    def _parse_block(self, where : str) -> List[Stmt] :
+
+        # { Stmt* } : the body of a loop
+        self._expect(
+            TokenType.OpenBrace,
+            f'Expected {where} body'
+        )
+
+        body : List[Stmt] = []
+
+        while(self._not_eof() and self._at().type != TokenType.CloseBrace) :
+            body.append(self._parse_stmt())
+
+        self._expect(
+            TokenType.CloseBrace,
+            f'Closing brace expected after {where} body'
+        )
+
+        return body
+
+    def _parse_while_stmt(self) -> Stmt :
+
+        # while (condition) { body }
+        self._eat()
+
+        self._expect(
+            TokenType.OpenParam,
+            'Expected open parenthesis following while keyword'
+        )
+
+        condition = self._parse_expr()
+
+        self._expect(
+            TokenType.CloseParam,
+            'Expected closing parenthesis following while condition'
+        )
+
+        return WhileStmt(
+            condition=condition,
+            body=self._parse_block('while loop')
+        )
+
+    def _parse_for_stmt(self) -> Stmt :
+
+        # for (name in start : end) { body }
+        self._eat()
+
+        self._expect(
+            TokenType.OpenParam,
+            'Expected open parenthesis following for keyword'
+        )
+
+        variable = self._expect(
+            TokenType.Identifier,
+            'Expected loop variable name following for'
+        ).value
+
+        self._expect(
+            TokenType.In,
+            'Expected in following the loop variable'
+        )
+
+        start = self._parse_expr()
+
+        self._expect(
+            TokenType.Colon,
+            'Expected colon between the bounds of the range'
+        )
+
+        end = self._parse_expr()
+
+        self._expect(
+            TokenType.CloseParam,
+            'Expected closing parenthesis following the range'
+        )
+
+        return ForStmt(
+            variable=variable,
+            start=start,
+            end=end,
+            body=self._parse_block('for loop')
+        )
 
     def _parse_assignment_expr(self) : 
         assignee : Expr = self._parse_object_expr()
@@ -200,13 +295,16 @@ class Parser():
         while(self._not_eof() and self._at().type != TokenType.CloseBrace) :
 
             # we want to handle { key1 : val1, key2 : val2 } AND { key1, key2 }
-            
-            key = self._expect(
+
+            # quoted keys, { "first name" : val }, always have a value
+            quoted = self._at().type == TokenType.String
+
+            key = self._eat().value if quoted else self._expect(
                 TokenType.Identifier,
                 'Object literal key expected'
             ).value
 
-            token_type = self._at().type
+            token_type = self._at().type if not quoted else TokenType.Colon
 
             # allows short hand : { key1, key2 }. so, key : val -> { key }
             if(token_type == TokenType.Comma) :
@@ -283,7 +381,7 @@ class Parser():
 
         left = self._parse_call_member_expr()
 
-        while (self._at().value == '/' or self._at().value == '*' or self._at() == '%'):
+        while (self._at().value == '/' or self._at().value == '*' or self._at().value == '%'):
             operator = self._eat().value
             right = self._parse_call_member_expr()
 
@@ -375,18 +473,38 @@ class Parser():
             # handling non-computed values : foo.bar
             if(operator.type == TokenType.Dot) :
                 computed = False
-                
-                # to get identifier
-                property = self._parse_primary_expr()
 
-                if(isinstance(property.kind, Identifier)) :
-                    print('\n[PARSER ERROR] : Cannot use dot operator without RHS being an identifier')
+                # the token itself has to be a name : o.(a) and o."a" are
+                # not member expressions
+                if(self._at().type != TokenType.Identifier) :
+                    raise ParserError('Cannot use dot operator without RHS being an identifier')
+
+                property = self._parse_primary_expr()
             
             else :
                 computed = True
 
+                # this allows slices : foo[start:end], foo[:end], foo[start:]
+                start = None if self._at().type == TokenType.Colon else self._parse_expr()
+
+                if(self._at().type == TokenType.Colon) :
+                    self._eat()
+                    end = None if self._at().type == TokenType.CloseBracket else self._parse_expr()
+
+                    self._expect(
+                        TokenType.CloseBracket, 
+                        'Missing closing bracket in slice'
+                    )
+
+                    obj = SliceExpr(
+                        object=obj,
+                        start=start,
+                        end=end
+                    )
+                    continue
+
                 # this allows computed values : foo[computedValue]
-                property = self._parse_expr()
+                property = start
                 
                 self._expect(
                     TokenType.CloseBracket, 
@@ -413,6 +531,11 @@ class Parser():
                 value=float(self._eat().value)
             )
 
+        elif (token_type == TokenType.String):
+            return StringLiteral(
+                value=self._eat().value
+            )
+
         elif (token_type == TokenType.OpenParam):
 
             # open param
@@ -425,13 +548,41 @@ class Parser():
                 TokenType.CloseParam, 'Unexpected token found inside parenthesized expression')
             return value
 
+        elif (token_type == TokenType.OpenBracket):
+            return self._parse_array_expr()
+
         else:
-            print("\nUnexpected token found during parsing : ",
-                  self._at().type, self._at().value)
-            exit(0)
+            raise ParserError(f'Unexpected token found during parsing : {self._at().type} {self._at().value}')
+
+    def _parse_array_expr(self) -> Expr:
+
+        # array literal : [1, 2, 3]. a trailing comma is fine : [1, 2,]
+
+        # advance past open bracket
+        self._eat()
+
+        elements : List[Expr] = []
+
+        while(self._not_eof() and self._at().type != TokenType.CloseBracket) :
+            elements.append(self._parse_expr())
+
+            if(self._at().type != TokenType.CloseBracket) :
+                self._expect(
+                    TokenType.Comma,
+                    'Expected comma or closing bracket following array element'
+                )
+
+        self._expect(
+            TokenType.CloseBracket, 
+            'Array literal missing closing bracket'
+        )
+
+        return ArrayLiteral(
+            elements=elements
+        )
 
     def generate_ast(self, src: str) -> Program:
-        self._tokens = tokenize(src)
+        self._reset(scan(src))
         program: Program = Program()
 
         while (self._not_eof()):
@@ -440,3 +591,13 @@ class Parser():
             )
 
         return program
+
+    def stream_ast(self, stream) -> Iterator[Stmt]:
+
+        # parses a file object or mmap lazily and yields one top level 
+        # statement at a time. neither the source, the tokens nor the 
+        # whole Program are ever held in memory
+        self._reset(scan_stream(stream))
+
+        while (self._not_eof()):
+            yield self._parse_stmt()
@@ -0,0 +1,236 @@
+from typing import List, Dict, Set, Optional, Union
+
+from .ast import *
+
+'''
+
+    - static pass that marks every FunctionDecl of a Program as pure or not
+      (FunctionDecl.pure). a call to a pure function can be replaced by the
+      result of an earlier call with the same arguments
+    - a function is pure when :
+
+        - it never assigns to a variable of an outer scope
+        - it never calls a native function (or anything that is not known
+          to be a declared function : parameters, lets, call results ...)
+        - every function it calls is pure
+        - it never reads a let or a parameter of an outer scope, since those
+          can change between two calls. outer consts and functions are fine
+
+    - calls to functions that have not been decided yet (recursion, mutual
+      recursion) are assumed pure ; the impure ones are then knocked out
+      until nothing changes
+    - names are bound the way the resolver (frontend/resolver.py) binds them :
+      statements of a function in order, nested function bodies once their
+      enclosing scope is complete. a loop is a scope of the function it is
+      in, so a function reading its own lets from a loop stays pure. the
+      variable of a for loop is a let : it changes between iterations
+
+'''
+
+# what a name can be bound to. a FunctionDecl for functions declared in the
+# program, one of these for everything else
+LET = 'let'
+CONST = 'const'
+PURE = 'pure'           # function declared outside the program, known pure
+IMPURE = 'impure'       # native, or function declared outside and not pure
+
+Binding = Union[FunctionDecl, str]
+
+class PurityScope() :
+
+    def __init__(self, parent : Optional['PurityScope'], decl : Optional[FunctionDecl]) -> None:
+        self.parent = parent
+
+        # the function this scope belongs to, None at the top level
+        self.decl = decl
+        self.bindings : Dict[str, Binding] = {}
+
+        # nested function declarations and the scope they are declared in
+        self.pending : List[tuple] = []
+
+class PurityAnalysis() :
+
+    def __init__(self) -> None:
+        self._scope : Optional[PurityScope] = None
+        self._externals : Dict[str, Binding] = {}
+
+        # per function : calls it makes to other declared functions, and
+        # whether it already broke one of the rules by itself
+        self._calls : Dict[FunctionDecl, Set[FunctionDecl]] = {}
+        self._impure : Set[FunctionDecl] = set()
+
+    def analyze(self, program : Program, externals : Dict[str, Binding] = {}) -> Program :
+
+        # externals : names that live outside the program (the global env)
+        self._externals = dict(externals)
+        self._calls = {}
+        self._impure = set()
+
+        # top level declarations are visible from every function body
+        self._scope = PurityScope(None, None)
+        for stmt in program.body :
+            if(stmt.kind == NodeType.VariableDecl) :
+                self._scope.bindings[stmt.identifier] = CONST if stmt.constant else LET
+            elif(stmt.kind == NodeType.FunctionDecl) :
+                self._scope.bindings[stmt.name] = stmt
+
+        for stmt in program.body :
+            self._visit(stmt)
+
+        for (decl, parent) in self._scope.pending :
+            self._visit_function(decl, parent)
+
+        self._scope = None
+
+        # greatest fixed point : pure until proven otherwise
+        pure = { decl for decl in self._calls if decl not in self._impure }
+        changed = True
+        while(changed) :
+            changed = False
+            for decl in list(pure) :
+                if(any(callee not in pure for callee in self._calls[decl])) :
+                    pure.discard(decl)
+                    changed = True
+
+        for decl in self._calls :
+            decl.pure = decl in pure
+
+        return program
+
+    def _lookup(self, name : str) -> tuple :
+
+        # (binding, scope it was found in). scope is None for externals
+        scope = self._scope
+        while(scope is not None) :
+            if(name in scope.bindings) :
+                return (scope.bindings[name], scope)
+            scope = scope.parent
+
+        return (self._externals.get(name, LET), None)
+
+    def _mark_impure(self) -> None :
+        if(self._scope.decl is not None) :
+            self._impure.add(self._scope.decl)
+
+    def _visit_function(self, decl : FunctionDecl, parent : PurityScope) -> None :
+
+        enclosing = self._scope
+        self._scope = PurityScope(parent, decl)
+        self._calls[decl] = set()
+
+        for param in decl.parameters :
+            self._scope.bindings[param] = LET
+
+        for stmt in decl.body :
+            self._visit(stmt)
+
+        for (nested, scope) in self._scope.pending :
+            self._visit_function(nested, scope)
+
+        self._scope = enclosing
+
+    def _visit_loop(self, loop : Stmt) -> None :
+
+        if(loop.kind == NodeType.ForStmt) :
+            self._visit(loop.start)
+            self._visit(loop.end)
+
+        enclosing = self._scope
+        self._scope = PurityScope(enclosing, enclosing.decl)
+
+        for decl in loop.invariants :
+            self._visit(decl)
+
+        if(loop.kind == NodeType.ForStmt) :
+            self._scope.bindings[loop.variable] = LET
+        else :
+            self._visit(loop.condition)
+
+        for stmt in loop.body :
+            self._visit(stmt)
+
+        # functions declared in the body wait for the enclosing function
+        enclosing.pending.extend(self._scope.pending)
+        self._scope = enclosing
+
+    def _outer(self, scope : Optional[PurityScope]) -> bool :
+        # a scope of another function (or the global env)
+        return scope is None or scope.decl is not self._scope.decl
+
+    def _read(self, name : str) -> None :
+        (binding, scope) = self._lookup(name)
+        if(binding == LET and self._outer(scope)) :
+            self._mark_impure()
+
+    def _visit(self, node : Stmt) -> None :
+
+        kind = node.kind
+
+        if(kind == NodeType.Identifier) :
+            self._read(node.symbol)
+
+        elif(kind == NodeType.BinaryExpr) :
+            self._visit(node.left)
+            self._visit(node.right)
+
+        elif(kind == NodeType.AssignmentExpr) :
+            self._visit(node.value)
+
+            if(node.assignee.kind == NodeType.Identifier) :
+                (_, scope) = self._lookup(node.assignee.symbol)
+                if(self._outer(scope)) :
+                    self._mark_impure()
+
+        elif(kind == NodeType.ObjectLiteral) :
+            for prop in node.properties :
+                if(prop.value) :
+                    self._visit(prop.value)
+                else :
+                    self._read(prop.key)
+
+        elif(kind == NodeType.CallExpr) :
+            for arg in node.args :
+                self._visit(arg)
+
+            callee : Binding = IMPURE
+            if(node.caller.kind == NodeType.Identifier) :
+                (callee, _) = self._lookup(node.caller.symbol)
+            else :
+                self._visit(node.caller)
+
+            if(isinstance(callee, FunctionDecl)) :
+                if(self._scope.decl is not None) :
+                    self._calls[self._scope.decl].add(callee)
+            elif(callee != PURE) :
+                self._mark_impure()
+
+        elif(kind == NodeType.MemberExpr) :
+            self._visit(node.object)
+            if(node.computed) :
+                self._visit(node.property)
+
+        elif(kind == NodeType.SliceExpr) :
+            self._visit(node.object)
+            if(node.start is not None) :
+                self._visit(node.start)
+            if(node.end is not None) :
+                self._visit(node.end)
+
+        elif(kind == NodeType.ArrayLiteral) :
+            for element in node.elements :
+                self._visit(element)
+
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value) :
+                self._visit(node.value)
+            # the top level ones were all bound before the first statement
+            if(self._scope.parent is not None) :
+                self._scope.bindings[node.identifier] = CONST if node.constant else LET
+
+        elif(kind == NodeType.FunctionDecl) :
+            if(self._scope.parent is not None) :
+                self._scope.bindings[node.name] = node
+            self._scope.pending.append((node, self._scope))
+
+        elif(kind == NodeType.ForStmt or kind == NodeType.WhileStmt) :
+            self._visit_loop(node)
@@ -0,0 +1,246 @@
+from typing import List, Dict, Set, Optional, Iterable
+
+from .ast import *
+from utils.errors import ScopeError
+
+'''
+
+    - static pass that runs after parsing and works out, for every variable
+      read / write inside a function, which scope it lives in
+    - function scopes are laid out as arrays : each name gets a slot, and
+      every Identifier / AssignmentExpr / VariableDecl / FunctionDecl /
+      PropertyLiteral (short hand) / ForStmt (its variable) gets an address :
+
+            (depth, slot)   depth = how many scopes to walk up
+            None            the name lives in the global env and is looked up by name
+
+    - loops have a scope of their own too, one per run of the loop (every
+      iteration reuses it), so a loop at the top level keeps what its body
+      declares out of the global env. its slots hold the hoisted
+      invariants, the loop variable and the declarations of the body
+
+    - the global scope stays a dict based Environment since the REPL and
+      the native functions keep adding to it
+
+    - statements of a function are resolved in order, so a name that is
+      used before it is declared refers to the outer scope, exactly like it
+      does at run time. nested function bodies are resolved once their
+      enclosing scope is complete, since they can only run after being
+      declared (and so, see everything that was declared before the call)
+
+    - scope errors that the interpreter reports at run time are reported
+      here, before anything runs
+
+'''
+
+class Scope() :
+
+    def __init__(self, parent : Optional['Scope']) -> None:
+        self.parent = parent
+        self.slots : Dict[str, int] = {}
+        self.constants : Set[str] = set()
+
+        # nested function declarations and the scope they are declared in,
+        # resolved once this (function) scope is done
+        self.pending : List[tuple] = []
+
+    def declare(self, name : str, constant : bool) -> int :
+
+        if(name in self.slots) :
+            raise ScopeError(f'Cannot declare variable {name} as it already exists')
+
+        if(constant) :
+            self.constants.add(name)
+
+        self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+class Resolver() :
+
+    def __init__(self) -> None:
+        self._scope : Optional[Scope] = None
+        self._globals : Set[str] = set()
+        self._strict = True
+        self._global_pending : List[tuple] = []
+
+    def resolve(self, program : Program, global_names : Iterable[str] = (), strict : bool = True) -> Program :
+
+        # strict = False leaves names that are nowhere to be found to the
+        # global env at run time, for hosts that only provide their globals
+        # once the program is compiled
+        self._strict = strict
+
+        # every top level declaration is visible from function bodies, no
+        # matter where it appears (the body only runs once it is called)
+        self._globals = set(global_names)
+        for stmt in program.body :
+            if(stmt.kind == NodeType.VariableDecl) :
+                self._globals.add(stmt.identifier)
+            elif(stmt.kind == NodeType.FunctionDecl) :
+                self._globals.add(stmt.name)
+
+        self._scope = None
+        self._global_pending = []
+
+        for stmt in program.body :
+            self._resolve(stmt)
+
+        for (decl, parent) in self._global_pending :
+            self._resolve_function(decl, parent)
+
+        return program
+
+    def _lookup(self, name : str) -> Optional[tuple] :
+
+        depth = 0
+        scope = self._scope
+
+        while(scope is not None) :
+            if(name in scope.slots) :
+                return (depth, scope.slots[name])
+
+            scope = scope.parent
+            depth += 1
+
+        if(self._strict and name not in self._globals) :
+            raise ScopeError(f'Cannot resolve {name} as it does not exist')
+
+        return None
+
+    def _is_constant(self, name : str) -> bool :
+        scope = self._scope
+        while(scope is not None) :
+            if(name in scope.slots) :
+                return name in scope.constants
+            scope = scope.parent
+
+        # global constants are checked by the Environment
+        return False
+
+    def _declare(self, name : str, constant : bool) -> Optional[tuple] :
+        if(self._scope is None) :
+            return None
+
+        return (0, self._scope.declare(name, constant))
+
+    def _resolve_function(self, decl : FunctionDecl, parent : Optional[Scope]) -> None :
+
+        enclosing = self._scope
+        self._scope = Scope(parent)
+
+        for param in decl.parameters :
+            self._scope.declare(param, False)
+
+        for stmt in decl.body :
+            self._resolve(stmt)
+
+        decl.frame_size = len(self._scope.slots)
+
+        scope = self._scope
+        for (nested, parent) in scope.pending :
+            self._resolve_function(nested, parent)
+
+        self._scope = enclosing
+
+    def _resolve_loop(self, loop : Stmt) -> None :
+
+        # the bounds of a for loop were resolved in the enclosing scope
+        enclosing = self._scope
+        self._scope = Scope(enclosing)
+
+        for decl in loop.invariants :
+            self._resolve(decl)
+
+        if(loop.kind == NodeType.ForStmt) :
+            loop.address = (0, self._scope.declare(loop.variable, True))
+        else :
+            self._resolve(loop.condition)
+
+        for stmt in loop.body :
+            self._resolve(stmt)
+
+        loop.frame_size = len(self._scope.slots)
+
+        # functions declared in the body wait, with the loop's scope as
+        # their parent, until the enclosing function's scope is complete
+        pending = enclosing.pending if enclosing is not None else self._global_pending
+        pending.extend(self._scope.pending)
+
+        self._scope = enclosing
+
+    def _resolve(self, node : Stmt) -> None :
+
+        kind = node.kind
+
+        if(kind == NodeType.Identifier) :
+            node.address = self._lookup(node.symbol)
+
+        elif(kind == NodeType.BinaryExpr) :
+            self._resolve(node.left)
+            self._resolve(node.right)
+
+        elif(kind == NodeType.AssignmentExpr) :
+            # the value is evaluated first, then the assignee is looked up
+            self._resolve(node.value)
+
+            if(node.assignee.kind == NodeType.Identifier) :
+                name = node.assignee.symbol
+                node.address = self._lookup(name)
+                node.assignee.address = node.address
+
+                if(node.address is not None and self._is_constant(name)) :
+                    raise ScopeError(f'Cannot re-assign to {name} as it is a constant')
+
+        elif(kind == NodeType.ObjectLiteral) :
+            for prop in node.properties :
+                if(prop.value) :
+                    self._resolve(prop.value)
+                else :
+                    prop.address = self._lookup(prop.key)
+
+        elif(kind == NodeType.CallExpr) :
+            for arg in node.args :
+                self._resolve(arg)
+            self._resolve(node.caller)
+
+        elif(kind == NodeType.MemberExpr) :
+            # foo.bar : bar is a property name. foo[bar] : bar is a variable
+            self._resolve(node.object)
+            if(node.computed) :
+                self._resolve(node.property)
+
+        elif(kind == NodeType.SliceExpr) :
+            self._resolve(node.object)
+            if(node.start is not None) :
+                self._resolve(node.start)
+            if(node.end is not None) :
+                self._resolve(node.end)
+
+        elif(kind == NodeType.ArrayLiteral) :
+            for element in node.elements :
+                self._resolve(element)
+
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value) :
+                self._resolve(node.value)
+            node.address = self._declare(node.identifier, node.constant)
+
+        elif(kind == NodeType.FunctionDecl) :
+            node.address = self._declare(node.name, True)
+
+            if(self._scope is None) :
+                self._global_pending.append((node, None))
+            else :
+                self._scope.pending.append((node, self._scope))
+
+        elif(kind == NodeType.ForStmt) :
+            self._resolve(node.start)
+            self._resolve(node.end)
+            self._resolve_loop(node)
+
+        elif(kind == NodeType.WhileStmt) :
+            self._resolve_loop(node)
+
+        elif(kind == NodeType.Program) :
+            for stmt in node.body :
+                self._resolve(stmt)
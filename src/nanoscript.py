@@ -0,0 +1,203 @@
+from typing import Any, Dict, Optional, Sequence
+
+from frontend.ast import Program
+from frontend.cache import ASTCache
+from frontend.optimizer import Optimizer
+from runtime.interpreter import Interpreter
+from runtime.vm import VM
+from runtime.closure import ClosureInterpreter
+from runtime.unboxed import UnboxedInterpreter
+from runtime.transpiler import TranspilingInterpreter
+from runtime.governor import Budget, Governor, GovernedInterpreter
+from runtime.columnar import ColumnarInterpreter, RowByRow, vectorizable, column, broadcast, columnize
+from runtime.environment import Environment, create_global_env
+from runtime.values.base import RuntimeVal
+from runtime.values.convert import to_runtime, to_python
+from utils.errors import NanoScriptError, CallDepthError
+
+'''
+
+    - API for hosts that embed NanoScript and run many scripts in one
+      long lived process :
+
+            engine = Engine('closure')
+            program = engine.compile(source)
+
+            for row in rows :
+                result = engine.run(program, globals={ 'x' : row.x })
+
+    - compile() lexes, parses, optimizes (optionally) and compiles the
+      script once. run() executes it as many times as needed, each time in
+      a fresh scope on top of the prelude, so runs never see each other's
+      variables
+    - the prelude is the global env (true / false / null / print and
+      whatever the host adds to it) and is built only once per Engine
+    - errors are raised as utils.errors.NanoScriptError subclasses and
+      never end the process
+    - globals and results are converted from / to Python values (see
+      runtime/values/convert.py). pass raw=True to get the RuntimeVal
+    - pass a Budget (runtime/governor.py) to limit the fuel, time, call
+      depth and allocations of every run. only the tree and vm engines
+      enforce budgets. engine.governor.usage() tells what the last run used
+    - run_columns() runs a program over every row of a dataset at once, for
+      scripts used as formulas. columns are bound to the free identifiers
+      and the result comes back as columns (see runtime/columnar.py) :
+
+            engine.run_columns(program, { 'price' : prices, 'qty' : quantities })
+
+      arithmetic and object building programs are run once over whole
+      columns, anything else once per row. the budget only applies to the
+      runs per row
+
+'''
+
+ENGINES = {
+    'tree' : Interpreter,
+    'vm' : VM,
+    'closure' : ClosureInterpreter,
+    'unboxed' : UnboxedInterpreter,
+    'python' : TranspilingInterpreter,
+}
+
+# engines that can run under a Budget
+GOVERNED_ENGINES = ('tree', 'vm')
+
+class CompiledProgram() :
+
+    def __init__(self, source : str, program : Program, engine : str) -> None:
+        self.source = source
+        self.program = program
+
+        # name of the engine the program was compiled for
+        self.engine = engine
+
+class Engine() :
+
+    def __init__(
+            self, engine : str = 'closure', optimize : bool = False, prelude : Environment = None,
+            cache : ASTCache = None, budget : Budget = None
+        ) -> None:
+
+        if(engine not in ENGINES) :
+            raise ValueError(f'Unknown engine {engine}. Available engines : {list(ENGINES.keys())}')
+        if(budget is not None and engine not in GOVERNED_ENGINES) :
+            raise ValueError(f'Budgets are only enforced by the {" and ".join(GOVERNED_ENGINES)} engines, not {engine}')
+
+        self.engine = engine
+        self.optimize = optimize
+        self.prelude = prelude if prelude is not None else create_global_env()
+
+        # one interpreter for every run : the compiled code it caches is
+        # keyed by Program, so every CompiledProgram is compiled only once
+        self.governor = Governor(budget) if budget is not None else None
+
+        if(self.governor is None) :
+            self._interpreter = ENGINES[engine](self.prelude)
+        elif(engine == 'tree') :
+            self._interpreter = GovernedInterpreter(self.prelude, self.governor)
+        else :
+            self._interpreter = VM(self.prelude, governor=self.governor)
+
+        # runs the programs run_columns can vectorize
+        self._columnar = ColumnarInterpreter(self.prelude)
+
+        # pass an ASTCache that writes .nsc files to have compile_file skip
+        # the parser for scripts that did not change
+        self._parser = cache if cache is not None else ASTCache(write=False)
+
+    def define(self, name : str, value : Any, constant : bool = True) -> None :
+        # adds a value (or a Python function, as a native) to the prelude
+        self.prelude.decl_var(name, to_runtime(value), constant)
+
+    def compile(self, source : str) -> CompiledProgram :
+        return self._compile(source, self._parser.parse(source))
+
+    def compile_file(self, path : str) -> CompiledProgram :
+
+        f = open(path, 'r')
+        source = f.read()
+        f.close()
+
+        return self._compile(source, self._parser.load(path))
+
+    def _compile(self, source : str, program : Program) -> CompiledProgram :
+
+        if(self.optimize) :
+            Optimizer().optimize(program)
+
+        # globals are only known once the program runs, so names that are
+        # not declared anywhere are left to be looked up at run time
+        if(self.engine in ('closure', 'unboxed', 'python')) :
+            self._interpreter.compile(program, self.prelude, strict=False)
+        elif(self.engine == 'vm') :
+            self._interpreter.compile(program)
+
+        return CompiledProgram(source, program, self.engine)
+
+    def run(self, compiled : CompiledProgram, globals : Optional[Dict[str, Any]] = None, raw : bool = False) -> Any :
+
+        if(compiled.engine != self.engine) :
+            raise ValueError(f'Program was compiled for the {compiled.engine} engine, not {self.engine}')
+
+        env = self._scope(globals)
+
+        if(self.governor is not None) :
+            self.governor.start()
+
+        try :
+            result : RuntimeVal = self._interpreter.evaluate(compiled.program, env)
+        except RecursionError :
+            raise CallDepthError('Maximum call depth exceeded') from None
+
+        return result if raw else to_python(result)
+
+    def run_columns(
+            self, compiled : CompiledProgram, columns : Dict[str, Sequence], globals : Optional[Dict[str, Any]] = None,
+            raw : bool = False
+        ) -> Any :
+
+        if(compiled.engine != self.engine) :
+            raise ValueError(f'Program was compiled for the {compiled.engine} engine, not {self.engine}')
+
+        if(not columns) :
+            raise ValueError('run_columns needs at least one column')
+
+        lengths = { len(values) for values in columns.values() }
+        if(len(lengths) != 1) :
+            raise ValueError(f'Columns must all have the same length, got {sorted(lengths)}')
+        rows = lengths.pop()
+
+        result = None
+
+        if(vectorizable(compiled.program)) :
+            bound = { name : column(values) for (name, values) in columns.items() }
+            if(all(values is not None for values in bound.values())) :
+                try :
+                    result = broadcast(self._columnar.run(compiled.program, bound, self._scope(globals)), rows)
+                except (RowByRow, NanoScriptError) :
+                    # the runs per row give the results (or the error) instead
+                    result = None
+
+        if(result is None) :
+            names = list(columns.keys())
+            values = [items.tolist() if hasattr(items, 'tolist') else list(items) for items in columns.values()]
+            results = []
+            for row in zip(*values) :
+                scope = dict(globals or {})
+                scope.update(zip(names, row))
+                results.append(self.run(compiled, scope, raw=True))
+            result = columnize(results)
+
+        return result if raw else to_python(result)
+
+    def _scope(self, globals : Optional[Dict[str, Any]]) -> Environment :
+        # the scope of one run, on top of the prelude
+        env = Environment(parent=self.prelude)
+        for (name, value) in (globals or {}).items() :
+            env.decl_var(name, to_runtime(value), False)
+        return env
+
+    def eval(self, source : str, globals : Optional[Dict[str, Any]] = None, raw : bool = False) -> Any :
+        return self.run(self.compile(source), globals, raw)
+
+__all__ = ['Engine', 'CompiledProgram', 'NanoScriptError']
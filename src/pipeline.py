@@ -0,0 +1,203 @@
+import os
+import re
+import sys
+import csv
+import json
+import math
+import time
+import argparse
+from typing import Any, Dict, Iterable, Iterator, TextIO
+
+from nanoscript import Engine, CompiledProgram, ENGINES
+from batch import jsonable
+from runtime.values.convert import to_runtime
+from utils.errors import NanoScriptError
+
+'''
+
+    - runs one script over every record of a CSV or JSONL file, for
+      datasets that do not fit in memory :
+
+            python pipeline.py rules.ns data.csv --output results.jsonl
+
+    - records are read one at a time, each one is run and its result is
+      written out before the next one is read, so memory use does not
+      grow with the input
+    - the script is compiled once. a run only binds the fields of its
+      record as variables in a fresh scope on top of the prelude (see
+      Engine.run), nothing is parsed and no global env is built per record
+    - CSV fields are numbers, true, false, null (an empty field too) or
+      strings. only plain decimals (12, -3.5, .5, 1e3) are numbers : nan,
+      inf, 1_000 or a number too big for a float stay strings. JSONL lines
+      are JSON objects. fields NanoScript has no value for are not bound
+    - one JSON object per record, in input order :
+
+            {"record" : 0, "result" : ...}
+            {"record" : 1, "error" : {"type", "message"}}
+
+      a record that fails (a NanoScriptError or a line that is not a JSON
+      object) gets an "error" entry and the pipeline goes on, unless
+      --stop-on-error is passed
+    - records / second are reported on stderr at the end (and every
+      --progress records)
+
+'''
+
+# ------------------------------------------------------------------------------
+# Readers
+# ------------------------------------------------------------------------------
+
+FORMATS = ('csv', 'jsonl')
+
+# what float() reads that a CSV number is not : nan, inf, 1_000, spaces
+DECIMAL = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
+
+def _field(text : str) -> Any :
+
+    # CSV fields are all text : read back the values they hold
+    if(text == '' or text == 'null') :
+        return None
+    if(text == 'true' or text == 'false') :
+        return text == 'true'
+    if(DECIMAL.fullmatch(text)) :
+        value = float(text)
+        if(math.isfinite(value)) :
+            return value
+    return text
+
+def read_csv(stream : TextIO) -> Iterator[Dict[str, Any]] :
+    for row in csv.DictReader(stream) :
+        yield { key : _field(value) for (key, value) in row.items() }
+
+def read_jsonl(stream : TextIO) -> Iterator[Any] :
+    # blank lines are skipped, anything else is one record (or the error
+    # decoding it, raised when the record is run)
+    for line in stream :
+        if(line.strip()) :
+            try :
+                yield json.loads(line)
+            except ValueError as err :
+                yield err
+
+READERS = {
+    'csv' : read_csv,
+    'jsonl' : read_jsonl,
+}
+
+def detect_format(path : str) -> str :
+
+    extension = os.path.splitext(path)[1].lower()
+    if(extension == '.csv') :
+        return 'csv'
+    if(extension in ('.jsonl', '.ndjson')) :
+        return 'jsonl'
+
+    raise ValueError(f'Cannot tell the format of {path}, pass one of {list(FORMATS)}')
+
+def read_records(stream : TextIO, format : str) -> Iterator[Any] :
+
+    if(format not in READERS) :
+        raise ValueError(f'Unknown format {format}. Available formats : {list(FORMATS)}')
+
+    return READERS[format](stream)
+
+# ------------------------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------------------------
+
+class Pipeline() :
+
+    def __init__(self, engine : Engine, compiled : CompiledProgram, stop_on_error : bool = False) -> None:
+        self.engine = engine
+        self.compiled = compiled
+        self.stop_on_error = stop_on_error
+
+        self.counts = { 'ok' : 0, 'error' : 0 }
+        self.elapsed = 0.0
+
+    @property
+    def records(self) -> int :
+        return self.counts['ok'] + self.counts['error']
+
+    @property
+    def rate(self) -> float :
+        # records / second so far
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+    def bind(self, record : Any) -> Dict[str, Any] :
+
+        if(isinstance(record, ValueError)) :
+            raise record
+        if(not isinstance(record, dict)) :
+            raise ValueError(f'Record is not an object : {record!r}')
+
+        fields = {}
+        for (name, value) in record.items() :
+            try :
+                fields[name] = to_runtime(value)
+            except TypeError :
+                # nothing to bind it to
+                pass
+
+        return fields
+
+    def run(self, records : Iterable[Any]) -> Iterator[Dict[str, Any]] :
+
+        # yields the output of every record as soon as it is run
+        start = time.perf_counter()
+
+        try :
+            for (index, record) in enumerate(records) :
+                try :
+                    result = self.engine.run(self.compiled, self.bind(record))
+                    output = { 'record' : index, 'result' : jsonable(result) }
+                    self.counts['ok'] += 1
+                except (NanoScriptError, ValueError) as err :
+                    if(self.stop_on_error) :
+                        raise
+                    output = { 'record' : index, 'error' : { 'type' : type(err).__name__, 'message' : str(err) } }
+                    self.counts['error'] += 1
+
+                self.elapsed = time.perf_counter() - start
+                yield output
+        finally :
+            self.elapsed = time.perf_counter() - start
+
+    def report(self) -> str :
+        return f'{self.records} records in {self.elapsed:.2f} s ({self.rate:.1f} / s) : {self.counts}'
+
+if __name__ == '__main__' :
+
+    ap = argparse.ArgumentParser(description='Run a NanoScript script over every record of a CSV or JSONL file')
+    ap.add_argument('script', help='script run for every record')
+    ap.add_argument('input', help='CSV or JSONL file, - for stdin')
+    ap.add_argument('--format', choices=FORMATS, default=None, help='input format (default : from the file extension)')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='closure', help='execution engine')
+    ap.add_argument('--optimize', action='store_true', help='run the AST optimizer before executing')
+    ap.add_argument('--output', default=None, help='JSONL file to write to (default : stdout)')
+    ap.add_argument('--stop-on-error', action='store_true', help='stop at the first record that fails')
+    ap.add_argument('--progress', type=int, default=None, metavar='N', help='report the rate every N records')
+    args = ap.parse_args()
+
+    if(args.input == '-' and args.format is None) :
+        ap.error('--format is needed to read from stdin')
+
+    format = args.format or detect_format(args.input)
+    engine = Engine(args.engine, args.optimize)
+    pipeline = Pipeline(engine, engine.compile_file(args.script), args.stop_on_error)
+
+    stream = sys.stdin if args.input == '-' else open(args.input, 'r', newline='')
+    out = open(args.output, 'w') if args.output else sys.stdout
+
+    try :
+        for output in pipeline.run(read_records(stream, format)) :
+            out.write(json.dumps(output) + '\n')
+            if(args.progress and pipeline.records % args.progress == 0) :
+                print(pipeline.report(), file=sys.stderr)
+    finally :
+        if(stream is not sys.stdin) :
+            stream.close()
+        if(out is not sys.stdout) :
+            out.close()
+
+    print(pipeline.report(), file=sys.stderr)
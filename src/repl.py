@@ -1,15 +1,26 @@
 import json
+import argparse
 from frontend.parser import Parser, Program
 from runtime.values.base import RuntimeVal
 from runtime.interpreter import Interpreter
 from runtime.environment import create_global_env
+from runtime.memo import MemoCache
+from runtime.profiler import ProfilingInterpreter
+from frontend.optimizer import Optimizer
+from frontend.cache import ASTCache
+from frontend.packed import pack
+from nanoscript import ENGINES
 
 from utils.print import print_tree
+from utils.errors import NanoScriptError
 
-def repl() :
+def repl(engine : str = 'tree', optimizer : Optimizer = None) :
 
     print('\nNanoScript v0.1\n')
 
+    # lines that are typed again are not parsed again
+    cache = ASTCache(write=False)
+
     # global env since we want to persist the env across the entire repl session
     env = create_global_env()
     
@@ -18,22 +29,64 @@ def repl() :
         if(inp == '' or inp == 'exit') :
             exit(0)
         
-        parser = Parser()
+        # an error only ends the line that caused it, not the session
+        try :
+            program : Program = cache.parse(inp)
+            if(optimizer) :
+                optimizer.optimize(program)
 
-        program : Program = parser.generate_ast(inp)
-        interpreter = Interpreter(env)
+            interpreter = ENGINES[engine](env)
        
-        result : RuntimeVal = interpreter.evaluate(program)
-        print(result.__dict__)
+            result : RuntimeVal = interpreter.evaluate(program)
+        except NanoScriptError as err :
+            print(f'\n{err}\n')
+            continue
+
+        print(result.to_dict())
+
+def stream(path : str, engine : str = 'tree', optimizer : Optimizer = None, memo : MemoCache = None) -> RuntimeVal :
+
+    # runs the script one top level statement at a time, as it is read : its
+    # source, its tokens and its whole AST are never in memory at once (see
+    # Parser.stream_ast). the statements share one env, like the lines of a
+    # repl session, and the result is the one of the last statement
+    env = create_global_env()
+    interpreter = Interpreter(env, memo=memo) if memo is not None else ENGINES[engine](env)
+    result : RuntimeVal = None
+
+    with open(path, 'rb') as f :
+        for stmt in Parser().stream_ast(f) :
+            program = Program()
+            program.body.append(stmt)
+
+            if(optimizer) :
+                optimizer.optimize(program)
+
+            # a global may be declared by a statement that is not read yet
+            if(memo is None and engine in ('closure', 'unboxed', 'python')) :
+                interpreter.compile(program, env, strict=False)
+
+            result = interpreter.evaluate(program)
 
-def run() :
+    return result
+
+def run(
+        path : str = './../tests/test.txt', engine : str = 'tree', optimizer : Optimizer = None, memo : MemoCache = None,
+        cache : ASTCache = None, packed : bool = False, profile : bool = False, flamegraph : str = None,
+        streamed : bool = False
+    ) :
 
     print('\nNanoScript v0.1\n')
 
+    if(streamed) :
+        result = stream(path, engine, optimizer, memo)
+        print(result.to_dict() if result is not None else None)
+        return
+
     # global env since we want to persist the env across the entire repl session
     env = create_global_env()
     
-    f = open('./../tests/test.txt', 'r')
+    f = open(path, 'r')
     inp = f.read()
     f.close()
     
@@ -41,18 +94,41 @@ def run() :
     print(inp)
     print()
 
-    parser = Parser()
+    # the cache skips the lexer and the parser when the script has not changed
+    program : Program = cache.load(path) if cache is not None else Parser().generate_ast(inp)
+
+    if(optimizer) :
+        report = optimizer.optimize(program)
+        print(json.dumps(report.to_dict(), indent=2))
+
+    # packed trees are read only, so they are packed once optimized
+    if(packed) :
+        program = pack(program)
 
-    program : Program = parser.generate_ast(inp)
     print(json.dumps(program.to_dict(), indent=2))
 
-    interpreter = Interpreter(env)
+    if(profile or flamegraph) :
+        interpreter = ProfilingInterpreter(env, memo=memo)
+    elif(memo is not None) :
+        interpreter = Interpreter(env, memo=memo)
+    else :
+        interpreter = ENGINES[engine](env)
     
     result : RuntimeVal = interpreter.evaluate(program)
 
+    if(memo is not None) :
+        print(json.dumps(memo.stats(), indent=2))
+
+    if(profile) :
+        print()
+        print(interpreter.profile.summary())
+
+    if(flamegraph) :
+        interpreter.profile.write_collapsed(flamegraph)
+
     try :
         print()
-        print(result.__dict__)
+        print(result.to_dict())
         print()
     except :
         pass
@@ -60,7 +136,43 @@ def run() :
 
 if __name__ == '__main__' :
 
-    # repl()
-    run()
+    ap = argparse.ArgumentParser(description='NanoScript')
+    ap.add_argument('path', nargs='?', default='./../tests/test.txt', help='script to run')
+    ap.add_argument('--engine', choices=list(ENGINES.keys()), default='tree', help='execution engine')
+    ap.add_argument('--repl', action='store_true', help='start an interactive session instead')
+    ap.add_argument('--optimize', action='store_true', help='run the AST optimizer before executing')
+    ap.add_argument('--disable-pass', action='append', default=[], metavar='PASS', help='switch off one optimizer pass (repeatable)')
+    ap.add_argument('--memo', type=int, default=0, metavar='SIZE', help='memoize calls to pure functions in an LRU cache of SIZE entries (tree engine only)')
+    ap.add_argument('--no-cache', action='store_true', help='always parse the script instead of using its .nsc file')
+    ap.add_argument('--cache-dir', default=None, metavar='DIR', help='where .nsc files go (default : __nscache__ next to the script)')
+    ap.add_argument('--packed', action='store_true', help='run the program from the compact struct-of-arrays AST')
+    ap.add_argument('--profile', action='store_true', help='print time and call counts per function (tree engine only)')
+    ap.add_argument('--flamegraph', default=None, metavar='FILE', help='write the profile as collapsed stacks for flamegraph tools (tree engine only)')
+    ap.add_argument('--stream', action='store_true', help='run the script one statement at a time as it is read, for scripts too big to hold in memory')
+    args = ap.parse_args()
+
+    if(args.memo and args.engine != 'tree') :
+        print('\n[REPL ERROR] : --memo is only supported by the tree engine')
+        exit(0)
+
+    if((args.profile or args.flamegraph) and args.engine != 'tree') :
+        print('\n[REPL ERROR] : --profile and --flamegraph are only supported by the tree engine')
+        exit(0)
+
+    if(args.stream and (args.packed or args.profile or args.flamegraph)) :
+        print('\n[REPL ERROR] : --stream does not go with --packed, --profile or --flamegraph')
+        exit(0)
+
+    memo = MemoCache(args.memo) if args.memo else None
+    cache = ASTCache(cache_dir=args.cache_dir) if not args.no_cache else None
+    optimizer = Optimizer(disabled=set(args.disable_pass)) if args.optimize else None
+
+    if(args.repl) :
+        repl(args.engine, optimizer)
+    else :
+        try :
+            run(args.path, args.engine, optimizer, memo, cache, args.packed, args.profile, args.flamegraph, args.stream)
+        except NanoScriptError as err :
+            print(f'\n{err}')
 
 
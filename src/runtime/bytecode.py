@@ -0,0 +1,361 @@
+from enum import IntEnum
+from typing import List, Dict, Any
+
+from frontend.ast import *
+from .values.make import make_null, make_number
+from .values.string import intern_string
+from .values.shape import shape_of, InlineCache
+from utils.errors import InterpreterError, PropertyError
+
+'''
+
+    - compiles the AST into a flat list of instructions that the VM in
+      runtime/vm.py can run without ever looking at the tree again
+    - every instruction takes exactly two slots in CodeObject.code : the
+      opcode and its argument (0 when unused)
+    - function bodies are compiled once, when their declaration is compiled,
+      and stored as nested CodeObjects in the constant pool
+    - a call that is the last statement of a function body is compiled to
+      TAIL_CALL, so the VM can run it in the caller's frame instead of
+      stacking a new one on top
+    - loops are the only code that jumps backwards. a loop enters one
+      scope (ENTER_SCOPE) and empties it at the start of every iteration
+      (RESET_SCOPE) instead of creating a new one, unless the body declares
+      a function (RENEW_SCOPE, see runtime/loops.py). a for loop keeps the
+      counter of runtime/loops.py on the stack, FOR_NEXT pushes its next
+      value as a raw float and BIND_COUNTER boxes it into the variable,
+      unless the body never uses the variable (then it is just popped).
+      when the body only computes with it, the counter is numbers() and
+      BIND_NUMBER binds the NumberVal it hands out
+
+'''
+
+class OpCode(IntEnum) :
+
+    LOAD_CONST = 0          # push consts[arg]
+    LOAD_NAME = 1           # push env.lookup_var(names[arg])
+    STORE_NAME = 2          # env.assign_var(names[arg], top) and leave top on the stack
+    DECLARE_LET = 3         # env.decl_var(names[arg], pop, False) and push the result
+    DECLARE_CONST = 4       # env.decl_var(names[arg], pop, True) and push the result
+    BINARY_OP = 5           # pop right, pop left, push left <BINARY_OPERATORS[arg]> right
+    BUILD_OBJECT = 6        # consts[arg] is (keys, shape) : pop len(keys) values into an object
+    MAKE_FUNCTION = 7       # push a FunctionVal for the FunctionCode at consts[arg]
+    CALL = 8                # pop the callee, pop arg arguments, call it
+    POP = 9                 # discard top
+    RETURN = 10             # return top to the caller
+    FAIL = 11               # consts[arg] is (error class, message) : raise it
+    GET_PROPERTY = 12       # consts[arg] is (key, cache) : replace top with top.key
+    GET_COMPUTED = 13       # consts[arg] is (cache, node) : pop key, replace top with top[key]
+    TAIL_CALL = 14          # CALL in tail position : the callee replaces the current frame
+    BUILD_ARRAY = 15        # pop arg values into an array
+    GET_SLICE = 16          # consts[arg] is (has start, has end, node) : pop the bounds given, replace top with top[start:end]
+    ENTER_SCOPE = 17        # run in a new Environment, child of the current one
+    EXIT_SCOPE = 18         # back to the parent of the current Environment
+    RESET_SCOPE = 19        # forget everything declared in the current Environment
+    JUMP = 20               # continue at code[arg]
+    JUMP_IF_FALSE = 21      # pop, continue at code[arg] if it is not truthy
+    FOR_RANGE = 22          # consts[arg] is (start node, end node, numbers) : pop end, pop start, push a counter (or numbers()) over them
+    FOR_NEXT = 23           # push the next value of the counter on top, or pop the counter and continue at code[arg]
+    BIND_COUNTER = 24       # declare the constant names[arg] holding the value (a raw float) popped
+    RENEW_SCOPE = 25        # unless it is empty, replace the current Environment by a new child of its parent
+    BIND_NUMBER = 26        # declare the constant names[arg] holding the NumberVal popped
+
+BINARY_OPERATORS : List[str] = ['+', '-', '*', '/', '%']
+
+class CodeObject() :
+
+    def __init__(self, name : str) -> None:
+        self.name = name
+        self.code : List[int] = []
+        self.consts : List[Any] = []
+        self.names : List[str] = []
+
+        # used to de-duplicate entries in the pools
+        self._const_index : Dict[Any, int] = {}
+        self._name_index : Dict[str, int] = {}
+
+        # what one run of this code costs the governor (runtime/governor.py),
+        # set once the code is complete. outside of loops every instruction
+        # runs at most once, so the VM charges it all up front. a loop runs
+        # again every time it jumps backwards : loops maps the position of
+        # each backward JUMP to what one more iteration costs
+        self.fuel = 0
+        self.allocations = 0
+        self.loops : Dict[int, tuple] = {}
+
+    def finish(self) -> None :
+        self.fuel, self.allocations = self._cost(0, len(self.code))
+
+        for pc in range(0, len(self.code), 2) :
+            if(self.code[pc] == OpCode.JUMP and self.code[pc + 1] < pc) :
+                self.loops[pc] = self._cost(self.code[pc + 1], pc + 2)
+
+    def _cost(self, start : int, end : int) -> tuple :
+        ops = self.code[start:end:2]
+        allocating = (
+            int(OpCode.BINARY_OP), int(OpCode.BUILD_OBJECT), int(OpCode.MAKE_FUNCTION),
+            int(OpCode.BUILD_ARRAY), int(OpCode.GET_SLICE), int(OpCode.ENTER_SCOPE), int(OpCode.BIND_COUNTER),
+            int(OpCode.RENEW_SCOPE)
+        )
+        return (len(ops), sum(1 for op in ops if op in allocating))
+
+    def emit(self, op : OpCode, arg : int = 0) -> int :
+        # the position of the instruction, to patch the target of a jump
+        self.code.append(int(op))
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def patch(self, pc : int, target : int) -> None :
+        self.code[pc + 1] = target
+
+    def add_const(self, value : Any, key : Any = None) -> int :
+
+        # values that are not hashable (or not safe to share) are always appended
+        if(key is None) :
+            self.consts.append(value)
+            return len(self.consts) - 1
+
+        if(key not in self._const_index) :
+            self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+
+        return self._const_index[key]
+
+    def add_name(self, name : str) -> int :
+        if(name not in self._name_index) :
+            self._name_index[name] = len(self.names)
+            self.names.append(name)
+
+        return self._name_index[name]
+
+class FunctionCode() :
+
+    # everything the VM needs to create a FunctionVal at run time
+    def __init__(self, decl : FunctionDecl, code : CodeObject) -> None:
+        self.decl = decl
+        self.name = decl.name
+        self.parameters = decl.parameters
+        self.code = code
+
+class Compiler() :
+
+    def compile_program(self, program : Program) -> CodeObject :
+        code = CodeObject('<program>')
+        self._compile_body(program.body, code)
+        return code
+
+    def compile_function(self, decl : FunctionDecl) -> FunctionCode :
+        code = CodeObject(decl.name)
+        self._compile_body(decl.body, code, tail_calls=True)
+        return FunctionCode(decl, code)
+
+    def _compile_body(self, body : List[Stmt], code : CodeObject, tail_calls : bool = False) -> None :
+
+        # a body evaluates to its last statement (null when it is empty),
+        # so every other statement's result is popped
+        if(len(body) == 0) :
+            code.emit(OpCode.LOAD_CONST, code.add_const(make_null(), key=('null',)))
+
+        for (i, stmt) in enumerate(body) :
+            if(tail_calls and i == len(body) - 1 and stmt.kind == NodeType.CallExpr) :
+                # the value of the call is the value of the body
+                self._compile_call(stmt, code, OpCode.TAIL_CALL)
+            else :
+                self._compile(stmt, code)
+
+            if(i != len(body) - 1) :
+                code.emit(OpCode.POP)
+
+        code.emit(OpCode.RETURN)
+        code.finish()
+
+    def _compile_call(self, node : CallExpr, code : CodeObject, op : OpCode) -> None :
+        for arg in node.args :
+            self._compile(arg, code)
+        self._compile(node.caller, code)
+        code.emit(op, len(node.args))
+
+    def _enter_loop(self, loop : Stmt, code : CodeObject) -> None :
+
+        # the hoisted invariants get a scope of their own, outside of the
+        # one RESET_SCOPE empties
+        if(loop.invariants) :
+            code.emit(OpCode.ENTER_SCOPE)
+            for decl in loop.invariants :
+                self._compile(decl, code)
+                code.emit(OpCode.POP)
+
+        code.emit(OpCode.ENTER_SCOPE)
+
+    def _scope_op(self, loop : Stmt) -> OpCode :
+        # what starts an iteration
+        return OpCode.RENEW_SCOPE if captures_scope(loop) else OpCode.RESET_SCOPE
+
+    def _compile_loop_body(self, loop : Stmt, code : CodeObject, top : int) -> int :
+
+        # the body, the jump back to top, and what runs once the loop is
+        # done (a loop evaluates to null). returns where the loop exits to
+        for stmt in loop.body :
+            self._compile(stmt, code)
+            code.emit(OpCode.POP)
+
+        code.emit(OpCode.JUMP, top)
+        exit = len(code.code)
+
+        for _ in range(2 if loop.invariants else 1) :
+            code.emit(OpCode.EXIT_SCOPE)
+
+        code.emit(OpCode.LOAD_CONST, code.add_const(make_null(), key=('null',)))
+        return exit
+
+    def _fail(self, error : type, message : str, code : CodeObject) -> None :
+        code.emit(OpCode.FAIL, code.add_const((error, message)))
+
+    def _compile(self, node : Stmt, code : CodeObject) -> None :
+
+        kind = node.kind
+
+        if(kind == NodeType.NumericalLiteral) :
+            code.emit(OpCode.LOAD_CONST, code.add_const(make_number(node.value), key=('number', type(node.value), node.value)))
+
+        elif(kind == NodeType.StringLiteral) :
+            code.emit(OpCode.LOAD_CONST, code.add_const(intern_string(node.value), key=('string', node.value)))
+
+        elif(kind == NodeType.Identifier) :
+            code.emit(OpCode.LOAD_NAME, code.add_name(node.symbol))
+
+        elif(kind == NodeType.BinaryExpr) :
+            self._compile(node.left, code)
+            self._compile(node.right, code)
+
+            code.emit(OpCode.BINARY_OP, BINARY_OPERATORS.index(node.operator))
+
+        elif(kind == NodeType.AssignmentExpr) :
+            if(node.assignee.kind != NodeType.Identifier) :
+                self._fail(InterpreterError, f'Invalid LHS inside assignmenr expr : {node.assignee.to_dict()}', code)
+                return
+
+            self._compile(node.value, code)
+            code.emit(OpCode.STORE_NAME, code.add_name(node.assignee.symbol))
+
+        elif(kind == NodeType.ObjectLiteral) :
+            keys = []
+            for prop in node.properties :
+                # to handle { foo } which is the same as { foo : foo }
+                if(prop.value) :
+                    self._compile(prop.value, code)
+                else :
+                    code.emit(OpCode.LOAD_NAME, code.add_name(prop.key))
+                keys.append(prop.key)
+
+            code.emit(OpCode.BUILD_OBJECT, code.add_const((tuple(keys), shape_of(keys)), key=('keys', tuple(keys))))
+
+        elif(kind == NodeType.ArrayLiteral) :
+            for element in node.elements :
+                self._compile(element, code)
+
+            code.emit(OpCode.BUILD_ARRAY, len(node.elements))
+
+        elif(kind == NodeType.CallExpr) :
+            self._compile_call(node, code, OpCode.CALL)
+
+        elif(kind == NodeType.MemberExpr) :
+            # (foo.bar).baz, one level at a time. every site gets its own inline cache
+            self._compile(node.object, code)
+
+            if(node.computed) :
+                self._compile(node.property, code)
+                code.emit(OpCode.GET_COMPUTED, code.add_const((InlineCache(), node.property)))
+
+            elif(node.property.kind == NodeType.Identifier) :
+                code.emit(OpCode.GET_PROPERTY, code.add_const((node.property.symbol, InlineCache())))
+
+            else :
+                self._fail(PropertyError, f'Error occured while evaluating member expression : {node.property.to_dict()}', code)
+
+        elif(kind == NodeType.SliceExpr) :
+            self._compile(node.object, code)
+            for bound in (node.start, node.end) :
+                if(bound is not None) :
+                    self._compile(bound, code)
+
+            code.emit(OpCode.GET_SLICE, code.add_const((node.start is not None, node.end is not None, node)))
+
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value) :
+                self._compile(node.value, code)
+            else :
+                code.emit(OpCode.LOAD_CONST, code.add_const(make_null(), key=('null',)))
+
+            op = OpCode.DECLARE_CONST if node.constant else OpCode.DECLARE_LET
+            code.emit(op, code.add_name(node.identifier))
+
+        elif(kind == NodeType.FunctionDecl) :
+            fn_code = self.compile_function(node)
+            code.emit(OpCode.MAKE_FUNCTION, code.add_const(fn_code))
+            code.emit(OpCode.DECLARE_CONST, code.add_name(node.name))
+
+        elif(kind == NodeType.ForStmt) :
+            # the bounds are evaluated in the enclosing scope
+            self._compile(node.start, code)
+            self._compile(node.end, code)
+            shared = binds_variable(node) and not counter_escapes(node)
+            code.emit(OpCode.FOR_RANGE, code.add_const((node.start, node.end, shared)))
+            self._enter_loop(node, code)
+
+            top = code.emit(OpCode.FOR_NEXT)
+            code.emit(self._scope_op(node))
+            if(shared) :
+                code.emit(OpCode.BIND_NUMBER, code.add_name(node.variable))
+            elif(binds_variable(node)) :
+                code.emit(OpCode.BIND_COUNTER, code.add_name(node.variable))
+            else :
+                code.emit(OpCode.POP)
+
+            code.patch(top, self._compile_loop_body(node, code, top))
+
+        elif(kind == NodeType.WhileStmt) :
+            self._enter_loop(node, code)
+
+            top = code.emit(self._scope_op(node))
+            self._compile(node.condition, code)
+            exit = code.emit(OpCode.JUMP_IF_FALSE)
+
+            code.patch(exit, self._compile_loop_body(node, code, top))
+
+        else :
+            self._fail(InterpreterError, f'This AST node has not been yet been setup for interpretation : {node.to_dict()}', code)
+
+def disassemble(code : CodeObject, indent : int = 0) -> None :
+
+    pad = '  ' * indent
+    print(f'{pad}<code {code.name}>')
+
+    for pc in range(0, len(code.code), 2) :
+        op = OpCode(code.code[pc])
+        arg = code.code[pc + 1]
+
+        detail = ''
+        if(op in (OpCode.LOAD_NAME, OpCode.STORE_NAME, OpCode.DECLARE_LET, OpCode.DECLARE_CONST, OpCode.BIND_COUNTER, OpCode.BIND_NUMBER)) :
+            detail = code.names[arg]
+        elif(op in (OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.FOR_NEXT)) :
+            detail = f'to {arg // 2}'
+        elif(op == OpCode.BINARY_OP) :
+            detail = BINARY_OPERATORS[arg]
+        elif(op in (OpCode.BUILD_OBJECT, OpCode.GET_PROPERTY)) :
+            detail = code.consts[arg][0]
+        elif(op in (OpCode.LOAD_CONST, OpCode.FAIL)) :
+            const = code.consts[arg]
+            detail = const.to_dict() if hasattr(const, 'to_dict') else repr(const)
+        elif(op in (OpCode.CALL, OpCode.TAIL_CALL)) :
+            detail = f'{arg} args'
+        elif(op == OpCode.BUILD_ARRAY) :
+            detail = f'{arg} elements'
+        elif(op == OpCode.GET_SLICE) :
+            (has_start, has_end, _) = code.consts[arg]
+            detail = f'{"start" if has_start else ""}:{"end" if has_end else ""}'
+
+        print(f'{pad}{pc // 2:4d} {op.name:<14} {arg:<4} {detail}')
+
+        if(op == OpCode.MAKE_FUNCTION) :
+            disassemble(code.consts[arg].code, indent + 1)
@@ -0,0 +1,570 @@
+import weakref
+from typing import List, Callable, cast
+
+from frontend.ast import *
+from .values.base import RuntimeVal, ValueType
+from .values.derived import ObjectVal, NumberVal
+from .values.advanced import FunctionVal
+from .values.make import make_null, make_number
+from .values.array import make_array, array_index, array_slice, array_property
+from .values.string import intern_string, string_binary
+from .vectorized import elementwise
+from .values.shape import InlineCache, shape_of, property_key
+from .environment import Environment, SlotFrame, UNSET, visible_names
+from .loops import counter, numbers, range_bound, truthy
+from frontend.resolver import Resolver
+from utils.errors import ScopeError, InterpreterError, DivisionByZeroError, CallError, PropertyError
+
+'''
+
+    - compiles every Stmt / Expr once into a nested Python closure that
+      takes the env and returns a RuntimeVal
+    - all the decisions the tree walker makes on every visit (which node
+      kind is this, which operator, what is the member path) are made
+      once at compile time and baked into the closure
+    - function bodies are compiled when their declaration is first seen
+      and the result is cached on the FunctionDecl, so every FunctionVal
+      created from it (and every call to those) shares the same closure
+    - programs go through frontend/resolver.py first. variables local to a
+      function live in the slots of a SlotFrame and are read / written by
+      (depth, slot) ; only globals are still looked up by name
+    - a loop creates one SlotFrame when it starts, which all of its
+      iterations share, unless the body declares a function : then every
+      iteration gets one of its own, starting from the invariants. the loop
+      is a Python loop over the closure of its body : for loops over
+      runtime/loops.py counter(), boxing the values (with map, so still in
+      C) only when the body uses the variable, and over numbers() when the
+      body only computes with it
+
+'''
+
+Compiled = Callable[[Environment], RuntimeVal]
+
+OBJECT = ValueType.Object
+ARRAY = ValueType.Array
+STRING = ValueType.String
+
+def _fail(error : type, message : str) -> Compiled :
+
+    # errors the tree walker reports while evaluating a node are
+    # reported by the compiled closure at the same point in time
+    def run(env : Environment) -> RuntimeVal :
+        raise error(message)
+
+    return run
+
+def _unresolved(name : str) -> None :
+
+    # slot exists, but its declaration has not run yet
+    raise ScopeError(f'Cannot resolve {name} as it does not exist')
+
+def _other(op : str, l : RuntimeVal, r : RuntimeVal) -> RuntimeVal :
+    # operands that are not both numbers : strings are joined, arrays go
+    # elementwise, anything else gives null
+    if(l.type is STRING or r.type is STRING) :
+        return string_binary(op, l, r)
+    if(l.type is ARRAY or r.type is ARRAY) :
+        return elementwise(op, l, r)
+    return make_null()
+
+class ClosureCompiler() :
+
+    # function bodies compiled by different compilers are cached separately
+    mode = 'boxed'
+
+    # what the loop variable of a for loop holds. None : the raw float
+    counter_value = staticmethod(make_number)
+
+    # whether the condition of a while loop holds, and the bounds of a for
+    # loop, for the values this compiler's closures produce
+    truthy = staticmethod(truthy)
+    range_bound = staticmethod(range_bound)
+
+    def compile_body(self, body : List[Stmt]) -> Compiled :
+
+        # a body evaluates to its last statement, null when it is empty
+        stmts = [self.compile(stmt) for stmt in body]
+
+        if(len(stmts) == 0) :
+            def run(env : Environment) -> RuntimeVal :
+                return make_null()
+
+        elif(len(stmts) == 1) :
+            run = stmts[0]
+
+        else :
+            def run(env : Environment) -> RuntimeVal :
+                result = None
+                for stmt in stmts :
+                    result = stmt(env)
+                return result
+
+        return run
+
+    def compile_function(self, decl : FunctionDecl) -> Callable[..., RuntimeVal] :
+
+        # compiles to invoke(decl_env, args) which sets up the call frame 
+        # and runs the body
+        if(self.mode not in decl.compiled) :
+            body = self.compile_body(decl.body)
+            size = decl.frame_size
+            arity = len(decl.parameters)
+
+            def invoke(decl_env, args : List[RuntimeVal]) -> RuntimeVal :
+                if(arity != len(args)) :
+                    raise CallError(f'{decl.name} expects {arity} arguments, got {len(args)}')
+
+                frame = SlotFrame(decl_env, size)
+                frame.values[:arity] = args
+                return body(frame)
+
+            decl.compiled[self.mode] = invoke
+
+        return decl.compiled[self.mode]
+
+    def compile(self, node : Stmt) -> Compiled :
+
+        if(node == None) :
+            return _fail(InterpreterError, f'AST node is None : {node}')
+
+        kind = node.kind
+
+        if(kind == NodeType.NumericalLiteral) :
+            return self._compile_numeric_literal(node)
+        elif(kind == NodeType.BinaryExpr) :
+            return self._compile_binary_expr(node)
+        elif(kind == NodeType.StringLiteral) :
+            return self._compile_string_literal(node)
+        elif(kind == NodeType.AssignmentExpr) :
+            return self._compile_assignment(node)
+        elif(kind == NodeType.Identifier) :
+            return self._compile_identifier(node)
+        elif(kind == NodeType.ObjectLiteral) :
+            return self._compile_object_expr(node)
+        elif(kind == NodeType.ArrayLiteral) :
+            return self._compile_array_expr(node)
+        elif(kind == NodeType.CallExpr) :
+            return self._compile_call_expr(node)
+        elif(kind == NodeType.MemberExpr) :
+            return self._compile_member_expr(node)
+        elif(kind == NodeType.SliceExpr) :
+            return self._compile_slice_expr(node)
+        elif(kind == NodeType.VariableDecl) :
+            return self._compile_variable_decl(node)
+        elif(kind == NodeType.FunctionDecl) :
+            return self._compile_function_decl(node)
+        elif(kind == NodeType.ForStmt) :
+            return self._compile_for_stmt(node)
+        elif(kind == NodeType.WhileStmt) :
+            return self._compile_while_stmt(node)
+        elif(kind == NodeType.Program) :
+            return self.compile_body(node.body)
+
+        return _fail(InterpreterError, f'This AST node has not been yet been setup for interpretation : {node.to_dict()}')
+
+    def _compile_numeric_literal(self, node : NumericLiteral) -> Compiled :
+        value = make_number(node.value)
+
+        def run(env : Environment) -> RuntimeVal :
+            return value
+
+        return run
+
+    def _compile_string_literal(self, node : StringLiteral) -> Compiled :
+        value = intern_string(node.value)
+
+        def run(env : Environment) -> RuntimeVal :
+            return value
+
+        return run
+
+    def _compile_binary_expr(self, expr : BinaryExpr) -> Compiled :
+
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        # one closure per operator, so the operator is never looked at again
+        if(expr.operator == '+') :
+            def run(env : Environment) -> RuntimeVal :
+                l = left(env)
+                r = right(env)
+                if(isinstance(l, NumberVal) and isinstance(r, NumberVal)) :
+                    return make_number(l.value + r.value)
+                return _other('+', l, r)
+
+        elif(expr.operator == '-') :
+            def run(env : Environment) -> RuntimeVal :
+                l = left(env)
+                r = right(env)
+                if(isinstance(l, NumberVal) and isinstance(r, NumberVal)) :
+                    return make_number(l.value - r.value)
+                return _other('-', l, r)
+
+        elif(expr.operator == '*') :
+            def run(env : Environment) -> RuntimeVal :
+                l = left(env)
+                r = right(env)
+                if(isinstance(l, NumberVal) and isinstance(r, NumberVal)) :
+                    return make_number(l.value * r.value)
+                return _other('*', l, r)
+
+        elif(expr.operator == '/') :
+            def run(env : Environment) -> RuntimeVal :
+                l = left(env)
+                r = right(env)
+                if(isinstance(l, NumberVal) and isinstance(r, NumberVal)) :
+                    if(r.value == 0) :
+                        raise DivisionByZeroError('Division by 0')
+                    return make_number(l.value / r.value)
+                return _other('/', l, r)
+
+        elif(expr.operator == '%') :
+            def run(env : Environment) -> RuntimeVal :
+                l = left(env)
+                r = right(env)
+                if(isinstance(l, NumberVal) and isinstance(r, NumberVal)) :
+                    if(r.value == 0) :
+                        raise DivisionByZeroError('Division by 0')
+                    return make_number(l.value % r.value)
+                return _other('%', l, r)
+
+        else :
+            return _fail(InterpreterError, f'Unknown binary operator {expr.operator}')
+
+        return run
+
+    def _compile_identifier(self, ident : Identifier) -> Compiled :
+        return self._compile_load(ident.symbol, ident.address)
+
+    def _compile_load(self, symbol : str, address) -> Compiled :
+
+        if(address is None) :
+            def run(env : Environment) -> RuntimeVal :
+                return env.lookup_var(symbol)
+
+            return run
+
+        (depth, slot) = address
+
+        # the common cases (own locals, the enclosing function's locals) 
+        # get their own closures so that no loop runs at all
+        if(depth == 0) :
+            def run(env : SlotFrame) -> RuntimeVal :
+                value = env.values[slot]
+                if(value is UNSET) :
+                    _unresolved(symbol)
+                return value
+
+        elif(depth == 1) :
+            def run(env : SlotFrame) -> RuntimeVal :
+                value = env.parent.values[slot]
+                if(value is UNSET) :
+                    _unresolved(symbol)
+                return value
+
+        else :
+            def run(env : SlotFrame) -> RuntimeVal :
+                value = env.frame_at(depth).values[slot]
+                if(value is UNSET) :
+                    _unresolved(symbol)
+                return value
+
+        return run
+
+    def _compile_object_expr(self, obj : ObjectLiteral) -> Compiled :
+
+        keys = []
+        values = []
+        for prop in obj.properties :
+            # to handle { foo } which is the same as { foo : foo }
+            value = self.compile(prop.value) if (prop.value) else self._compile_load(prop.key, prop.address)
+            keys.append(prop.key)
+            values.append(value)
+
+        # every object this literal builds has the same shape
+        shape = shape_of(keys)
+
+        if(shape is not None) :
+            def run(env : Environment) -> RuntimeVal :
+                return ObjectVal.with_shape(shape, [value(env) for value in values])
+
+            return run
+
+        props = list(zip(keys, values))
+
+        def run(env : Environment) -> RuntimeVal :
+            res = ObjectVal()
+            for (key, value) in props :
+                res.set(key, value(env))
+            return res
+
+        return run
+
+    def _compile_array_expr(self, arr : ArrayLiteral) -> Compiled :
+
+        elements = [self.compile(element) for element in arr.elements]
+
+        def run(env : Environment) -> RuntimeVal :
+            return make_array([element(env) for element in elements])
+
+        return run
+
+    def _compile_call_expr(self, expr : CallExpr) -> Compiled :
+
+        args = [self.compile(arg) for arg in expr.args]
+        caller = self.compile(expr.caller)
+
+        def run(env : Environment) -> RuntimeVal :
+            values = [arg(env) for arg in args]
+            func = caller(env)
+
+            if(func.type == ValueType.NativeFunction) :
+                return func.callback(values, env)
+
+            if(func.type == ValueType.Function) :
+                fn = cast(FunctionVal, func)
+                return fn.code(fn.decl_env, values)
+
+            raise CallError(f'Cannot call value that is not a function : {func}')
+
+        return run
+
+    def _compile_member_expr(self, expr : MemberExpr) -> Compiled :
+
+        # (foo.bar).baz : each level reads through its own inline cache
+        obj = self.compile(expr.object)
+        cache = InlineCache()
+
+        if(expr.computed) :
+            prop = self.compile(expr.property)
+            node = expr.property
+
+            def run(env : Environment) -> RuntimeVal :
+                value = obj(env)
+                index = prop(env)
+
+                # arrays are indexed by the number itself, not by a key
+                if(value.type is ARRAY) :
+                    return array_index(value, index, node)
+
+                key = property_key(index)
+                if(key is None) :
+                    raise PropertyError(f'Invalid computed property in member expression : {node.to_dict()}')
+
+                if(value.type is not OBJECT) :
+                    return value
+                return cache.get(value, key)
+
+            return run
+
+        if(expr.property.kind != NodeType.Identifier) :
+            return _fail(PropertyError, f'Error occured while evaluating member expression : {expr.property.to_dict()}')
+
+        key = expr.property.symbol
+
+        def run(env : Environment) -> RuntimeVal :
+            value = obj(env)
+
+            # reading a property of something that is not an object
+            # gives back that value unchanged
+            if(value.type is not OBJECT) :
+                return array_property(value, key) if value.type is ARRAY else value
+
+            # monomorphic hit, checked inline
+            if(value.shape is cache.shape) :
+                return value.values[cache.slot]
+            return cache.get(value, key)
+
+        return run
+
+    def _compile_slice_expr(self, expr : SliceExpr) -> Compiled :
+
+        obj = self.compile(expr.object)
+        start = self.compile(expr.start) if expr.start is not None else None
+        end = self.compile(expr.end) if expr.end is not None else None
+
+        def run(env : Environment) -> RuntimeVal :
+            value = obj(env)
+            return array_slice(
+                value,
+                start(env) if start is not None else None,
+                end(env) if end is not None else None,
+                expr
+            )
+
+        return run
+
+    def _compile_variable_decl(self, decl : VariableDecl) -> Compiled :
+
+        value = self.compile(decl.value) if (decl.value) else None
+        name = decl.identifier
+        constant = decl.constant
+
+        if(decl.address is not None) :
+            slot = decl.address[1]
+
+            def run(env : SlotFrame) -> RuntimeVal :
+                val = value(env) if value is not None else make_null()
+                env.values[slot] = val
+                return val
+
+            return run
+
+        def run(env : Environment) -> RuntimeVal :
+            val = value(env) if value is not None else make_null()
+            return env.decl_var(var_name=name, value=val, constant=constant)
+
+        return run
+
+    def _compile_function_decl(self, decl : FunctionDecl) -> Compiled :
+
+        invoke = self.compile_function(decl)
+        slot = decl.address[1] if decl.address is not None else None
+
+        def run(env : Environment) -> RuntimeVal :
+            fn = FunctionVal(
+                name=decl.name,
+                parameters=decl.parameters,
+                body=decl.body,
+                decl_env=env,
+                code=invoke
+            )
+
+            if(slot is not None) :
+                env.values[slot] = fn
+                return fn
+
+            return env.decl_var(decl.name, fn, True)
+
+        return run
+
+    def _compile_while_stmt(self, loop : WhileStmt) -> Compiled :
+
+        invariants = [self.compile(decl) for decl in loop.invariants]
+        condition = self.compile(loop.condition)
+        body = self.compile_body(loop.body)
+        size = loop.frame_size
+        holds = self.truthy
+        null = make_null()
+
+        captures = captures_scope(loop)
+
+        def run(env : Environment) -> RuntimeVal :
+            frame = SlotFrame(env, size)
+            for invariant in invariants :
+                invariant(frame)
+
+            if(captures) :
+                initial = frame.values
+                while(True) :
+                    frame = SlotFrame(env, size)
+                    frame.values[:] = initial
+                    if(not holds(condition(frame))) :
+                        return null
+                    body(frame)
+
+            while(holds(condition(frame))) :
+                body(frame)
+
+            return null
+
+        return run
+
+    def _compile_for_stmt(self, loop : ForStmt) -> Compiled :
+
+        start = self.compile(loop.start)
+        end = self.compile(loop.end)
+        invariants = [self.compile(decl) for decl in loop.invariants]
+        body = self.compile_body(loop.body)
+        size = loop.frame_size
+        slot = loop.address[1] if binds_variable(loop) else None
+        value = self.counter_value
+        bound = self.range_bound
+        null = make_null()
+        captures = captures_scope(loop)
+        shared = slot is not None and value is not None and not counter_escapes(loop)
+
+        def run(env : Environment) -> RuntimeVal :
+            first = bound(start(env), loop.start)
+            last = bound(end(env), loop.end)
+            values = numbers(first, last) if shared else counter(first, last)
+
+            frame = SlotFrame(env, size)
+            for invariant in invariants :
+                invariant(frame)
+
+            if(captures) :
+                initial = frame.values
+                for current in values :
+                    frame = SlotFrame(env, size)
+                    frame.values[:] = initial
+                    if(slot is not None) :
+                        frame.values[slot] = current if value is None else value(current)
+                    body(frame)
+                return null
+
+            if(slot is None) :
+                for _ in values :
+                    body(frame)
+                return null
+
+            if(value is not None and not shared) :
+                values = map(value, values)
+
+            slots = frame.values
+            for current in values :
+                slots[slot] = current
+                body(frame)
+
+            return null
+
+        return run
+
+    def _compile_assignment(self, node : AssignmentExpr) -> Compiled :
+
+        if(node.assignee.kind != NodeType.Identifier) :
+            return _fail(InterpreterError, f'Invalid LHS inside assignmenr expr : {node.assignee.to_dict()}')
+
+        var_name = cast(Identifier, node.assignee).symbol
+        value = self.compile(node.value)
+
+        if(node.address is None) :
+            def run(env : Environment) -> RuntimeVal :
+                return env.assign_var(var_name, value(env))
+
+            return run
+
+        (depth, slot) = node.address
+
+        def run(env : SlotFrame) -> RuntimeVal :
+            val = value(env)
+            frame = env.frame_at(depth)
+            if(frame.values[slot] is UNSET) :
+                _unresolved(var_name)
+            frame.values[slot] = val
+            return val
+
+        return run
+
+class ClosureInterpreter() :
+
+    # same interface as Interpreter, but each Program is compiled to
+    # closures once and then only the closures run
+
+    compiler_class = ClosureCompiler
+
+    def __init__(self, env : Environment) -> None:
+        self.global_env = env
+        self.compiler = self.compiler_class()
+        self._compiled : 'weakref.WeakKeyDictionary[Program, Compiled]' = weakref.WeakKeyDictionary()
+        return
+
+    def compile(self, program : Program, env : Environment = None, strict : bool = True) -> Compiled :
+        if(program not in self._compiled) :
+            Resolver().resolve(program, visible_names(env if env is not None else self.global_env), strict)
+            self._compiled[program] = self.compiler.compile(program)
+        return self._compiled[program]
+
+    def evaluate(self, program : Program, env : Environment = None) -> RuntimeVal :
+        current_env = env if env is not None else self.global_env
+        return self.compile(program, current_env)(current_env)
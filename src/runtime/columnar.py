@@ -0,0 +1,187 @@
+from array import array
+from itertools import repeat
+from typing import Any, Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
+from frontend.ast import *
+from .values.base import RuntimeVal, ValueType
+from .values.derived import ObjectVal, NumberVal
+from .values.array import ArrayVal
+from .values.shape import InlineCache
+from .vectorized import elementwise
+from .environment import Environment
+from .interpreter import Interpreter
+
+'''
+
+    - columnar evaluation : one run of a program over every row of a
+      dataset, instead of one run per row. the host hands in columns (one
+      sequence of values per free identifier, all of the same length) and
+      gets back the result of every row, as columns too :
+
+            number          ->  array of numbers, one per row
+            object          ->  object of columns, key by key
+            anything else   ->  array of the values of the rows
+
+    - a program made only of arithmetic, variables, object literals and
+      property reads (see vectorizable) is run once, by ColumnarInterpreter,
+      with each column bound as an array of numbers : every + - * / % is
+      then one elementwise operation over the whole column
+      (runtime/vectorized.py, with NumPy when it is installed)
+    - anything else (calls, arrays, slices, columns that do not hold only
+      numbers ...) and any error in the columnar run falls back to running
+      the program row by row, so results and errors are always the ones a
+      run per row gives. these programs have no calls, so running them
+      again costs nothing but time
+
+'''
+
+class RowByRow(Exception) :
+    # the columnar run cannot give what a run per row would
+    pass
+
+# node kinds a columnar run can handle
+VECTORIZABLE = {
+    NodeType.Program, NodeType.VariableDecl, NodeType.AssignmentExpr, NodeType.BinaryExpr,
+    NodeType.NumericalLiteral, NodeType.Identifier, NodeType.ObjectLiteral, NodeType.PropertyLiteral,
+    NodeType.MemberExpr,
+}
+
+# Program -> bool, checked once per program
+_vectorizable : 'WeakKeyDictionary[Program, bool]' = WeakKeyDictionary()
+
+def vectorizable(program : Program) -> bool :
+
+    result = _vectorizable.get(program)
+    if(result is not None) :
+        return result
+
+    result = True
+    stack = [program]
+    while(stack and result) :
+        node = stack.pop()
+        if(node.kind not in VECTORIZABLE or (node.kind == NodeType.MemberExpr and node.computed)) :
+            result = False
+        elif(node.kind != NodeType.MemberExpr) :
+            stack.extend(iter_children(node))
+        else :
+            stack.append(node.object)
+
+    _vectorizable[program] = result
+    return result
+
+def column(values : Any) -> Optional[ArrayVal] :
+
+    # the values of a column as an array of numbers, None if they are not
+    # all numbers
+    if(numpy is not None and isinstance(values, numpy.ndarray)) :
+        if(values.ndim != 1 or values.dtype.kind not in 'iuf') :
+            return None
+        return ArrayVal(memoryview(numpy.ascontiguousarray(values, dtype=numpy.float64)))
+
+    if(isinstance(values, memoryview) and values.format == 'd' and values.ndim == 1) :
+        return ArrayVal(values)
+    if(isinstance(values, array) and values.typecode == 'd') :
+        return ArrayVal(memoryview(values))
+
+    values = list(values)
+    if(not set(map(type, values)) <= { int, float }) :
+        return None
+    return ArrayVal.of_numbers(values)
+
+def broadcast(value : RuntimeVal, rows : int) -> RuntimeVal :
+
+    # the result of a columnar run, with every value that does not depend
+    # on the row repeated for each row
+    if(value.__class__ is ArrayVal) :
+        return value
+    if(value.__class__ is NumberVal) :
+        return ArrayVal.of_numbers(repeat(value.value, rows))
+    if(value.__class__ is ObjectVal) :
+        return ObjectVal({ key : broadcast(item, rows) for (key, item) in value.properties.items() })
+    return ArrayVal([value] * rows)
+
+def columnize(results : List[RuntimeVal]) -> RuntimeVal :
+
+    # the results of the runs per row, in the shape broadcast gives
+    if(all(value.__class__ is NumberVal for value in results)) :
+        return ArrayVal.of_numbers([value.value for value in results])
+
+    first = results[0]
+    if(first.__class__ is ObjectVal and all(value.__class__ is ObjectVal and value.shape is first.shape for value in results)) :
+        return ObjectVal({ key : columnize([value.get(key) for value in results]) for key in first.properties })
+
+    return ArrayVal(list(results))
+
+class ColumnarInterpreter(Interpreter) :
+
+    def __init__(self, env : Environment) -> None:
+        super().__init__(env)
+
+        # ids of the arrays that are columns : the ones bound by run and the
+        # ones computed from them. an array from anywhere else (a global the
+        # host passed in ...) is a value of every row, not a column
+        self.columns = set()
+
+    def run(self, program : Program, columns : Dict[str, ArrayVal], env : Environment) -> RuntimeVal :
+
+        for (name, values) in columns.items() :
+            self.columns.add(id(values))
+            env.decl_var(name, values, False)
+
+        try :
+            return self.evaluate(program, env)
+        finally :
+            self.columns.clear()
+
+    def _checked(self, value : RuntimeVal) -> RuntimeVal :
+        if(value.type == ValueType.Array and id(value) not in self.columns) :
+            raise RowByRow()
+        return value
+
+    def _evaluate_identifier(self, ident : Identifier, env : Environment) -> RuntimeVal :
+        return self._checked(env.lookup_var(ident.symbol))
+
+    def _evaluate_object_expr(self, obj : ObjectLiteral, env : Environment) -> RuntimeVal :
+
+        # { foo } reads foo without going through _evaluate_identifier
+        res = super()._evaluate_object_expr(obj, env)
+        for value in res.values :
+            self._checked(value)
+        return res
+
+    def _evaluate_member_expr(self, expr : MemberExpr, env : Environment) -> RuntimeVal :
+
+        # computed reads are not vectorizable, so the key is an identifier.
+        # a property of a number is that number, so a property of a column
+        # is that column
+        obj = self.evaluate(expr.object, env)
+        if(obj.type != ValueType.Object) :
+            return obj
+
+        if(expr.cache is None) :
+            expr.cache = InlineCache()
+
+        return self._checked(expr.cache.get(obj, expr.property.symbol))
+
+    def _evaluate_binary_expr(self, expr : BinaryExpr, env : Environment) -> RuntimeVal :
+
+        left = self.evaluate(expr.left, env)
+        right = self.evaluate(expr.right, env)
+
+        if(left.__class__ is NumberVal and right.__class__ is NumberVal) :
+            return self._evaluate_numeric_binary_expr(left, right, expr.operator, env)
+
+        # anything but numbers and columns gives null in a run per row,
+        # which a column can not hold
+        if(left.__class__ not in (NumberVal, ArrayVal) or right.__class__ not in (NumberVal, ArrayVal)) :
+            raise RowByRow()
+
+        result = elementwise(expr.operator, left, right)
+        self.columns.add(id(result))
+        return result
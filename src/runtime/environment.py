@@ -1,9 +1,11 @@
 import json
-from typing import Dict, Set, Optional
+from typing import Dict, Set, List, Optional
 from runtime.values.base import RuntimeVal, ValueType
 
 from .values.make import make_bool, make_null, make_number, make_native_fn
+from .vectorized import REDUCTIONS
 from  utils.print import print_tree
+from utils.errors import ScopeError
 
 # This is the 'scope'. 
 
@@ -11,6 +13,11 @@ class Environment() :
 
     level = 0
 
+    # module globals of the programs the python engine ran on this scope
+    # (see runtime/transpiler.py), made by its first run. on the class, so
+    # the scopes of calls and loops do not pay for it
+    python_globals = None
+
     def __init__(self, parent : Optional['Environment'] = None) -> None:
         self.global_scope : bool = (parent == None)
         self.parent : Environment = parent
@@ -23,15 +30,17 @@ class Environment() :
         self.level = Environment.level
         Environment.level += 1
 
-        self.name = f'Env := {self.level}' if self.level != 0 else 'global'
-        
+    @property
+    def name(self) -> str :
+        # only used when debugging, so not built for every scope (a host may
+        # create one per record, see pipeline.py)
+        return f'Env := {self.level}' if self.level != 0 else 'global'
 
 
     def decl_var(self, var_name : str, value : RuntimeVal, constant : bool) -> RuntimeVal :
 
         if(var_name in self.variables) :
-            print(f'Cannot declare variable {var_name} as it already exists')
-            exit(0)
+            raise ScopeError(f'Cannot declare variable {var_name} as it already exists')
 
         if(constant) :
             self.constants.add(var_name)
@@ -45,8 +54,7 @@ class Environment() :
         env : Environment = self.resolve(var_name)
 
         if(var_name in env.constants) :
-            print(f'Cannot re-assign to {var_name} as it is a constant')
-            exit(0)
+            raise ScopeError(f'Cannot re-assign to {var_name} as it is a constant')
 
         env.variables[var_name] = value
 
@@ -61,7 +69,7 @@ class Environment() :
 
             for prop in var_name.split('.')[1:] :
                 if(value.type == ValueType.Object) :
-                    value = value.properties[prop]
+                    value = value.get(prop)
 
             return value
                 
@@ -74,11 +82,52 @@ class Environment() :
             return self
         
         if(self.parent == None) :
-            print(f'Cannot resolve {var_name} as it does not exist')
-            exit(0)
+            raise ScopeError(f'Cannot resolve {var_name} as it does not exist')
 
         return self.parent.resolve(var_name)
 
+# sentinel for slots whose declaration has not run yet
+UNSET = object()
+
+class SlotFrame() :
+
+    # array backed scope of a single function call. variables are read and 
+    # written through the (depth, slot) addresses that frontend/resolver.py 
+    # assigns, so there is no name lookup and no walking of dicts. anything 
+    # that is not local to a function lives in the (dict based) globals
+
+    __slots__ = ('values', 'parent', 'globals')
+
+    def __init__(self, parent, size : int) -> None:
+        self.values : List[RuntimeVal] = [UNSET] * size
+        self.parent = parent
+        self.globals : Environment = parent.globals if isinstance(parent, SlotFrame) else parent
+
+    def frame_at(self, depth : int) -> 'SlotFrame' :
+        frame = self
+        for _ in range(depth) :
+            frame = frame.parent
+        return frame
+
+    # the Environment api, for code that only knows about names (natives, 
+    # globals). these always go to the global env
+
+    def decl_var(self, var_name : str, value : RuntimeVal, constant : bool) -> RuntimeVal :
+        return self.globals.decl_var(var_name, value, constant)
+
+    def assign_var(self, var_name : str, value : RuntimeVal) -> RuntimeVal :
+        return self.globals.assign_var(var_name, value)
+
+    def lookup_var(self, var_name : str) -> RuntimeVal :
+        return self.globals.lookup_var(var_name)
+
+def visible_names(env : Environment) -> Set[str] :
+    names : Set[str] = set()
+    while(env is not None) :
+        names.update(env.variables.keys())
+        env = env.parent
+    return names
+
 def create_global_env() :
 
     env = Environment()
@@ -100,5 +149,9 @@ def create_global_env() :
         print('\n*******************************************\n')
     
     env.decl_var('print', make_native_fn(print_callback), True)
+
+    # reductions over arrays of numbers : sum, min, max, mean
+    for (name, native) in REDUCTIONS.items() :
+        env.decl_var(name, native, True)
     
     return env
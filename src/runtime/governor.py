@@ -0,0 +1,254 @@
+import sys
+import time
+import weakref
+from typing import Dict, List, Optional
+
+from frontend.ast import *
+from .values.base import RuntimeVal
+from .values.advanced import FunctionVal
+from .environment import Environment
+from .interpreter import Interpreter
+from .memo import MemoCache
+from utils.errors import CallDepthError, FuelExhaustedError, DeadlineExceededError, AllocationLimitError
+
+'''
+
+    - resource limits for scripts that are not trusted. a Budget says how
+      much one run may use, a Governor counts what the run uses and raises
+      a BudgetExceededError (or CallDepthError) the moment a limit is passed :
+
+            fuel                units of work : one per AST node evaluated
+                                (tree engine), one per instruction (vm)
+            timeout             wall clock seconds
+            max_depth           nested calls of NanoScript functions
+            max_allocations     RuntimeVals and Environments created : numbers
+                                computed, objects, functions and call scopes
+
+    - counting has to stay cheap, so :
+        - fuel and the deadline share one comparison. the clock is read
+          only every CHECK_INTERVAL units of fuel, so a run can go over its
+          timeout by that much work
+        - scripts have no branches, so what a program or function body
+          costs is known before it runs. the engines charge a whole body
+          when they start it, once per call and not once per node :
+          GovernedInterpreter with body_cost below, the vm with
+          CodeObject.fuel / allocations
+        - the body of a loop is charged the same way, once per iteration,
+          so an endless loop still runs out of fuel (or time)
+    - a limit left to None is not enforced
+
+'''
+
+# units of fuel between two reads of the clock
+CHECK_INTERVAL = 1024
+
+UNLIMITED = sys.maxsize
+
+class Budget() :
+
+    def __init__(
+            self, fuel : Optional[int] = None, timeout : Optional[float] = None,
+            max_depth : Optional[int] = None, max_allocations : Optional[int] = None
+        ) -> None:
+        self.fuel = fuel
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_allocations = max_allocations
+
+    def to_dict(self) -> Dict[str, Optional[float]] :
+        return {
+            'fuel' : self.fuel,
+            'timeout' : self.timeout,
+            'max_depth' : self.max_depth,
+            'max_allocations' : self.max_allocations,
+        }
+
+class Governor() :
+
+    __slots__ = ('budget', 'fuel', 'next_check', 'deadline', 'started', 'depth', 'allocations', 'max_depth', 'max_allocations')
+
+    def __init__(self, budget : Budget) -> None:
+        self.budget = budget
+        self.start()
+
+    def start(self) -> None :
+
+        # called before every run : the budget is per run
+        budget = self.budget
+
+        self.fuel = budget.fuel if budget.fuel is not None else UNLIMITED
+        self.started = time.perf_counter()
+        self.deadline = self.started + budget.timeout if budget.timeout is not None else None
+        self.next_check = max(self.fuel - CHECK_INTERVAL, -1)
+
+        self.depth = 0
+        self.max_depth = budget.max_depth if budget.max_depth is not None else UNLIMITED
+
+        self.allocations = 0
+        self.max_allocations = budget.max_allocations if budget.max_allocations is not None else UNLIMITED
+
+    def check(self) -> None :
+
+        # callers run this once fuel drops to next_check, or allocations go
+        # over max_allocations
+        if(self.fuel < 0) :
+            raise FuelExhaustedError(f'Script ran out of fuel ({self.budget.fuel} units)')
+
+        if(self.allocations > self.max_allocations) :
+            raise AllocationLimitError(f'Script allocated more than {self.max_allocations} values')
+
+        if(self.deadline is not None and time.perf_counter() > self.deadline) :
+            raise DeadlineExceededError(f'Script ran for longer than {self.budget.timeout} seconds')
+
+        self.next_check = max(self.fuel - CHECK_INTERVAL, -1)
+
+    def charge(self, fuel : int, allocations : int) -> None :
+        self.fuel -= fuel
+        self.allocations += allocations
+        if(self.fuel <= self.next_check or self.allocations > self.max_allocations) :
+            self.check()
+
+    def depth_error(self, name : str) -> None :
+        raise CallDepthError(f'Maximum call depth of {self.max_depth} exceeded while calling {name}')
+
+    def usage(self) -> Dict[str, float] :
+        fuel = self.budget.fuel if self.budget.fuel is not None else UNLIMITED
+        return {
+            'fuel' : fuel - max(self.fuel, 0),
+            'seconds' : round(time.perf_counter() - self.started, 6),
+            'allocations' : self.allocations,
+        }
+
+def body_cost(body : List[Stmt]) -> tuple :
+
+    # (fuel, allocations) of evaluating every statement of a body once : the
+    # nodes Interpreter.evaluate is called on and the values it may create.
+    # bodies have no branches, so this is exactly what a run of the body is
+    # charged. the bodies of nested functions are charged when they are
+    # called, not where they are declared, and the bodies of loops on every
+    # iteration (see loop_cost)
+    fuel = 0
+    allocations = 0
+    nodes = list(body)
+
+    while(nodes) :
+        node = nodes.pop()
+        kind = node.kind
+        fuel += 1
+
+        if(kind == NodeType.BinaryExpr) :
+            allocations += 1
+            nodes.append(node.left)
+            nodes.append(node.right)
+        elif(kind == NodeType.AssignmentExpr) :
+            nodes.append(node.value)
+        elif(kind == NodeType.ObjectLiteral) :
+            allocations += 1
+            nodes.extend(prop.value for prop in node.properties if prop.value is not None)
+        elif(kind == NodeType.CallExpr) :
+            nodes.extend(node.args)
+            nodes.append(node.caller)
+        elif(kind == NodeType.MemberExpr) :
+            nodes.append(node.object)
+            if(node.computed) :
+                nodes.append(node.property)
+        elif(kind == NodeType.SliceExpr) :
+            allocations += 1
+            nodes.append(node.object)
+            nodes.extend(bound for bound in (node.start, node.end) if bound is not None)
+        elif(kind == NodeType.ArrayLiteral) :
+            allocations += 1
+            nodes.extend(node.elements)
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value is not None) :
+                nodes.append(node.value)
+        elif(kind == NodeType.FunctionDecl) :
+            allocations += 1
+        elif(kind == NodeType.ForStmt or kind == NodeType.WhileStmt) :
+            # the loop's scope, and the one around it for the invariants
+            allocations += 2 if node.invariants else 1
+            nodes.extend(node.invariants)
+            if(kind == NodeType.ForStmt) :
+                nodes.append(node.start)
+                nodes.append(node.end)
+
+    return (fuel, allocations)
+
+def loop_cost(loop : Stmt) -> tuple :
+
+    # (fuel, allocations) of one iteration : the loop node itself (like the
+    # vm's jump back), the body, plus the condition of a while loop or the
+    # number bound to the variable of a for loop, and the scope of an
+    # iteration that has one of its own. never 0 fuel, or an empty loop
+    # would never reach Governor.check
+    (fuel, allocations) = body_cost(loop.body)
+    fuel += 1
+
+    if(captures_scope(loop)) :
+        allocations += 1
+
+    if(loop.kind == NodeType.WhileStmt) :
+        (condition_fuel, condition_allocations) = body_cost([loop.condition])
+        fuel += condition_fuel
+        allocations += condition_allocations
+    elif(binds_variable(loop) and counter_escapes(loop)) :
+        allocations += 1
+
+    return (fuel, allocations)
+
+class GovernedInterpreter(Interpreter) :
+
+    # the tree walking interpreter, charging a Governor for every body it
+    # runs (see body_cost) when it starts running it : per node accounting
+    # at the price of one charge per call. a plain Interpreter does no
+    # accounting at all
+
+    def __init__(self, env : Environment, governor : Governor, memo : MemoCache = None) -> None:
+        super().__init__(env, memo)
+        self.governor = governor
+
+        # node -> its cost, for as long as the node is alive : a long lived
+        # engine does not keep every program it has run. a body is a list,
+        # which cannot be weakly referenced, so it is keyed by its first
+        # statement (which belongs to no other body). empty bodies cost nothing
+        self._costs : 'weakref.WeakKeyDictionary[Stmt, tuple]' = weakref.WeakKeyDictionary()
+
+    def _cost(self, node : Stmt, measure, of) -> tuple :
+
+        cost = self._costs.get(node)
+        if(cost is None) :
+            cost = measure(of)
+            self._costs[node] = cost
+        return cost
+
+    def _charge(self, body : List[Stmt], extra_fuel : int, extra_allocations : int) -> None :
+
+        (fuel, allocations) = self._cost(body[0], body_cost, body) if body else (0, 0)
+        self.governor.charge(fuel + extra_fuel, allocations + extra_allocations)
+
+    def _evaluate_program(self, program : Program, env : Environment) -> RuntimeVal :
+
+        # the Program node itself
+        self._charge(program.body, 1, 0)
+        return super()._evaluate_program(program, env)
+
+    def _evaluate_loop_body(self, loop : Stmt, scope : Environment) -> None :
+
+        (fuel, allocations) = self._cost(loop, loop_cost, loop)
+        self.governor.charge(fuel, allocations)
+        super()._evaluate_loop_body(loop, scope)
+
+    def _call_function(self, fn : FunctionVal, args : List[RuntimeVal]) -> RuntimeVal :
+
+        # the body, and the scope of the call
+        self._charge(fn.body, 0, 1)
+
+        governor = self.governor
+        governor.depth += 1
+        if(governor.depth > governor.max_depth) :
+            governor.depth_error(fn.name)
+
+        try :
+            return super()._call_function(fn, args)
+        finally :
+            governor.depth -= 1
@@ -6,7 +6,15 @@ from .values.base import *
 from .values.derived import ObjectVal, NumberVal
 from .values.advanced import FunctionVal
 from .values.make import make_null, make_number
+from .values.array import make_array, array_index, array_slice, array_property
+from .values.string import intern_string, string_binary
+from .vectorized import elementwise
+from .values.shape import InlineCache, property_key
 from .environment import Environment
+from .loops import counter, numbers, range_bound, truthy
+from .memo import MemoCache, external_bindings
+from frontend.purity import PurityAnalysis
+from utils.errors import InterpreterError, DivisionByZeroError, CallError, PropertyError
 
 '''
 
@@ -14,13 +22,16 @@ from .environment import Environment
     - we will need to pass in env in almost every evaluate method because
       functions have it's own scope and we need to tell the interpreter
       which env to work with while evaluating it
+    - pass a MemoCache to memoize calls to pure functions : each Program
+      then goes through frontend/purity.py before it is evaluated
 
 '''
 
 class Interpreter() :
 
-    def __init__(self, env : Environment) -> None:
+    def __init__(self, env : Environment, memo : MemoCache = None) -> None:
         self.global_env = env
+        self.memo = memo
         return
 
     def _evaluate_numeric_binary_expr(self, left: NumberVal, right: NumberVal, operator: str, env : Environment) -> NumberVal:
@@ -37,13 +48,30 @@ class Interpreter() :
             if (right.value != 0):
                 res = left.value / right.value
             else:
-                print('\n[INTERPRETER ERROR] : Division by 0')
-                exit(0)
+                raise DivisionByZeroError('Division by 0')
         elif (operator == '%'):
-            res = left.value % right.value
+            if (right.value != 0):
+                res = left.value % right.value
+            else:
+                raise DivisionByZeroError('Division by 0')
 
         return make_number(res)
 
+    def _evaluate_numeric_literal(self, literal : NumericLiteral) -> RuntimeVal :
+
+        # built once per node, then shared by every evaluation
+        if(literal.runtime_value is None) :
+            literal.runtime_value = make_number(literal.value)
+
+        return literal.runtime_value
+
+    def _evaluate_string_literal(self, literal : StringLiteral) -> RuntimeVal :
+
+        if(literal.runtime_value is None) :
+            literal.runtime_value = intern_string(literal.value)
+
+        return literal.runtime_value
+
     def _evaluate_binary_expr(self, expr: BinaryExpr, env: Environment) -> RuntimeVal :
 
         left = self.evaluate(expr.left, env)
@@ -52,6 +80,14 @@ class Interpreter() :
         if (isinstance(left, NumberVal) and isinstance(right, NumberVal)):
             return self._evaluate_numeric_binary_expr(left, right, expr.operator, env)
 
+        # + joins strings (see values/string.py)
+        if (left.type == ValueType.String or right.type == ValueType.String):
+            return string_binary(expr.operator, left, right)
+
+        # arrays of numbers are computed elementwise, in one go
+        if (left.type == ValueType.Array or right.type == ValueType.Array):
+            return elementwise(expr.operator, left, right)
+
         return make_null()
 
     def _evaluate_identifier(self, ident: Identifier, env : Environment) -> RuntimeVal :
@@ -61,17 +97,20 @@ class Interpreter() :
 
     def _evaluate_object_expr(self, obj : ObjectLiteral, env : Environment) -> RuntimeVal :
         
-        res = ObjectVal({})
+        res = ObjectVal()
 
         for prop in obj.properties :
 
             # to handle { foo } which is the same as { foo : foo }
             value = self.evaluate(prop.value, env) if (prop.value) else env.lookup_var(prop.key)
 
-            res.properties[prop.key] = value
+            res.set(prop.key, value)
 
         return res
 
+    def _evaluate_array_expr(self, arr : ArrayLiteral, env : Environment) -> RuntimeVal :
+        return make_array([self.evaluate(element, env) for element in arr.elements])
+
     def _evaluate_call_expr(self, expr : CallExpr, env : Environment) -> RuntimeVal :
         
         args : List[RuntimeVal] = []
@@ -87,54 +126,87 @@ class Interpreter() :
             return result
         
         if(func.type == ValueType.Function) :
+            fn = cast(FunctionVal, func)
 
-            fn = cast(FunctionVal, func) 
-            scope = Environment(parent=fn.decl_env)
+            if(self.memo is not None and fn.pure) :
+                key = self.memo.key(fn, args)
+                if(key is not None) :
+                    result = self.memo.get(key)
+                    if(result is None) :
+                        result = self._call_function(fn, args)
+                        self.memo.put(key, result)
+                    return result
 
-            # create the variables for the parameters list
+            return self._call_function(fn, args)
 
-            assert len(fn.parameters) == len(args)
+        raise CallError(f'Cannot call value that is not a function : {func}')
 
-            for i in range(len(fn.parameters)) :
-                # TODO : check the bounds here for args
-                # verify arity (no. of arg) of function
-                var_name = fn.parameters[i]
-                value = args[i]
-                scope.decl_var(var_name, value, False)
+    def _call_function(self, fn : FunctionVal, args : List[RuntimeVal]) -> RuntimeVal :
 
-            result : RuntimeVal = make_null()
+        scope = Environment(parent=fn.decl_env)
 
-            # evaluate the function body line by line
-            for stmt in fn.body :
-                result = self.evaluate(stmt, scope)
+        # create the variables for the parameters list
 
-            return result
+        if(len(fn.parameters) != len(args)) :
+            raise CallError(f'{fn.name} expects {len(fn.parameters)} arguments, got {len(args)}')
+
+        for i in range(len(fn.parameters)) :
+            # TODO : check the bounds here for args
+            # verify arity (no. of arg) of function
+            var_name = fn.parameters[i]
+            value = args[i]
+            scope.decl_var(var_name, value, False)
+
+        result : RuntimeVal = make_null()
 
-        print(f'\n[INTERPRETER ERROR] : Cannot call value that is not a function : {func}')
-        exit(0)
+        # evaluate the function body line by line
+        for stmt in fn.body :
+            result = self.evaluate(stmt, scope)
+
+        return result
 
     def _evaluate_member_expr(self, expr : MemberExpr, env : Environment) -> RuntimeVal :
-        
-        result = RuntimeVal
-
-        # we do something similar to lodash.get(propery_string)
-        # where propery_string is the raw string : "foo.bar.baz"
-        # we then handle the lookup on the environment. 
-        # we may need to change this in the future maybe ? idk. 
-        def extract_value(data):
-            if (data.kind == NodeType.MemberExpr):
-                obj = extract_value(data.object)
-                prop = extract_value(data.property)
-                return f'{obj}.{prop}'
-            elif (data.kind == NodeType.Identifier):
-                return data.symbol
-            else:
-                print(f'\n[INTERPRETER ERROR] : Error occured while evaluating member expression : {data.to_dict()}')
-                exit(0)
 
+        # foo.bar.baz is evaluated one level at a time : (foo.bar).baz. each 
+        # level has its own inline cache keyed on the shape of the object, 
+        # so repeated reads skip the property lookup entirely
+        obj = self.evaluate(expr.object, env)
+
+        if(expr.computed) :
+            value = self.evaluate(expr.property, env)
+
+            # arrays are indexed by the number itself, not by a key
+            if(obj.type == ValueType.Array) :
+                return array_index(obj, value, expr.property)
+
+            key = property_key(value)
+            if(key is None) :
+                raise PropertyError(f'Invalid computed property in member expression : {expr.property.to_dict()}')
+
+        elif(expr.property.kind == NodeType.Identifier) :
+            key = expr.property.symbol
+
+        else :
+            raise PropertyError(f'Error occured while evaluating member expression : {expr.property.to_dict()}')
+
+        # like before, reading a property of something that is not 
+        # an object gives back that value unchanged
+        if(obj.type != ValueType.Object) :
+            return array_property(obj, key) if obj.type == ValueType.Array else obj
+
+        if(expr.cache is None) :
+            expr.cache = InlineCache()
+
+        return expr.cache.get(obj, key)
+
+    def _evaluate_slice_expr(self, expr : SliceExpr, env : Environment) -> RuntimeVal :
+
+        # foo[start:end] : a view over the elements of foo, nothing is copied
+        obj = self.evaluate(expr.object, env)
+        start = self.evaluate(expr.start, env) if expr.start is not None else None
+        end = self.evaluate(expr.end, env) if expr.end is not None else None
 
-        s = extract_value(expr)
-        return env.lookup_var(s)
+        return array_slice(obj, start, end, expr)
 
     def _evaluate_variable_decl(self, decl: VariableDecl, env: Environment) -> RuntimeVal:
 
@@ -153,7 +225,8 @@ class Interpreter() :
             name=decl.name,
             parameters=decl.parameters,
             body=decl.body,
-            decl_env=env
+            decl_env=env,
+            pure=decl.pure
         )
 
         # register the function in the env
@@ -162,16 +235,95 @@ class Interpreter() :
     def _evaluate_assignment(self, node : AssignmentExpr, env : Environment) -> RuntimeVal :
 
         if(node.assignee.kind != NodeType.Identifier) :
-            print(f'\n[INTERPRETER ERROR] : Invalid LHS inside assignmenr expr : \n{node.assignee.to_dict()}')
-            exit(0)
+            raise InterpreterError(f'Invalid LHS inside assignmenr expr : {node.assignee.to_dict()}')
         
         var_name = cast(Identifier, node.assignee).symbol
         value = self.evaluate(node.value, env)
        
         return env.assign_var(var_name, value)
 
+    def _evaluate_invariants(self, loop : Stmt, env : Environment) -> Environment :
+
+        # declarations the optimizer hoisted out of the body run once, in a
+        # scope of their own around the loop's
+        if(not loop.invariants) :
+            return env
+
+        scope = Environment(parent=env)
+        for decl in loop.invariants :
+            self.evaluate(decl, scope)
+
+        return scope
+
+    def _evaluate_loop_body(self, loop : Stmt, scope : Environment) -> None :
+        for stmt in loop.body :
+            self.evaluate(stmt, scope)
+
+    def _evaluate_while_stmt(self, loop : WhileStmt, env : Environment) -> RuntimeVal :
+
+        outer = self._evaluate_invariants(loop, env)
+        scope = Environment(parent=outer)
+        variables = scope.variables
+        constants = scope.constants
+        fresh = captures_scope(loop)
+
+        while(True) :
+            # every iteration runs in the same scope, emptied instead of
+            # created again, unless functions declared in it outlive it
+            if(variables) :
+                if(fresh) :
+                    scope = Environment(parent=outer)
+                    (variables, constants) = (scope.variables, scope.constants)
+                else :
+                    variables.clear()
+                    constants.clear()
+
+            if(not truthy(self.evaluate(loop.condition, scope))) :
+                break
+
+            self._evaluate_loop_body(loop, scope)
+
+        return make_null()
+
+    def _evaluate_for_stmt(self, loop : ForStmt, env : Environment) -> RuntimeVal :
+
+        # the bounds are evaluated once, in the enclosing scope
+        start = range_bound(self.evaluate(loop.start, env), loop.start)
+        end = range_bound(self.evaluate(loop.end, env), loop.end)
+        values = counter(start, end)
+
+        outer = self._evaluate_invariants(loop, env)
+        scope = Environment(parent=outer)
+        variables = scope.variables
+        constants = scope.constants
+        fresh = captures_scope(loop)
+        name = loop.variable if binds_variable(loop) else None
+
+        if(name is not None) :
+            values = map(make_number, values) if counter_escapes(loop) else numbers(start, end)
+
+        for value in values :
+            if(variables) :
+                if(fresh) :
+                    scope = Environment(parent=outer)
+                    (variables, constants) = (scope.variables, scope.constants)
+                else :
+                    variables.clear()
+                    constants.clear()
+
+            if(name is not None) :
+                variables[name] = value
+                constants.add(name)
+
+            self._evaluate_loop_body(loop, scope)
+
+        return make_null()
+
     def _evaluate_program(self, program: Program, env : Environment) -> RuntimeVal :
 
+        if(self.memo is not None) :
+            PurityAnalysis().analyze(program, external_bindings(env))
+
         last_evaluated: RuntimeVal = make_null()
 
         for stmt in program.body:
@@ -184,14 +336,16 @@ class Interpreter() :
         current_env = env if env is not None else self.global_env
 
         if (ast_node == None):
-            print('f\n[INTERPRETER ERROR] : \AST node is None : {ast_node}')
-            exit(0)
+            raise InterpreterError(f'AST node is None : {ast_node}')
 
         if (ast_node.kind == NodeType.NumericalLiteral):
-            return NumberVal(value=ast_node.value)
+            return self._evaluate_numeric_literal(ast_node)
     
         elif (ast_node.kind == NodeType.BinaryExpr):
             return self._evaluate_binary_expr(ast_node, current_env)
+
+        elif (ast_node.kind == NodeType.StringLiteral):
+            return self._evaluate_string_literal(ast_node)
         
         elif(ast_node.kind == NodeType.AssignmentExpr) :
             return self._evaluate_assignment(ast_node, current_env)
@@ -202,23 +356,34 @@ class Interpreter() :
         elif (ast_node.kind == NodeType.ObjectLiteral):
             return self._evaluate_object_expr(ast_node, current_env)
             
+        elif (ast_node.kind == NodeType.ArrayLiteral):
+            return self._evaluate_array_expr(ast_node, current_env)
+            
         elif (ast_node.kind == NodeType.CallExpr):
             return self._evaluate_call_expr(ast_node, current_env)
     
         elif (ast_node.kind == NodeType.MemberExpr):
             return self._evaluate_member_expr(ast_node, current_env)
     
+        elif (ast_node.kind == NodeType.SliceExpr):
+            return self._evaluate_slice_expr(ast_node, current_env)
+    
         elif (ast_node.kind == NodeType.VariableDecl):
             return self._evaluate_variable_decl(ast_node, current_env)
         
         elif (ast_node.kind == NodeType.FunctionDecl):
             return self._evaluate_function_decl(ast_node, current_env)
+
+        elif (ast_node.kind == NodeType.ForStmt):
+            return self._evaluate_for_stmt(ast_node, current_env)
+
+        elif (ast_node.kind == NodeType.WhileStmt):
+            return self._evaluate_while_stmt(ast_node, current_env)
     
         elif (ast_node.kind == NodeType.Program):
             return self._evaluate_program(ast_node, current_env)
     
         else:
-            print(f'\n[INTERPRETER ERROR] :  This AST node has not been yet been setup for interpretation : \n {ast_node.to_dict()}')
-            exit(0)
+            raise InterpreterError(f'This AST node has not been yet been setup for interpretation : {ast_node.to_dict()}')
 
         
\ No newline at end of file
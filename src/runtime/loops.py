@@ -0,0 +1,69 @@
+from itertools import count, takewhile
+from typing import Iterator, Optional
+
+from .values.base import RuntimeVal, ValueType
+from .values.derived import NumberVal
+from utils.errors import LoopError
+
+'''
+
+    - run time support for while and for loops, shared by every engine
+    - for (i in start : end) { ... } counts from start up to, but not
+      including, end in steps of 1. the bounds are evaluated once, before
+      the first iteration, and must be numbers (LoopError otherwise)
+    - counter() hands out the values as raw floats, straight from
+      itertools, so counting itself never creates a NumberVal. the engines
+      that keep numbers unboxed (runtime/unboxed.py, the python engine)
+      bind them as they are, the others only box them when the body uses
+      the variable at all (see frontend/ast.py binds_variable). when the
+      body only computes with it, numbers() boxes them all into a single
+      NumberVal, updated in place
+    - while (condition) { ... } runs as long as the condition is truthy :
+      anything but false, null, 0 and ""
+    - a loop is a statement whose value is null. each run of a loop gets
+      one scope, which every iteration reuses : what the body declares is
+      forgotten at the start of the next iteration, not re-allocated.
+      unless the body declares a function, which keeps the scope it was
+      declared in : then every iteration gets a scope of its own, in every
+      engine (see frontend/ast.py captures_scope)
+
+'''
+
+def counter(start : float, end : float) -> Iterator[float] :
+    # start, start + 1, ... as long as it is below end
+    return takewhile(end.__gt__, count(start))
+
+def numbers(start : float, end : float) -> Iterator[NumberVal] :
+
+    # counter() for a variable that never outlives the expression reading
+    # it (see frontend/ast.py counter_escapes) : one NumberVal per run of
+    # the loop, which is the only NumberVal ever changed after it is made
+    number = NumberVal(start)
+    for value in counter(start, end) :
+        number.value = value
+        yield number
+
+def range_bound(bound : Optional[RuntimeVal], node) -> float :
+
+    # node is the bound's expression, for the error message
+    if(bound is None or bound.type != ValueType.Number) :
+        raise LoopError(f'Invalid range bound in for loop : {node.to_dict()}')
+
+    return float(bound.value)
+
+def truthy(value : Optional[RuntimeVal]) -> bool :
+
+    # natives like print give back None, which counts as null
+    if(value is None) :
+        return False
+
+    kind = value.type
+
+    if(kind == ValueType.Null) :
+        return False
+    if(kind == ValueType.Boolean or kind == ValueType.Number) :
+        return bool(value.value)
+    if(kind == ValueType.String) :
+        return value.length > 0
+
+    return True
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+from .values.base import RuntimeVal, ValueType
+from .values.advanced import FunctionVal
+from .environment import Environment
+from frontend.purity import PURE, IMPURE, LET, CONST
+
+'''
+
+    - LRU cache of the results of calls to pure functions (frontend/purity.py),
+      keyed by the FunctionVal and its arguments
+    - only numbers, strings, booleans and null make a key : objects and functions as
+      arguments are never cached
+    - only those are cached as results too. a pure function can still make
+      a new object or closure on every call (fn make(x) { fn add(y) { x = x + y x } add }),
+      and handing every caller the same one would let them share its state
+    - the key is the FunctionVal and not the FunctionDecl : two functions
+      made from the same declaration can see different consts of their
+      enclosing call
+
+'''
+
+# argument (and result) types whose value alone identifies them
+KEY_TYPES = (ValueType.Number, ValueType.String, ValueType.Boolean, ValueType.Null)
+
+class MemoCache() :
+
+    def __init__(self, maxsize : int = 256) -> None:
+        self.maxsize = maxsize
+        self.entries : 'OrderedDict[tuple, RuntimeVal]' = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, fn : FunctionVal, args : List[RuntimeVal]) -> Optional[tuple] :
+
+        key = [fn]
+        for arg in args :
+            if(arg.type not in KEY_TYPES) :
+                return None
+
+            # the type keeps true apart from 1, repr keeps -0 apart from 0
+            value = arg.value
+            key.append((arg.type, repr(value) if value == 0 else value))
+
+        return tuple(key)
+
+    def get(self, key : tuple) -> Optional[RuntimeVal] :
+
+        result = self.entries.get(key)
+        if(result is None) :
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key : tuple, result : RuntimeVal) -> None :
+
+        if(result is None or result.type not in KEY_TYPES) :
+            return
+
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+
+        if(len(self.entries) > self.maxsize) :
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int] :
+        return {
+            'hits' : self.hits,
+            'misses' : self.misses,
+            'evictions' : self.evictions,
+            'size' : len(self.entries),
+            'maxsize' : self.maxsize,
+        }
+
+def external_bindings(env : Environment) -> Dict[str, str] :
+
+    # how the purity analysis should see the names already in the global env
+    bindings : Dict[str, str] = {}
+
+    while(env is not None) :
+        for (name, value) in env.variables.items() :
+            if(name in bindings) :
+                continue
+
+            if(value.type == ValueType.Function) :
+                bindings[name] = PURE if value.pure else IMPURE
+            elif(value.type == ValueType.NativeFunction) :
+                bindings[name] = IMPURE
+            else :
+                bindings[name] = CONST if name in env.constants else LET
+
+        env = env.parent
+
+    return bindings
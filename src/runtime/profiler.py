@@ -0,0 +1,211 @@
+import time
+from typing import Dict, List, Set
+
+from frontend.ast import *
+from .values.base import RuntimeVal, ValueType
+from .values.derived import NativeFunctionVal
+from .values.advanced import FunctionVal
+from .values.make import make_native_fn
+from .environment import Environment
+from .interpreter import Interpreter
+from .memo import MemoCache
+
+'''
+
+    - function level profiler for the tree walking interpreter. it is a
+      subclass : a plain Interpreter has no profiling code in it at all, so
+      a run that is not profiled pays nothing for it
+    - per function (NanoScript functions by name, natives by the name they
+      were called through) it records :
+
+            calls       times the function was called
+            inclusive   time spent in the function and everything it called.
+                        recursive calls are only counted once, at the
+                        outermost call
+            exclusive   time spent in the function itself
+
+    - it also counts how many nodes of each kind were evaluated
+    - summary() is a text report. collapsed() is one line per call stack,
+      "<program>;outer;inner <microseconds>", the format flamegraph.pl,
+      speedscope and inferno read :
+
+            python repl.py script.txt --profile --flamegraph out.folded
+            flamegraph.pl out.folded > out.svg
+
+    - times include the profiler's own bookkeeping, so they are only good
+      for comparing the parts of one program with each other
+
+'''
+
+PROGRAM = '<program>'
+
+class FunctionStats() :
+
+    __slots__ = ('name', 'calls', 'inclusive', 'exclusive', 'active')
+
+    def __init__(self, name : str) -> None:
+        self.name = name
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+        # calls of this function currently on the stack (for recursion)
+        self.active = 0
+
+    def to_dict(self) -> Dict[str, float] :
+        return {
+            'name' : self.name,
+            'calls' : self.calls,
+            'inclusive' : self.inclusive,
+            'exclusive' : self.exclusive,
+        }
+
+class Profile() :
+
+    def __init__(self) -> None:
+        self.functions : Dict[str, FunctionStats] = {}
+        self.node_counts : Dict[str, int] = {}
+
+        # call stack path -> exclusive seconds
+        self.stacks : Dict[tuple, float] = {}
+
+        # [stats, start, time spent in callees] for every call in progress
+        self._frames : List[list] = []
+        self._path : List[str] = []
+
+    def enter(self, name : str) -> None :
+
+        stats = self.functions.get(name)
+        if(stats is None) :
+            stats = self.functions[name] = FunctionStats(name)
+
+        stats.calls += 1
+        stats.active += 1
+        self._path.append(name)
+        self._frames.append([stats, time.perf_counter(), 0.0])
+
+    def leave(self) -> None :
+
+        (stats, start, children) = self._frames.pop()
+        elapsed = time.perf_counter() - start
+        exclusive = elapsed - children
+
+        stats.active -= 1
+        if(stats.active == 0) :
+            stats.inclusive += elapsed
+        stats.exclusive += exclusive
+
+        path = tuple(self._path)
+        self.stacks[path] = self.stacks.get(path, 0.0) + exclusive
+        self._path.pop()
+
+        if(self._frames) :
+            self._frames[-1][2] += elapsed
+
+    def summary(self, limit : int = 20) -> str :
+
+        rows = sorted(self.functions.values(), key=lambda stats : stats.inclusive, reverse=True)[:limit]
+
+        lines = [f'{"function":<24} {"calls":>10} {"inclusive ms":>14} {"exclusive ms":>14} {"per call us":>12}']
+        for stats in rows :
+            per_call = stats.inclusive / stats.calls * 1e6 if stats.calls else 0
+            lines.append(
+                f'{stats.name:<24} {stats.calls:>10} {stats.inclusive * 1000:>14.3f} {stats.exclusive * 1000:>14.3f} {per_call:>12.1f}'
+            )
+
+        lines.append('')
+        lines.append(f'{"node kind":<24} {"evaluated":>10}')
+        for (kind, count) in sorted(self.node_counts.items(), key=lambda item : item[1], reverse=True) :
+            lines.append(f'{kind:<24} {count:>10}')
+
+        return '\n'.join(lines)
+
+    def collapsed(self) -> str :
+
+        # whole microseconds, since flamegraph tools expect integer counts
+        lines = []
+        for (path, seconds) in self.stacks.items() :
+            micros = int(round(seconds * 1e6))
+            if(micros > 0) :
+                lines.append(f'{";".join(path)} {micros}')
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, path : str) -> None :
+        f = open(path, 'w')
+        f.write(self.collapsed())
+        f.close()
+
+class ProfilingInterpreter(Interpreter) :
+
+    def __init__(self, env : Environment, profile : Profile = None, memo : MemoCache = None) -> None:
+        super().__init__(env, memo)
+        self.profile = profile if profile is not None else Profile()
+
+        # id of a native -> (native, wrapper that times it) per name
+        self._natives : Dict[tuple, tuple] = {}
+
+        # ids of those wrappers. a wrapper stored in a variable (let p =
+        # print) and read again is handed out as it is : wrapping it again
+        # would count each of its calls twice
+        self._wrappers : Set[int] = set()
+
+    def evaluate(self, ast_node : Stmt, env : Environment = None) -> RuntimeVal :
+
+        counts = self.profile.node_counts
+        kind = ast_node.kind.value
+        counts[kind] = counts.get(kind, 0) + 1
+
+        return Interpreter.evaluate(self, ast_node, env)
+
+    def _evaluate_program(self, program : Program, env : Environment) -> RuntimeVal :
+
+        self.profile.enter(PROGRAM)
+        try :
+            return super()._evaluate_program(program, env)
+        finally :
+            self.profile.leave()
+
+    def _call_function(self, fn : FunctionVal, args : List[RuntimeVal]) -> RuntimeVal :
+
+        self.profile.enter(fn.name)
+        try :
+            return super()._call_function(fn, args)
+        finally :
+            self.profile.leave()
+
+    def _evaluate_identifier(self, ident : Identifier, env : Environment) -> RuntimeVal :
+
+        # natives do not know their own name, so the one they are called
+        # through is used : they are handed out wrapped in a timed native
+        value = super()._evaluate_identifier(ident, env)
+
+        if(value.type == ValueType.NativeFunction) :
+            return self._timed_native(value, ident.symbol)
+
+        return value
+
+    def _timed_native(self, native : NativeFunctionVal, name : str) -> NativeFunctionVal :
+
+        if(id(native) in self._wrappers) :
+            return native
+
+        key = (id(native), name)
+        entry = self._natives.get(key)
+
+        if(entry is None) :
+            profile = self.profile
+            callback = native.callback
+
+            def timed(args, env) :
+                profile.enter(name)
+                try :
+                    return callback(args, env)
+                finally :
+                    profile.leave()
+
+            # the native is kept so that its id is not reused
+            entry = (native, make_native_fn(timed))
+            self._natives[key] = entry
+            self._wrappers.add(id(entry[1]))
+
+        return entry[1]
@@ -0,0 +1,1167 @@
+import ast
+import re
+import weakref
+from types import FunctionType, CodeType
+from typing import Any, Dict, List, Optional, Set
+
+from frontend.ast import *
+from frontend.resolver import Resolver
+from .values.base import RuntimeVal, ValueType
+from .values.derived import ObjectVal
+from .values.advanced import FunctionVal
+from .values.make import make_null, make_bool, make_number
+from .values.shape import property_key
+from .values.array import ArrayVal, index_of, slice_bound, array_property
+from .values.string import StringVal, intern_string, concat
+from .vectorized import elementwise
+from .environment import Environment, visible_names
+from .loops import counter
+from utils.errors import ScopeError, InterpreterError, DivisionByZeroError, CallError, PropertyError, LoopError
+
+'''
+
+    - ahead of time backend : a Program is lowered to a Python ast.Module,
+      compiled once with compile() and from then on runs as CPython
+      bytecode, with no dispatch on node kinds at all
+    - values are plain Python values while the program runs :
+
+            number      float (ints from natives stay ints)
+            string      StringVal, as it is. literals are built once per
+                        program and read from its _strings, a parameter of
+                        _program the functions it makes close over
+            boolean     bool
+            null        None
+            object      Record, a dict whose missing keys raise PropertyError
+            array       ArrayVal, as it is : numbers are read straight out
+                        of the doubles, other elements are unboxed when read
+            function    a Python function (NanoScript functions become defs)
+
+      they are converted from / to RuntimeVals at the edges only : the
+      globals when a run starts, arguments and results of natives, and the
+      result of the program
+    - scopes become Python scopes. the resolver (frontend/resolver.py) gives
+      every local its (depth, slot), which becomes a local of the def for
+      that function (v<function>_<slot>_<name>), read by enclosing defs as a
+      closure variable and written with nonlocal. globals are module level
+      names (g_<name>) of one namespace per env, kept with it : functions
+      made by an earlier run on the env (eg. in a REPL session) read and
+      write the same globals as the run calling them
+    - loops become Python loops in the def they appear in : for loops run
+      over runtime/loops.py counter(), whose floats go straight into the
+      variable (a local of the def, like the rest of the loop's scope).
+      the body of a loop that declares a function is a def of its own
+      (_iteration<n>), called once per iteration : its locals are that
+      iteration's scope, which the functions it declares close over
+    - everything the tree walking Interpreter checks is still checked, with
+      the same errors and messages, in the same order :
+        - operands are evaluated left to right and arguments before the
+          function being called. operands are moved to temporaries
+          (_t<n>) when anything evaluated after them could change them
+        - arithmetic on anything but numbers gives null, / by 0 raises
+        - redeclared globals, assignments to consts and to names that do
+          not exist (the resolver reports the local ones before running)
+        - reading a name that is not declared (yet) : Python's NameError
+          is turned into the ScopeError the tree walker raises
+        - arity of calls, calling something that is not a function,
+          missing properties
+    - natives registered with make_native_fn are called with RuntimeVals
+      and the env, like everywhere else
+
+'''
+
+# ------------------------------------------------------------------------------
+# Run time support
+# ------------------------------------------------------------------------------
+
+class Record(dict) :
+
+    # an ObjectVal while a transpiled program runs
+    __slots__ = ()
+
+    def __missing__(self, key : str) :
+        raise PropertyError(f'Object has no property {key}')
+
+class _Missing() :
+
+    # default of every parameter, so that a call with too few arguments is
+    # caught by the callee instead of Python
+    __slots__ = ()
+
+MISSING = _Missing()
+
+def _is_number(value : Any) -> bool :
+    return (type(value) is float or type(value) is int)
+
+def _textual(value : Any) -> bool :
+    # values + turns into text next to a string
+    return value is None or type(value) is StringVal or type(value) is bool or _is_number(value)
+
+def _arith(operator : str, left : Any, right : Any) -> Any :
+
+    # slow path of the binary operators : ints from natives, strings (which
+    # + joins), arrays (which go elementwise) or operands that are not
+    # numbers at all (which give null)
+    if(not (_is_number(left) and _is_number(right))) :
+        if(type(left) is StringVal or type(right) is StringVal) :
+            if(operator == '+' and _textual(left) and _textual(right)) :
+                return concat(box(left), box(right))
+            return None
+        if((type(left) is ArrayVal or type(right) is ArrayVal) and (type(left) is ArrayVal or _is_number(left)) and (type(right) is ArrayVal or _is_number(right))) :
+            result = elementwise(operator, box(left), box(right))
+            return result if type(result) is ArrayVal else None
+        return None
+
+    if(operator == '+') :
+        return left + right
+    if(operator == '-') :
+        return left - right
+    if(operator == '*') :
+        return left * right
+    if(right == 0) :
+        raise DivisionByZeroError('Division by 0')
+    if(operator == '/') :
+        return left / right
+    return left % right
+
+def _divide(left : float, right : float) -> float :
+    if(right == 0) :
+        raise DivisionByZeroError('Division by 0')
+    return left / right
+
+def _modulo(left : float, right : float) -> float :
+    if(right == 0) :
+        raise DivisionByZeroError('Division by 0')
+    return left % right
+
+def _not_callable(value : Any) -> None :
+    raise CallError(f'Cannot call value that is not a function : {box(value)}')
+
+def _arity(name : str, expected : int, args : tuple, extra : tuple) -> None :
+    given = sum(1 for arg in args if arg is not MISSING) + len(extra)
+    raise CallError(f'{name} expects {expected} arguments, got {given}')
+
+def _computed(bridge : 'Bridge', obj : Any, prop : Any, message : str) -> Any :
+
+    if(type(obj) is ArrayVal) :
+        if(obj.numeric and type(prop) is float and prop.is_integer() and 0 <= prop < len(obj.items)) :
+            return obj.items[int(prop)]
+
+        index = index_of(obj, box(prop))
+        if(index is None) :
+            raise PropertyError(message)
+        return obj.items[index] if obj.numeric else bridge.unbox(obj.items[index])
+
+    key = property_key(box(prop))
+    if(key is None) :
+        raise PropertyError(message)
+    if(type(obj) is not Record) :
+        return obj
+    return obj[key]
+
+def _member(obj : Any, key : str) -> Any :
+    # obj.key when obj is not a Record : arrays have a length, anything
+    # else is given back unchanged
+    if(type(obj) is ArrayVal) :
+        return array_property(obj, key).value
+    return obj
+
+def _array(bridge : 'Bridge', *values : Any) -> ArrayVal :
+    for value in values :
+        if(type(value) is not float and type(value) is not int) :
+            return ArrayVal([box(value, bridge) for value in values])
+    return ArrayVal.of_numbers(values)
+
+def _slice(bridge : 'Bridge', obj : Any, start : Any, end : Any, messages : tuple) -> ArrayVal :
+
+    # start / end are MISSING when left out. messages : the errors for a
+    # start and an end that are not whole numbers
+    if(type(obj) is not ArrayVal) :
+        raise PropertyError(f'Cannot slice value that is not an array : {box(obj, bridge).to_dict()}')
+
+    length = len(obj.items)
+    bounds = []
+
+    for (bound, default, message) in ((start, 0, messages[0]), (end, length, messages[1])) :
+        if(bound is MISSING) :
+            bounds.append(default)
+            continue
+
+        value = slice_bound(box(bound, bridge), length)
+        if(value is None) :
+            raise PropertyError(message)
+        bounds.append(value)
+
+    return obj.slice(bounds[0], max(bounds[0], bounds[1]))
+
+def _counter(start : Any, end : Any, messages : tuple) :
+    # messages : the errors for a start and an end that are not numbers
+    if(not _is_number(start)) :
+        raise LoopError(messages[0])
+    if(not _is_number(end)) :
+        raise LoopError(messages[1])
+    return counter(float(start), float(end))
+
+def _truthy(value : Any) -> bool :
+    # the condition of a while loop : false, null, 0 and "" stop it
+    kind = type(value)
+    if(kind is float or kind is int or kind is bool) :
+        return bool(value)
+    if(kind is StringVal) :
+        return value.length > 0
+    return value is not None
+
+def _redeclared(name : str) -> None :
+    raise ScopeError(f'Cannot declare variable {name} as it already exists')
+
+def _not_assignable(name : str, declared : Set[str], env : Environment) -> None :
+
+    # the global is not in _writable : it is a constant if it exists at all
+    if(name in declared or name in visible_names(env)) :
+        raise ScopeError(f'Cannot re-assign to {name} as it is a constant')
+    raise ScopeError(f'Cannot resolve {name} as it does not exist')
+
+def box(value : Any, bridge : 'Bridge' = None) -> RuntimeVal :
+
+    # Python value -> RuntimeVal
+    kind = type(value)
+
+    if(value is None) :
+        return make_null()
+    if(kind is bool) :
+        return make_bool(value)
+    if(kind is float or kind is int) :
+        return make_number(value)
+    if(kind is Record) :
+        return ObjectVal({ key : box(item, bridge) for (key, item) in value.items() })
+    if(isinstance(value, RuntimeVal)) :
+        return value
+    if(kind is FunctionType and bridge is not None) :
+        return bridge.box_function(value)
+
+    raise InterpreterError(f'Cannot convert {value!r} to a NanoScript value')
+
+class Bridge() :
+
+    # conversions that need to know about the run : natives get the env,
+    # functions are boxed back to the FunctionVal they came in as
+
+    def __init__(self, env : Environment) -> None:
+        self.env = env
+        self.natives : Dict[int, Any] = {}
+
+        # the last native called returned None instead of a value (eg. print)
+        self.nothing = False
+
+        # id of a transpiled function -> the FunctionVal it came in as
+        self.functions : Dict[int, RuntimeVal] = {}
+
+    def unbox(self, value : RuntimeVal) -> Any :
+
+        kind = value.type
+
+        if(kind == ValueType.Number or kind == ValueType.Boolean) :
+            return value.value
+        if(kind == ValueType.Null) :
+            return None
+        if(kind == ValueType.Object) :
+            return Record({ key : self.unbox(item) for (key, item) in value.properties.items() })
+        if(kind == ValueType.Array or kind == ValueType.String) :
+            return value
+        if(kind == ValueType.NativeFunction) :
+            return self.native(value)
+        if(kind == ValueType.Function) :
+            code = value.code
+            if(type(code) is FunctionType and code.__code__.co_filename == FILENAME) :
+                # made by an earlier run : it is boxed back to the same FunctionVal
+                self.functions[id(code)] = value
+                return code
+            return self.foreign(value)
+
+        raise InterpreterError(f'Cannot convert {value.to_dict()} for the python engine')
+
+    def native(self, native : RuntimeVal) -> Any :
+
+        # natives are called with RuntimeVals and the env, and their result
+        # is converted back. one wrapper per native, so it stays the same value
+        wrapper = self.natives.get(id(native))
+        if(wrapper is not None) :
+            return wrapper
+
+        callback = native.callback
+
+        def wrapper(*args) :
+            result = callback([box(arg, self) for arg in args], self.env)
+            self.nothing = result is None
+            return None if result is None else self.unbox(result)
+
+        wrapper.native = native
+        self.natives[id(native)] = wrapper
+        return wrapper
+
+    def foreign(self, fn : FunctionVal) -> Any :
+
+        # a function made by another engine (eg. earlier in a REPL session).
+        # the closure engines compile functions to a callable, the others
+        # are run by the tree walking interpreter
+        from .interpreter import Interpreter
+
+        if(callable(fn.code)) :
+            def call(*args) :
+                return self.unbox(fn.code(fn.decl_env, [box(arg, self) for arg in args]))
+        else :
+            def call(*args) :
+                return self.unbox(Interpreter(self.env)._call_function(fn, [box(arg, self) for arg in args]))
+
+        call.native = fn
+        return call
+
+    def box_function(self, fn : FunctionType) -> RuntimeVal :
+
+        if(hasattr(fn, 'native')) :
+            return fn.native
+
+        if(id(fn) in self.functions) :
+            return self.functions[id(fn)]
+
+        decl = DECLS[id(fn.__code__)]
+        return FunctionVal(
+            name=decl.name,
+            parameters=decl.parameters,
+            body=decl.body,
+            decl_env=self.env,
+            code=fn
+        )
+
+# ------------------------------------------------------------------------------
+# Lowering
+# ------------------------------------------------------------------------------
+
+PROGRAM = '_program'
+
+# file name of every transpiled code object, to tell its functions apart
+FILENAME = '<nanoscript>'
+
+OPERATORS = {
+    '+' : ast.Add,
+    '-' : ast.Sub,
+    '*' : ast.Mult,
+    '/' : ast.Div,
+    '%' : ast.Mod,
+}
+
+# every node gets the same location : there is no Python source to point
+# to. functions use their line number to carry an id (see Transpiler.decls)
+LOCATION = { 'lineno' : 1, 'col_offset' : 0 }
+
+# contexts carry no data, so every node shares one (like ast.parse does)
+LOAD = ast.Load()
+STORE = ast.Store()
+
+def _load(name : str) -> ast.Name :
+    return ast.Name(**LOCATION, id=name, ctx=LOAD)
+
+def _store(name : str) -> ast.Name :
+    return ast.Name(**LOCATION, id=name, ctx=STORE)
+
+def _assign(name : str, value : ast.expr) -> ast.Assign :
+    return ast.Assign(**LOCATION, targets=[_store(name)], value=value)
+
+def _call(name : str, *args : ast.expr) -> ast.Call :
+    return ast.Call(**LOCATION, func=_load(name), args=list(args), keywords=[])
+
+def _const(value : Any) -> ast.Constant :
+    return ast.Constant(**LOCATION, value=value)
+
+def _is(left : ast.expr, right : ast.expr, negate : bool = False) -> ast.Compare :
+    return ast.Compare(**LOCATION, left=left, ops=[ast.IsNot() if negate else ast.Is()], comparators=[right])
+
+def _type_is(value : ast.expr, name : str) -> ast.Compare :
+    return _is(_call('type', value), _load(name))
+
+def _contains(name : str, collection : str, negate : bool = False) -> ast.Compare :
+    return ast.Compare(**LOCATION, left=_const(name), ops=[ast.NotIn() if negate else ast.In()], comparators=[_load(collection)])
+
+def _if(test : ast.expr, body : List[ast.stmt]) -> ast.If :
+    return ast.If(**LOCATION, test=test, body=body, orelse=[])
+
+def _method(collection : str, method : str, name : str) -> ast.Expr :
+    call = ast.Call(**LOCATION, func=ast.Attribute(**LOCATION, value=_load(collection), attr=method, ctx=LOAD), args=[_const(name)], keywords=[])
+    return ast.Expr(**LOCATION, value=call)
+
+class Scope() :
+
+    # the Python function being generated : a NanoScript function, or the
+    # top level (_program). a loop has a Scope of its own too, whose locals
+    # belong to the function the loop is in (its owner)
+
+    def __init__(self, parent : Optional['Scope'], fid : int, decl : Optional[FunctionDecl]) -> None:
+        self.parent = parent
+        self.fid = fid
+        self.decl = decl
+        self.owner = self
+
+        self.globals : Set[str] = set()
+        self.nonlocals : Set[str] = set()
+
+        # parameters never assigned to : reading them can neither fail nor
+        # give a different value later in the statement
+        self.stable : Set[str] = set()
+
+        self.temps = 0
+
+    def at(self, depth : int) -> 'Scope' :
+        scope = self
+        for _ in range(depth) :
+            scope = scope.parent
+        return scope
+
+class Transpiler() :
+
+    def __init__(self) -> None:
+        self._scope : Optional[Scope] = None
+        self._block : List[ast.stmt] = []
+
+        # fid -> FunctionDecl. the fid is the line number of the def, so the
+        # declaration of any function can be found from its code object
+        self.decls : Dict[int, FunctionDecl] = {}
+
+        # the StringVal of every string literal, read as _strings[n]
+        self.strings : List[StringVal] = []
+        self._string_index : Dict[str, int] = {}
+
+        # last fid handed out to a function or a loop
+        self._fids = 1
+
+    def transpile(self, program : Program) -> ast.Module :
+
+        # program must have gone through the Resolver
+        self._scope = Scope(None, 0, None)
+        body = self._body(program.body)
+
+        scope = self._scope
+        if(scope.globals) :
+            body.insert(0, ast.Global(**LOCATION, names=sorted(scope.globals)))
+
+        fn = self._def(PROGRAM, ['_strings'], body, 1, checked=False)
+        return ast.Module(body=[fn], type_ignores=[])
+
+    # helpers
+
+    def _temp(self) -> str :
+        self._scope.temps += 1
+        return f'_t{self._scope.temps}'
+
+    def _emit(self, stmt : ast.stmt) -> None :
+        self._block.append(stmt)
+
+    def _stable(self, expr : ast.expr) -> bool :
+
+        # evaluating it has no effect, cannot fail and gives the same value
+        # whenever it is evaluated in this statement
+        if(isinstance(expr, ast.Constant)) :
+            return True
+        if(isinstance(expr, ast.Name)) :
+            return expr.id.startswith('_t') or expr.id in self._scope.stable
+        return False
+
+    def _materialize(self, expr : ast.expr) -> ast.expr :
+        if(self._stable(expr)) :
+            return expr
+        temp = self._temp()
+        self._emit(_assign(temp, expr))
+        return _load(temp)
+
+    def _reusable(self, expr : ast.expr) -> ast.expr :
+        # can be evaluated twice (eg. checked, then used) with the same result
+        if(isinstance(expr, (ast.Constant, ast.Name))) :
+            return expr
+        return self._materialize(expr)
+
+    def _sequence(self, nodes : List[Stmt], reusable : bool = False, last_first : bool = False) -> List[ast.expr] :
+
+        # compiles nodes that NanoScript evaluates in order. an expression
+        # left in place runs when the expression using it does, after any
+        # statement emitted for the nodes that follow : those are moved to
+        # temporaries (where the later statements start) when they need to
+        # run first. last_first : the last one is evaluated first by Python
+        # (the function of a call)
+        exprs : List[ast.expr] = []
+
+        for (i, node) in enumerate(nodes) :
+            mark = len(self._block)
+            expr = self._expr(node)
+            if(reusable) :
+                expr = self._reusable(expr)
+
+            emitted = len(self._block) > mark
+            if(last_first and i == len(nodes) - 1 and not isinstance(expr, ast.Constant)) :
+                emitted = True
+
+            if(emitted) :
+                hoisted = []
+                for (j, previous) in enumerate(exprs) :
+                    if(not self._stable(previous)) :
+                        temp = self._temp()
+                        hoisted.append(_assign(temp, previous))
+                        exprs[j] = _load(temp)
+                self._block[mark:mark] = hoisted
+
+            exprs.append(expr)
+
+        return exprs
+
+    def _def(self, name : str, params : List[str], body : List[ast.stmt], fid : int, arity : int = 0, label : str = '', checked : bool = True) -> ast.FunctionDef :
+
+        # checked : a NanoScript function, whose calls are checked for arity
+        args = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(**LOCATION, arg=param) for param in params],
+            vararg=ast.arg(**LOCATION, arg='_extra') if checked else None,
+            kwonlyargs=[], kw_defaults=[], kwarg=None,
+            defaults=[_load('MISSING') for _ in params] if checked else [],
+        )
+
+        if(checked) :
+            # too many arguments land in _extra, too few leave MISSING behind
+            test : ast.expr = _load('_extra')
+            if(params) :
+                test = ast.BoolOp(**LOCATION, op=ast.Or(), values=[test, _is(_load(params[-1]), _load('MISSING'))])
+            check = ast.Expr(**LOCATION, value=_call(
+                '_arity', _const(label), _const(arity),
+                ast.Tuple(**LOCATION, elts=[_load(param) for param in params], ctx=LOAD), _load('_extra')
+            ))
+            body.insert(0, _if(test, [check]))
+
+        fields = { 'name' : name, 'args' : args, 'body' : body, 'decorator_list' : [], 'returns' : None, 'lineno' : fid, 'col_offset' : 0 }
+        if('type_params' in ast.FunctionDef._fields) :
+            fields['type_params'] = []
+
+        fn = ast.FunctionDef(**fields)
+        return fn
+
+    def _local(self, address : tuple, symbol : str) -> str :
+        (depth, slot) = address
+        return f'v{self._scope.at(depth).fid}_{slot}_{symbol}'
+
+    # statements
+
+    def _body(self, body : List[Stmt], returns : bool = True) -> List[ast.stmt] :
+
+        # a body evaluates to its last statement, null when it is empty.
+        # returns = False : the body of a loop, whose value is not used
+        enclosing = self._block
+        block : List[ast.stmt] = []
+
+        if(len(body) == 0 and returns) :
+            block.append(ast.Return(**LOCATION, value=_const(None)))
+
+        for (i, stmt) in enumerate(body) :
+            # every statement is built in a block of its own (temporaries
+            # are inserted into it) and only lives for that statement, so
+            # temporaries are reused
+            self._block = []
+            self._scope.temps = 0
+            value = self._statement(stmt)
+
+            if(returns and i == len(body) - 1) :
+                self._emit(ast.Return(**LOCATION, value=value))
+            elif(not (self._stable(value) or _binds(stmt))) :
+                self._emit(ast.Expr(**LOCATION, value=value))
+
+            block.extend(self._block)
+
+        self._block = enclosing
+        return block
+
+    def _statement(self, node : Stmt) -> Optional[ast.expr] :
+
+        # emits the statement, returns its value
+        kind = node.kind
+
+        if(kind == NodeType.VariableDecl) :
+            return self._variable_decl(node)
+        if(kind == NodeType.FunctionDecl) :
+            return self._function_decl(node)
+        if(kind == NodeType.ForStmt) :
+            return self._for_stmt(node)
+        if(kind == NodeType.WhileStmt) :
+            return self._while_stmt(node)
+
+        return self._expr(node)
+
+    def _variable_decl(self, decl : VariableDecl) -> ast.expr :
+
+        value = self._expr(decl.value) if decl.value else _const(None)
+
+        if(decl.address is not None) :
+            name = self._local(decl.address, decl.identifier)
+            self._emit(_assign(name, value))
+            return _load(name)
+
+        # a global : checked like Environment.decl_var, once the value is known
+        name = f'g_{decl.identifier}'
+        value = self._materialize(value)
+        self._scope.globals.add(name)
+
+        self._emit(_if(_contains(decl.identifier, '_declared'), [ast.Expr(**LOCATION, value=_call('_redeclared', _const(decl.identifier)))]))
+        self._emit(_assign(name, value))
+        self._emit(_method('_declared', 'add', decl.identifier))
+        if(not decl.constant) :
+            self._emit(_method('_writable', 'add', decl.identifier))
+
+        return _load(name)
+
+    def _function_decl(self, decl : FunctionDecl) -> ast.expr :
+
+        if(decl.address is not None) :
+            name = self._local(decl.address, decl.name)
+        else :
+            name = f'g_{decl.name}'
+            self._scope.globals.add(name)
+            self._emit(_if(_contains(decl.name, '_declared'), [ast.Expr(**LOCATION, value=_call('_redeclared', _const(decl.name)))]))
+
+        self._fids += 1
+        fid = self._fids
+        self.decls[fid] = decl
+
+        enclosing = self._scope
+        scope = Scope(enclosing, fid, decl)
+        self._scope = scope
+
+        params = [f'v{fid}_{i}_{param}' for (i, param) in enumerate(decl.parameters)]
+        assigned = _assigned_names(decl.body)
+        scope.stable = { params[i] for (i, param) in enumerate(decl.parameters) if param not in assigned }
+
+        body = self._body(decl.body)
+
+        declarations = []
+        if(scope.globals) :
+            declarations.append(ast.Global(**LOCATION, names=sorted(scope.globals)))
+        if(scope.nonlocals) :
+            declarations.append(ast.Nonlocal(**LOCATION, names=sorted(scope.nonlocals)))
+
+        self._scope = enclosing
+
+        fn = self._def(name, params, body, fid, len(params), decl.name)
+        fn.body = declarations + fn.body
+
+        self._emit(fn)
+
+        if(decl.address is None) :
+            self._emit(_method('_declared', 'add', decl.name))
+
+        return _load(name)
+
+    def _enter_loop(self, loop : Stmt) -> Scope :
+
+        # the loop's locals live in the def the loop is in, so that is where
+        # its global and nonlocal declarations go. unless its iterations
+        # each get a scope of their own : then they live in its _iteration
+        enclosing = self._scope
+        self._fids += 1
+
+        scope = Scope(enclosing, self._fids, enclosing.decl)
+        if(not captures_scope(loop)) :
+            scope.owner = enclosing.owner
+            scope.globals = enclosing.globals
+            scope.nonlocals = enclosing.nonlocals
+        scope.stable = set(enclosing.stable)
+
+        self._scope = scope
+        return scope
+
+    def _iteration(self, scope : Scope, params : List[str], body : List[ast.stmt]) -> str :
+
+        # emits the def running one iteration of a loop that has a scope of
+        # its own, and returns its name
+        declarations : List[ast.stmt] = []
+        if(scope.globals) :
+            declarations.append(ast.Global(**LOCATION, names=sorted(scope.globals)))
+        if(scope.nonlocals) :
+            declarations.append(ast.Nonlocal(**LOCATION, names=sorted(scope.nonlocals)))
+
+        name = f'_iteration{scope.fid}'
+        self._emit(self._def(name, params, declarations + (body or [ast.Pass(**LOCATION)]), scope.fid, checked=False))
+        return name
+
+    def _for_stmt(self, loop : ForStmt) -> ast.expr :
+
+        # the bounds are evaluated in the enclosing scope, once
+        (start, end) = self._sequence([loop.start, loop.end])
+        messages = tuple(f'Invalid range bound in for loop : {bound.to_dict()}' for bound in (loop.start, loop.end))
+        values = _call('_counter', start, end, _const(messages))
+
+        enclosing = self._scope
+        scope = self._enter_loop(loop)
+
+        invariants = self._body(loop.invariants, returns=False)
+
+        target = '_'
+        if(binds_variable(loop)) :
+            target = self._local(loop.address, loop.variable)
+            scope.stable.add(target)
+
+        body = self._body(loop.body, returns=False)
+        self._scope = enclosing
+
+        for stmt in invariants :
+            self._emit(stmt)
+
+        if(scope.owner is scope) :
+            params = [target] if target != '_' else []
+            call = _call(self._iteration(scope, params, body), *[_load(param) for param in params])
+            body = [ast.Expr(**LOCATION, value=call)]
+
+        self._emit(ast.For(**LOCATION, target=_store(target), iter=values, body=body or [ast.Pass(**LOCATION)], orelse=[]))
+
+        return _const(None)
+
+    def _while_stmt(self, loop : WhileStmt) -> ast.expr :
+
+        enclosing = self._scope
+        scope = self._enter_loop(loop)
+
+        invariants = self._body(loop.invariants, returns=False)
+
+        # the statements the condition needs run before every test
+        block = self._block
+        self._block = []
+        self._scope.temps = 0
+        test = _call('_truthy', self._expr(loop.condition))
+        (condition, self._block) = (self._block, block)
+
+        body = self._body(loop.body, returns=False)
+        self._scope = enclosing
+
+        for stmt in invariants :
+            self._emit(stmt)
+
+        if(scope.owner is scope) :
+            # the condition runs in the iteration's scope too : the def
+            # tells whether it held
+            stop = _if(ast.UnaryOp(**LOCATION, op=ast.Not(), operand=test), [ast.Return(**LOCATION, value=_const(False))])
+            body = condition + [stop] + body + [ast.Return(**LOCATION, value=_const(True))]
+            (test, body, condition) = (_call(self._iteration(scope, [], body)), [], [])
+
+        if(condition) :
+            stop = _if(ast.UnaryOp(**LOCATION, op=ast.Not(), operand=test), [ast.Break(**LOCATION)])
+            (test, body) = (_const(True), condition + [stop] + body)
+        self._emit(ast.While(**LOCATION, test=test, body=body or [ast.Pass(**LOCATION)], orelse=[]))
+
+        return _const(None)
+
+    # expressions
+
+    def _expr(self, node : Stmt) -> ast.expr :
+
+        kind = node.kind
+
+        if(kind == NodeType.NumericalLiteral) :
+            return _const(node.value)
+        elif(kind == NodeType.StringLiteral) :
+            return self._string_literal(node.value)
+        elif(kind == NodeType.Identifier) :
+            return self._identifier(node.symbol, node.address)
+        elif(kind == NodeType.BinaryExpr) :
+            return self._binary_expr(node)
+        elif(kind == NodeType.CallExpr) :
+            return self._call_expr(node)
+        elif(kind == NodeType.MemberExpr) :
+            return self._member_expr(node)
+        elif(kind == NodeType.ObjectLiteral) :
+            return self._object_expr(node)
+        elif(kind == NodeType.ArrayLiteral) :
+            return _call('_array', _load('_bridge'), *self._sequence(node.elements))
+        elif(kind == NodeType.SliceExpr) :
+            return self._slice_expr(node)
+        elif(kind == NodeType.AssignmentExpr) :
+            return self._assignment(node)
+        elif(kind in (NodeType.VariableDecl, NodeType.FunctionDecl, NodeType.ForStmt, NodeType.WhileStmt)) :
+            # only reachable as a statement. mirrors the tree walker if not
+            return self._statement(node)
+
+        self._emit(ast.Expr(**LOCATION, value=_call('_fail', _const(f'This AST node has not been yet been setup for interpretation : {node.to_dict()}'))))
+        return _const(None)
+
+    def _string_literal(self, text : str) -> ast.expr :
+
+        index = self._string_index.get(text)
+        if(index is None) :
+            index = self._string_index[text] = len(self.strings)
+            self.strings.append(intern_string(text))
+
+        return ast.Subscript(**LOCATION, value=_load('_strings'), slice=_const(index), ctx=LOAD)
+
+    def _identifier(self, symbol : str, address : Optional[tuple]) -> ast.expr :
+        if(address is None) :
+            return _load(f'g_{symbol}')
+        return _load(self._local(address, symbol))
+
+    def _binary_expr(self, expr : BinaryExpr) -> ast.expr :
+
+        # a whole tree of operators is compiled at once. its operands (the
+        # leaves : names, literals, calls ...) are checked to be numbers
+        # once, then the tree is plain float arithmetic. if any of them is
+        # not, every operator goes through _arith instead
+        leaves : List[Stmt] = []
+        if(not _collect_leaves(expr, leaves)) :
+            self._emit(ast.Expr(**LOCATION, value=_call('_fail', _const(f'Unknown binary operator {expr.operator}'))))
+            return _const(None)
+
+        operands = self._sequence(leaves, reusable=True)
+        (fast, slow) = self._arithmetic(expr, iter(operands))
+
+        checks = []
+        seen = set()
+        for operand in operands :
+            if(isinstance(operand, ast.Constant) and type(operand.value) is float) :
+                continue
+            if(isinstance(operand, ast.Name)) :
+                if(operand.id in seen) :
+                    continue
+                seen.add(operand.id)
+            checks.append(_type_is(operand, 'float'))
+
+        if(len(checks) == 0) :
+            return fast
+
+        numbers = checks[0] if len(checks) == 1 else ast.BoolOp(**LOCATION, op=ast.And(), values=checks)
+        return ast.IfExp(**LOCATION, test=numbers, body=fast, orelse=slow)
+
+    def _arithmetic(self, node : Stmt, operands) -> tuple :
+
+        # (all numbers, anything) versions of the tree, in leaf order
+        if(node.kind != NodeType.BinaryExpr) :
+            operand = next(operands)
+            return (operand, operand)
+
+        (left_fast, left_slow) = self._arithmetic(node.left, operands)
+        (right_fast, right_slow) = self._arithmetic(node.right, operands)
+        operator = node.operator
+
+        if(operator == '/') :
+            fast = _call('_divide', left_fast, right_fast)
+        elif(operator == '%') :
+            fast = _call('_modulo', left_fast, right_fast)
+        else :
+            fast = ast.BinOp(**LOCATION, left=left_fast, op=OPERATORS[operator](), right=right_fast)
+
+        return (fast, _call('_arith', _const(operator), left_slow, right_slow))
+
+    def _call_expr(self, expr : CallExpr) -> ast.expr :
+
+        # arguments first, then the function
+        exprs = self._sequence(list(expr.args) + [expr.caller], last_first=True)
+        caller = self._reusable(exprs[-1])
+
+        checked = ast.IfExp(**LOCATION, 
+            test=_type_is(caller, 'FunctionType'),
+            body=caller,
+            orelse=_call('_not_callable', caller)
+        )
+        return ast.Call(**LOCATION, func=checked, args=exprs[:-1], keywords=[])
+
+    def _member_expr(self, expr : MemberExpr) -> ast.expr :
+
+        if(expr.computed) :
+            (obj, prop) = self._sequence([expr.object, expr.property])
+            message = f'Invalid computed property in member expression : {expr.property.to_dict()}'
+            return _call('_computed', _load('_bridge'), obj, prop, _const(message))
+
+        obj = self._reusable(self._expr(expr.object))
+
+        if(expr.property.kind != NodeType.Identifier) :
+            self._emit(ast.Expr(**LOCATION, value=_call('_fail_property', _const(f'Error occured while evaluating member expression : {expr.property.to_dict()}'))))
+            return _const(None)
+
+        # reading a property of something that is not an object gives back
+        # that value unchanged (arrays have a length)
+        read = ast.Subscript(**LOCATION, value=obj, slice=_const(expr.property.symbol), ctx=LOAD)
+        other = _call('_member', obj, _const(expr.property.symbol))
+        return ast.IfExp(**LOCATION, test=_type_is(obj, 'Record'), body=read, orelse=other)
+
+    def _slice_expr(self, expr : SliceExpr) -> ast.expr :
+
+        bounds = [bound for bound in (expr.start, expr.end) if bound is not None]
+        exprs = iter(self._sequence([expr.object] + bounds))
+        obj = next(exprs)
+        start = next(exprs) if expr.start is not None else _load('MISSING')
+        end = next(exprs) if expr.end is not None else _load('MISSING')
+
+        messages = tuple(
+            f'Invalid slice bound in slice expression : {bound.to_dict()}' if bound is not None else ''
+            for bound in (expr.start, expr.end)
+        )
+        return _call('_slice', _load('_bridge'), obj, start, end, _const(messages))
+
+    def _object_expr(self, obj : ObjectLiteral) -> ast.expr :
+
+        keys = [_const(prop.key) for prop in obj.properties]
+
+        # { foo } is the same as { foo : foo }
+        values = self._sequence([
+            prop.value if prop.value else _Shorthand(prop.key, prop.address) for prop in obj.properties
+        ])
+
+        return _call('Record', ast.Dict(**LOCATION, keys=keys, values=values))
+
+    def _assignment(self, node : AssignmentExpr) -> ast.expr :
+
+        if(node.assignee.kind != NodeType.Identifier) :
+            self._emit(ast.Expr(**LOCATION, value=_call('_fail', _const(f'Invalid LHS inside assignmenr expr : {node.assignee.to_dict()}'))))
+            return _const(None)
+
+        symbol = node.assignee.symbol
+        value = self._expr(node.value)
+
+        if(node.address is not None) :
+            name = self._local(node.address, symbol)
+            if(self._scope.at(node.address[0]).owner is not self._scope.owner) :
+                self._scope.nonlocals.add(name)
+            self._emit(_assign(name, value))
+            return _load(name)
+
+        # a global : checked like Environment.assign_var, once the value is known
+        name = f'g_{symbol}'
+        value = self._materialize(value)
+        self._scope.globals.add(name)
+
+        fail = ast.Expr(**LOCATION, value=_call('_not_assignable', _const(symbol), _load('_declared'), _load('_env')))
+        self._emit(_if(_contains(symbol, '_writable', negate=True), [fail]))
+        self._emit(_assign(name, value))
+
+        return value
+
+def _collect_leaves(node : Stmt, leaves : List[Stmt]) -> bool :
+
+    # operands of a tree of binary operators, left to right. False if an
+    # operator is not known
+    if(node.kind != NodeType.BinaryExpr) :
+        leaves.append(node)
+        return True
+
+    if(node.operator not in OPERATORS) :
+        return False
+
+    return _collect_leaves(node.left, leaves) and _collect_leaves(node.right, leaves)
+
+def _binds(node : Stmt) -> bool :
+    # the value of these is the name they just bound, which can be read safely
+    return node.kind in (NodeType.VariableDecl, NodeType.FunctionDecl, NodeType.AssignmentExpr)
+
+class _Shorthand(Stmt) :
+
+    # the value of { foo } : an Identifier that keeps the PropertyLiteral's address
+    __slots__ = ('symbol', 'address')
+
+    def __init__(self, symbol : str, address : Optional[tuple]) -> None:
+        super().__init__(NodeType.Identifier)
+        self.symbol = symbol
+        self.address = address
+
+def _assigned_names(body : List[Stmt]) -> Set[str] :
+
+    # names assigned anywhere in a body, nested functions included
+    names : Set[str] = set()
+    nodes = list(body)
+
+    while(nodes) :
+        node = nodes.pop()
+        kind = node.kind
+
+        if(kind == NodeType.AssignmentExpr) :
+            if(node.assignee.kind == NodeType.Identifier) :
+                names.add(node.assignee.symbol)
+            nodes.append(node.value)
+        elif(kind == NodeType.BinaryExpr) :
+            nodes.extend((node.left, node.right))
+        elif(kind == NodeType.CallExpr) :
+            nodes.extend(node.args)
+            nodes.append(node.caller)
+        elif(kind == NodeType.MemberExpr) :
+            nodes.extend((node.object, node.property))
+        elif(kind == NodeType.ObjectLiteral) :
+            nodes.extend(prop.value for prop in node.properties if prop.value)
+        elif(kind == NodeType.ArrayLiteral) :
+            nodes.extend(node.elements)
+        elif(kind == NodeType.SliceExpr) :
+            nodes.extend(bound for bound in (node.object, node.start, node.end) if bound is not None)
+        elif(kind == NodeType.VariableDecl) :
+            if(node.value) :
+                nodes.append(node.value)
+        elif(kind == NodeType.FunctionDecl) :
+            nodes.extend(node.body)
+        elif(kind == NodeType.ForStmt) :
+            nodes.extend((node.start, node.end))
+            nodes.extend(node.invariants)
+            nodes.extend(node.body)
+        elif(kind == NodeType.WhileStmt) :
+            nodes.append(node.condition)
+            nodes.extend(node.invariants)
+            nodes.extend(node.body)
+
+    return names
+
+def _fail(message : str) -> None :
+    raise InterpreterError(message)
+
+def _fail_property(message : str) -> None :
+    raise PropertyError(message)
+
+# names every transpiled module can use
+RUNTIME = {
+    'Record' : Record,
+    'MISSING' : MISSING,
+    'FunctionType' : FunctionType,
+    '_arith' : _arith,
+    '_divide' : _divide,
+    '_modulo' : _modulo,
+    '_not_callable' : _not_callable,
+    '_arity' : _arity,
+    '_computed' : _computed,
+    '_member' : _member,
+    '_array' : _array,
+    '_slice' : _slice,
+    '_counter' : _counter,
+    '_truthy' : _truthy,
+    '_redeclared' : _redeclared,
+    '_not_assignable' : _not_assignable,
+    '_fail' : _fail,
+    '_fail_property' : _fail_property,
+}
+
+# ------------------------------------------------------------------------------
+# Engine
+# ------------------------------------------------------------------------------
+
+NAME_IN_ERROR = re.compile(r"'(\w+)'")
+
+# id of the code object of every transpiled function -> its declaration,
+# for as long as the code is alive. functions outlive the run that made them
+# (in a REPL session, or returned to a host) and are boxed back to a
+# FunctionVal. code objects compare by value, so the same function in two
+# programs has two equal code objects : they are told apart by identity
+DECLS : Dict[int, FunctionDecl] = {}
+
+def _register(code : CodeType, decls : Dict[int, FunctionDecl]) -> None :
+
+    # the code of nested functions is a constant of the code around it.
+    # _program is the only one that is not a NanoScript function
+    for const in code.co_consts :
+        if(type(const) is CodeType) :
+            if(const.co_firstlineno in decls and id(const) not in DECLS) :
+                DECLS[id(const)] = decls[const.co_firstlineno]
+                weakref.finalize(const, DECLS.pop, id(const), None)
+            _register(const, decls)
+
+class Transpiled() :
+
+    def __init__(self, code : CodeType, decls : Dict[int, FunctionDecl], source : ast.Module, ends_in_call : bool, strings : List[StringVal]) -> None:
+        self.code = code
+        self.decls = decls
+        self.ends_in_call = ends_in_call
+        self.strings = strings
+
+        # the lowered module, for ast.unparse when debugging
+        self.module = source
+
+class TranspilingInterpreter() :
+
+    # same interface as Interpreter : programs are transpiled and compiled
+    # once, then every evaluate runs the code object in the namespace of
+    # the env, brought up to date with it first
+
+    def __init__(self, env : Environment) -> None:
+        self.global_env = env
+        self._compiled : 'weakref.WeakKeyDictionary[Program, Transpiled]' = weakref.WeakKeyDictionary()
+
+    def compile(self, program : Program, env : Environment = None, strict : bool = True) -> Transpiled :
+
+        if(program not in self._compiled) :
+            Resolver().resolve(program, visible_names(env if env is not None else self.global_env), strict)
+
+            transpiler = Transpiler()
+            module = transpiler.transpile(program)
+            code = compile(module, FILENAME, 'exec')
+            ends_in_call = len(program.body) > 0 and program.body[-1].kind == NodeType.CallExpr
+            _register(code, transpiler.decls)
+            self._compiled[program] = Transpiled(code, transpiler.decls, module, ends_in_call, transpiler.strings)
+
+        return self._compiled[program]
+
+    def evaluate(self, program : Program, env : Environment = None) -> RuntimeVal :
+        current_env = env if env is not None else self.global_env
+        return self.run(self.compile(program, current_env), current_env)
+
+    def run(self, transpiled : Transpiled, env : Environment) -> RuntimeVal :
+
+        bridge = Bridge(env)
+
+        namespace = env.python_globals
+        if(namespace is None) :
+            namespace = env.python_globals = dict(RUNTIME)
+
+        # the globals the program starts with. an inner env shadows the outer ones
+        chain = []
+        scope = env
+        while(scope is not None) :
+            chain.append(scope)
+            scope = scope.parent
+
+        initial : Dict[str, Any] = {}
+        writable : Set[str] = set()
+        for scope in reversed(chain) :
+            for (name, value) in scope.variables.items() :
+                initial[name] = bridge.unbox(value)
+                if(name in scope.constants) :
+                    writable.discard(name)
+                else :
+                    writable.add(name)
+
+        for (name, value) in initial.items() :
+            namespace[f'g_{name}'] = value
+
+        own = set(env.variables)
+        declared = set(own)
+
+        namespace['_declared'] = declared
+        namespace['_writable'] = writable
+        namespace['_env'] = env
+        namespace['_bridge'] = bridge
+
+        exec(transpiled.code, namespace)
+
+        try :
+            result = namespace[PROGRAM](transpiled.strings)
+        except NameError as err :
+            raise ScopeError(f'Cannot resolve {_unmangle(err)} as it does not exist') from None
+        finally :
+            self._write_back(env, bridge, namespace, initial, own, declared, writable)
+
+        # the other engines hand back the None of a native (eg. a program
+        # ending in print(...)) as it is, not as null
+        if(result is None and bridge.nothing and transpiled.ends_in_call) :
+            return None
+
+        return box(result, bridge)
+
+    def _write_back(self, env : Environment, bridge : Bridge, namespace : dict, initial : dict, own : Set[str], declared : Set[str], writable : Set[str]) -> None :
+
+        # globals declared or re-assigned by the run end up in the env, as if
+        # the program had run on it directly
+        for name in declared - own :
+            env.decl_var(name, box(namespace[f'g_{name}'], bridge), name not in writable)
+
+        for (name, value) in initial.items() :
+            current = namespace[f'g_{name}']
+            if(current is not value and name in writable) :
+                env.assign_var(name, box(current, bridge))
+
+def _unmangle(err : NameError) -> str :
+
+    # g_<name>, v<fid>_<slot>_<name> : the NanoScript name is the last part
+    name = getattr(err, 'name', None)
+    if(name is None) :
+        match = NAME_IN_ERROR.search(str(err))
+        name = match.group(1) if match else '?'
+    return name.rsplit('_', 1)[-1]
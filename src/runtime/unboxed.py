@@ -0,0 +1,313 @@
+from typing import cast
+
+from frontend.ast import *
+from .values.base import RuntimeVal, ValueType
+from .values.derived import ObjectVal, NumberVal
+from .values.advanced import FunctionVal
+from .values.make import make_null, make_number
+from .values.shape import InlineCache, shape_of, property_key
+from .values.array import ArrayVal, array_index, array_slice, array_property
+from .values.string import StringVal, string_binary
+from .vectorized import elementwise
+from .environment import Environment
+from .loops import truthy, range_bound
+from .closure import ClosureCompiler, ClosureInterpreter, Compiled, _fail
+from utils.errors import DivisionByZeroError, CallError, PropertyError
+
+'''
+
+    - closure backend variant where numbers flow through the engine as raw
+      Python floats / ints instead of NumberVals
+    - arithmetic is plain Python arithmetic : no isinstance checks, no
+      boxing of the result. non numbers make the operator raise TypeError,
+      which is turned into null like the boxed engines do (or, when one of
+      them is a string or an array, into joining the strings or the
+      elementwise operation)
+    - values are boxed into RuntimeVals only where they leave the engine :
+
+        - stored in an object (arrays of numbers keep them unboxed, as
+          doubles, and hand them back as floats)
+        - passed to a native function
+        - stored in the global env (the REPL, natives and hosts read it)
+        - returned from evaluate()
+
+      and unboxed again when they come back in (object reads, native
+      results, global reads). locals in SlotFrames stay unboxed, and so
+      does the variable of a for loop : the floats of the counter go
+      straight into its slot, so a counted loop allocates no NumberVal
+
+'''
+
+NUMBERS = (float, int)
+NULL = make_null()
+
+def box(value) -> RuntimeVal :
+    return make_number(value) if value.__class__ in NUMBERS else value
+
+def unbox(value) :
+    return value.value if value.__class__ is NumberVal else value
+
+def _truthy(value) -> bool :
+    return bool(value) if value.__class__ in NUMBERS else truthy(value)
+
+def _range_bound(bound, node) -> float :
+    return float(bound) if bound.__class__ in NUMBERS else range_bound(bound, node)
+
+def _other(op : str, l, r) :
+    # the operator raised TypeError : strings are joined, arrays go
+    # elementwise, anything else gives null
+    if(l.__class__ is StringVal or r.__class__ is StringVal) :
+        return string_binary(op, box(l), box(r))
+    if(l.__class__ is ArrayVal or r.__class__ is ArrayVal) :
+        return elementwise(op, box(l), box(r))
+    return NULL
+
+class UnboxedCompiler(ClosureCompiler) :
+
+    mode = 'unboxed'
+
+    counter_value = None
+    truthy = staticmethod(_truthy)
+    range_bound = staticmethod(_range_bound)
+
+    def _compile_numeric_literal(self, node : NumericLiteral) -> Compiled :
+        value = node.value
+
+        def run(env : Environment) :
+            return value
+
+        return run
+
+    def _compile_binary_expr(self, expr : BinaryExpr) -> Compiled :
+
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        if(expr.operator == '+') :
+            def run(env : Environment) :
+                l = left(env)
+                r = right(env)
+                try :
+                    return l + r
+                except TypeError :
+                    return _other('+', l, r)
+
+        elif(expr.operator == '-') :
+            def run(env : Environment) :
+                l = left(env)
+                r = right(env)
+                try :
+                    return l - r
+                except TypeError :
+                    return _other('-', l, r)
+
+        elif(expr.operator == '*') :
+            def run(env : Environment) :
+                l = left(env)
+                r = right(env)
+                try :
+                    return l * r
+                except TypeError :
+                    return _other('*', l, r)
+
+        elif(expr.operator == '/') :
+            def run(env : Environment) :
+                l = left(env)
+                r = right(env)
+                try :
+                    return l / r
+                except TypeError :
+                    return _other('/', l, r)
+                except ZeroDivisionError :
+                    raise DivisionByZeroError('Division by 0') from None
+
+        elif(expr.operator == '%') :
+            def run(env : Environment) :
+                l = left(env)
+                r = right(env)
+                try :
+                    return l % r
+                except TypeError :
+                    return _other('%', l, r)
+                except ZeroDivisionError :
+                    raise DivisionByZeroError('Division by 0') from None
+
+        else :
+            return _fail(InterpreterError, f'Unknown binary operator {expr.operator}')
+
+        return run
+
+    def _compile_load(self, symbol : str, address) -> Compiled :
+
+        if(address is None) :
+            def run(env : Environment) :
+                return unbox(env.lookup_var(symbol))
+
+            return run
+
+        return super()._compile_load(symbol, address)
+
+    def _compile_object_expr(self, obj : ObjectLiteral) -> Compiled :
+
+        keys = []
+        values = []
+        for prop in obj.properties :
+            value = self.compile(prop.value) if (prop.value) else self._compile_load(prop.key, prop.address)
+            keys.append(prop.key)
+            values.append(value)
+
+        shape = shape_of(keys)
+
+        if(shape is not None) :
+            def run(env : Environment) :
+                return ObjectVal.with_shape(shape, [box(value(env)) for value in values])
+
+            return run
+
+        props = list(zip(keys, values))
+
+        def run(env : Environment) :
+            res = ObjectVal()
+            for (key, value) in props :
+                res.set(key, box(value(env)))
+            return res
+
+        return run
+
+    def _compile_call_expr(self, expr : CallExpr) -> Compiled :
+
+        args = [self.compile(arg) for arg in expr.args]
+        caller = self.compile(expr.caller)
+
+        def run(env : Environment) :
+            values = [arg(env) for arg in args]
+            func = caller(env)
+            kind = func.type if func.__class__ not in NUMBERS else None
+
+            if(kind == ValueType.Function) :
+                fn = cast(FunctionVal, func)
+                return fn.code(fn.decl_env, values)
+
+            if(kind == ValueType.NativeFunction) :
+                return unbox(func.callback([box(value) for value in values], env))
+
+            raise CallError(f'Cannot call value that is not a function : {box(func)}')
+
+        return run
+
+    def _compile_member_expr(self, expr : MemberExpr) -> Compiled :
+
+        obj = self.compile(expr.object)
+        cache = InlineCache()
+
+        # raw numbers are not RuntimeVals, so the object is checked by class
+        if(expr.computed) :
+            prop = self.compile(expr.property)
+            node = expr.property
+
+            def run(env : Environment) :
+                value = obj(env)
+                index = prop(env)
+
+                # an array of numbers already holds raw floats
+                if(value.__class__ is ArrayVal) :
+                    if(value.numeric and index.__class__ is float and index.is_integer() and 0 <= index < len(value.items)) :
+                        return value.items[int(index)]
+                    return unbox(array_index(value, box(index), node))
+
+                key = property_key(box(index))
+                if(key is None) :
+                    raise PropertyError(f'Invalid computed property in member expression : {node.to_dict()}')
+
+                if(value.__class__ is not ObjectVal) :
+                    return value
+                return unbox(cache.get(value, key))
+
+            return run
+
+        if(expr.property.kind != NodeType.Identifier) :
+            return _fail(PropertyError, f'Error occured while evaluating member expression : {expr.property.to_dict()}')
+
+        key = expr.property.symbol
+
+        def run(env : Environment) :
+            value = obj(env)
+            if(value.__class__ is not ObjectVal) :
+                return unbox(array_property(value, key)) if value.__class__ is ArrayVal else value
+
+            if(value.shape is cache.shape) :
+                return unbox(value.values[cache.slot])
+            return unbox(cache.get(value, key))
+
+        return run
+
+    def _compile_array_expr(self, arr : ArrayLiteral) -> Compiled :
+
+        elements = [self.compile(element) for element in arr.elements]
+
+        def run(env : Environment) :
+            values = [element(env) for element in elements]
+
+            # raw numbers go into the doubles as they are, anything else
+            # makes array('d') raise and the array holds RuntimeVals
+            try :
+                return ArrayVal.of_numbers(values)
+            except TypeError :
+                return ArrayVal([box(value) for value in values])
+
+        return run
+
+    def _compile_slice_expr(self, expr : SliceExpr) -> Compiled :
+
+        obj = self.compile(expr.object)
+        start = self.compile(expr.start) if expr.start is not None else None
+        end = self.compile(expr.end) if expr.end is not None else None
+
+        def run(env : Environment) :
+            value = obj(env)
+            return array_slice(
+                box(value),
+                box(start(env)) if start is not None else None,
+                box(end(env)) if end is not None else None,
+                expr
+            )
+
+        return run
+
+    def _compile_variable_decl(self, decl : VariableDecl) -> Compiled :
+
+        if(decl.address is not None) :
+            return super()._compile_variable_decl(decl)
+
+        value = self.compile(decl.value) if (decl.value) else None
+        name = decl.identifier
+        constant = decl.constant
+
+        def run(env : Environment) :
+            val = value(env) if value is not None else NULL
+            env.decl_var(var_name=name, value=box(val), constant=constant)
+            return val
+
+        return run
+
+    def _compile_assignment(self, node : AssignmentExpr) -> Compiled :
+
+        if(node.assignee.kind != NodeType.Identifier or node.address is not None) :
+            return super()._compile_assignment(node)
+
+        var_name = node.assignee.symbol
+        value = self.compile(node.value)
+
+        def run(env : Environment) :
+            val = value(env)
+            env.assign_var(var_name, box(val))
+            return val
+
+        return run
+
+class UnboxedInterpreter(ClosureInterpreter) :
+
+    compiler_class = UnboxedCompiler
+
+    def evaluate(self, program : Program, env : Environment = None) -> RuntimeVal :
+        return box(super().evaluate(program, env))
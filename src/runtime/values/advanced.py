@@ -10,13 +10,22 @@ class FunctionVal(RuntimeVal) :
     # Callabale[[List[RuntimeVal, Environment]], None]
     # current design prevents importing Environment due 
     # to circular nature. Need some refactoring
-    def __init__(self, name : str, parameters : List[str], body : List[Stmt], decl_env : Environment):
+    __slots__ = ('name', 'parameters', 'body', 'decl_env', 'code', 'pure')
+
+    def __init__(self, name : str, parameters : List[str], body : List[Stmt], decl_env : Environment, code = None, pure : bool = False):
         super().__init__(ValueType.Function)
         self.name = name
         self.parameters = parameters
         self.body = body
         self.decl_env = decl_env
 
+        # compiled body when created by one of the compiling engines : 
+        # a CodeObject (runtime/vm.py) or a closure (runtime/closure.py)
+        self.code = code
+
+        # set from FunctionDecl.pure (frontend/purity.py) : calls may be memoized
+        self.pure = pure
+
     def to_dict(self):
         return {'type': self.type, 'name' : self.name, 'parameters' : self.parameters, 'body' : self.body, 'decl_env' : self.decl_env }
     
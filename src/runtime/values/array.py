@@ -0,0 +1,135 @@
+import math
+from array import array
+from typing import Iterable, List, Optional, Union
+
+from .base import RuntimeVal, ValueType
+from .derived import NumberVal
+from .make import make_number
+from .shape import property_key
+from utils.errors import PropertyError
+
+'''
+
+    - arrays : [1, 2, 3], read with a[i], a[i:j] and a.length
+    - an array of numbers keeps them unboxed, as doubles in an array('d') :
+      8 bytes an element instead of a NumberVal (and its float) each, so a
+      million numbers take 8 MB. they are boxed one at a time, when read
+    - arrays holding anything else (objects, functions, a mix of kinds)
+      keep a list of RuntimeVals
+    - arrays are never modified once built, so slicing never copies the
+      numbers : a[i:j] is a memoryview over the doubles of a. slices of a
+      list copy the references, the elements themselves are shared
+    - the engines all go through array_index, array_slice and
+      array_property below, so they agree on the rules and the errors :
+      indexes and slice bounds are whole numbers, indexes must be in range,
+      slice bounds are clamped to the array like Python does
+
+'''
+
+class ArrayVal(RuntimeVal) :
+
+    __slots__ = ('items', 'numeric')
+
+    def __init__(self, items : Union[memoryview, List[RuntimeVal]]) :
+        super().__init__(ValueType.Array)
+
+        # memoryview of doubles (format 'd') or a list of RuntimeVals
+        self.items = items
+        self.numeric = isinstance(items, memoryview)
+
+    @classmethod
+    def of_numbers(cls, numbers : Iterable[float]) -> 'ArrayVal' :
+        return cls(memoryview(array('d', numbers)))
+
+    def __len__(self) -> int :
+        return len(self.items)
+
+    def get(self, index : int) -> RuntimeVal :
+        item = self.items[index]
+        return make_number(item) if self.numeric else item
+
+    def slice(self, start : int, stop : int) -> 'ArrayVal' :
+        return ArrayVal(self.items[start:stop])
+
+    def elements(self) -> List[RuntimeVal] :
+        if(self.numeric) :
+            return [make_number(item) for item in self.items]
+        return list(self.items)
+
+    def to_dict(self):
+        elements = self.items.tolist() if self.numeric else [item.to_dict() for item in self.items]
+        return {'type': self.type, 'elements' : elements }
+
+def make_array(values : List[RuntimeVal]) -> ArrayVal :
+
+    # numbers only (an empty array included) : stored unboxed
+    for value in values :
+        if(value.__class__ is not NumberVal) :
+            return ArrayVal(list(values))
+
+    return ArrayVal.of_numbers([value.value for value in values])
+
+def _whole(value : RuntimeVal) -> Optional[int] :
+    # a number with no fractional part, as an int
+    if(value.__class__ is not NumberVal or not math.isfinite(value.value) or value.value != int(value.value)) :
+        return None
+    return int(value.value)
+
+def index_of(arr : ArrayVal, key : RuntimeVal) -> Optional[int] :
+
+    # the position arr[key] reads, None if key is not a number at all (the
+    # caller raises its own error for that)
+    if(key.__class__ is not NumberVal) :
+        return None
+
+    index = _whole(key)
+    if(index is None) :
+        raise PropertyError(f'Array index {property_key(key)} is not a whole number')
+
+    if(index < 0 or index >= len(arr.items)) :
+        raise PropertyError(f'Array index {index} out of range for array of length {len(arr.items)}')
+
+    return index
+
+def slice_bound(bound : RuntimeVal, length : int) -> Optional[int] :
+    # a bound of arr[start:end] clamped to the array, None if it is not a whole number
+    value = _whole(bound)
+    return None if value is None else min(max(value, 0), length)
+
+def array_index(arr : ArrayVal, key : RuntimeVal, node) -> RuntimeVal :
+
+    # arr[key]. node is the property, for the error message
+    index = index_of(arr, key)
+    if(index is None) :
+        raise PropertyError(f'Invalid computed property in member expression : {node.to_dict()}')
+
+    return arr.get(index)
+
+def array_slice(arr : RuntimeVal, start : Optional[RuntimeVal], stop : Optional[RuntimeVal], node) -> ArrayVal :
+
+    # arr[start:stop], a bound left out is None. node is the SliceExpr
+    if(arr.type != ValueType.Array) :
+        raise PropertyError(f'Cannot slice value that is not an array : {arr.to_dict()}')
+
+    length = len(arr.items)
+    bounds = []
+
+    for (bound, default, expr) in ((start, 0, node.start), (stop, length, node.end)) :
+        if(bound is None) :
+            bounds.append(default)
+            continue
+
+        value = slice_bound(bound, length)
+        if(value is None) :
+            raise PropertyError(f'Invalid slice bound in slice expression : {expr.to_dict()}')
+        bounds.append(value)
+
+    return arr.slice(bounds[0], max(bounds[0], bounds[1]))
+
+def array_property(arr : ArrayVal, key : str) -> RuntimeVal :
+
+    # arr.key : arrays only have a length
+    if(key == 'length') :
+        return make_number(float(len(arr.items)))
+
+    raise PropertyError(f'Array has no property {key}')
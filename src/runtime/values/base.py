@@ -6,12 +6,18 @@ from abc import ABC
 class ValueType(Enum):
     Null = "null"
     Number = "number"
+    String = "string"
     Boolean = "boolean"
     Object = "object"
+    Array = "array"
     NativeFunction = "native-function"
     Function = "function"
 
 class RuntimeVal(ABC):
+
+    # every value class declares __slots__, so values carry no per instance __dict__
+    __slots__ = ('type',)
+
     def __init__(self, type: ValueType):
         self.type = type
 
@@ -0,0 +1,78 @@
+from typing import Any
+
+from .base import RuntimeVal, ValueType
+from .derived import ObjectVal
+from .array import ArrayVal, make_array
+from .string import make_string
+from .make import make_null, make_bool, make_number, make_native_fn
+
+'''
+
+    - conversions between Python values and RuntimeVals, for hosts that
+      pass globals in and read results out (see nanoscript.py)
+
+            None        <->     null
+            bool        <->     boolean
+            int / float <->     number      (numbers come back as floats)
+            str         <->     string
+            dict        <->     object      (keys must be strings)
+            list / tuple <->    array       (arrays come back as lists)
+            callable     ->     native function, called with Python values
+
+    - functions defined in the script are handed out as they are (FunctionVal)
+
+'''
+
+def to_runtime(value : Any) -> RuntimeVal :
+
+    if(isinstance(value, RuntimeVal)) :
+        return value
+    if(value is None) :
+        return make_null()
+    if(isinstance(value, bool)) :
+        return make_bool(value)
+    if(isinstance(value, (int, float))) :
+        return make_number(float(value))
+    if(isinstance(value, str)) :
+        return make_string(value)
+    if(isinstance(value, dict)) :
+        obj = ObjectVal()
+        for (key, item) in value.items() :
+            obj.set(str(key), to_runtime(item))
+        return obj
+    if(isinstance(value, (list, tuple))) :
+        return make_array([to_runtime(item) for item in value])
+    if(callable(value)) :
+        return native(value)
+
+    raise TypeError(f'Cannot convert {type(value).__name__} to a NanoScript value')
+
+def to_python(value : RuntimeVal) -> Any :
+
+    # natives may return None (eg. print)
+    if(value is None) :
+        return None
+
+    kind = value.type
+
+    if(kind == ValueType.Null) :
+        return None
+    if(kind == ValueType.Boolean) :
+        return value.value
+    if(kind == ValueType.Number or kind == ValueType.String) :
+        return value.value
+    if(kind == ValueType.Object) :
+        return { key : to_python(item) for (key, item) in value.properties.items() }
+    if(kind == ValueType.Array) :
+        return value.items.tolist() if value.numeric else [to_python(item) for item in value.items]
+
+    return value
+
+def native(fn) -> RuntimeVal :
+
+    # wraps a Python function as a native function : arguments are converted
+    # to Python values and the result back to a RuntimeVal
+    def callback(args, env) :
+        return to_runtime(fn(*[to_python(arg) for arg in args]))
+
+    return make_native_fn(callback)
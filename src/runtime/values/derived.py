@@ -1,7 +1,10 @@
-from typing import Dict, Callable
+from typing import Dict, List, Callable
 from .base import RuntimeVal, ValueType
+from .shape import Shape, EMPTY_SHAPE
 
 class NullVal(RuntimeVal) :
+    __slots__ = ('value',)
+
     def __init__(self):
         super().__init__(ValueType.Null)
         self.value = None
@@ -10,6 +13,8 @@ class NullVal(RuntimeVal) :
         return {'type': self.type}
 
 class BooleanVal(RuntimeVal) :
+    __slots__ = ('value',)
+
     def __init__(self, value : bool):
         super().__init__(ValueType.Boolean)
         self.value = value
@@ -19,6 +24,8 @@ class BooleanVal(RuntimeVal) :
 
 
 class NumberVal(RuntimeVal) :
+    __slots__ = ('value',)
+
     def __init__(self, value : float):
         super().__init__(ValueType.Number)
         self.value = value
@@ -27,9 +34,43 @@ class NumberVal(RuntimeVal) :
         return {'type': self.type, 'value' : self.value }
     
 class ObjectVal(RuntimeVal) :
-    def __init__(self, properties : Dict[str, RuntimeVal]):
+    __slots__ = ('shape', 'values')
+
+    def __init__(self, properties : Dict[str, RuntimeVal] = None):
         super().__init__(ValueType.Object)
-        self.properties = properties
+
+        # hidden class + slot array (see values/shape.py) instead of a dict
+        self.shape : Shape = EMPTY_SHAPE
+        self.values : List[RuntimeVal] = []
+
+        if(properties) :
+            for (key, value) in properties.items() :
+                self.set(key, value)
+
+    @classmethod
+    def with_shape(cls, shape : Shape, values : List[RuntimeVal]) -> 'ObjectVal' :
+        # for callers that already know the final shape (eg. compiled literals)
+        obj = cls()
+        obj.shape = shape
+        obj.values = values
+        return obj
+
+    def get(self, key : str) -> RuntimeVal :
+        return self.values[self.shape.keys[key]]
+
+    def set(self, key : str, value : RuntimeVal) -> None :
+        index = self.shape.keys.get(key)
+
+        if(index is None) :
+            self.shape = self.shape.with_key(key)
+            self.values.append(value)
+        else :
+            self.values[index] = value
+
+    @property
+    def properties(self) -> Dict[str, RuntimeVal] :
+        # read only snapshot, for printing and debugging
+        return { key : self.values[index] for (key, index) in self.shape.keys.items() }
 
     def to_dict(self):
         return {'type': self.type, 'properties' : self.properties }
@@ -40,6 +81,8 @@ class NativeFunctionVal(RuntimeVal) :
     # Callabale[[List[RuntimeVal, Environment]], None]
     # current design prevents importing Environment due 
     # to circular nature. Need some refactoring
+    __slots__ = ('callback',)
+
     def __init__(self, callback : Callable[..., None]):
         super().__init__(ValueType.NativeFunction)
         self.callback = callback
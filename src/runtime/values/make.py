@@ -1,19 +1,41 @@
+import math
 from .derived import BooleanVal, NumberVal, NullVal, NativeFunctionVal
 
 # sorta like C macros
 
+# values are never mutated once created, so null, true and false only ever 
+# need one instance each, and small whole numbers can be shared too
+NULL = NullVal()
+TRUE = BooleanVal(value=True)
+FALSE = BooleanVal(value=False)
+
+SMALL_NUMBER_MIN = -128
+SMALL_NUMBER_MAX = 1024
+
+# keyed by float since that is what the parser and the arithmetic produce. 
+# ints (eg. from native functions) are not cached so that 3 and 3.0 stay apart
+SMALL_NUMBERS = {
+    float(n) : NumberVal(value=float(n)) for n in range(SMALL_NUMBER_MIN, SMALL_NUMBER_MAX + 1)
+}
+
 def make_number(n : float = 0) -> NumberVal :
+
+    if(type(n) is float) :
+        cached = SMALL_NUMBERS.get(n)
+
+        # -0.0 == 0.0, but it must keep its sign
+        if(cached is not None and (n != 0 or math.copysign(1.0, n) > 0)) :
+            return cached
+
     return NumberVal(
         value=n
     )
 
 def make_null() -> NullVal :
-    return NullVal()
+    return NULL
 
 def make_bool(val : bool = True) :
-    return BooleanVal(
-        value=val
-    )
+    return TRUE if val else FALSE
 
 def make_native_fn(callback) :
     return NativeFunctionVal(
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional
+from .base import ValueType
+from utils.errors import PropertyError
+
+'''
+
+    - hidden classes for ObjectVal. a Shape maps property names to slot
+      indexes ; the values themselves live in a plain list on the object
+    - shapes form a transition tree rooted at EMPTY_SHAPE : adding key k
+      to shape S always gives the same shape object, so every object built
+      by the same literal (same keys, same order) shares one Shape
+    - that makes "is this the kind of object I saw last time" a single
+      identity check, which is what the inline caches below rely on
+
+'''
+
+class Shape() :
+
+    __slots__ = ('keys', 'transitions', 'parent')
+
+    def __init__(self, keys : Dict[str, int], parent : Optional['Shape'] = None) -> None:
+        self.keys = keys
+        self.transitions : Dict[str, 'Shape'] = {}
+        self.parent = parent
+
+    def with_key(self, key : str) -> 'Shape' :
+        shape = self.transitions.get(key)
+
+        if(shape is None) :
+            keys = dict(self.keys)
+            keys[key] = len(keys)
+            shape = Shape(keys, self)
+            self.transitions[key] = shape
+
+        return shape
+
+EMPTY_SHAPE = Shape({})
+
+def shape_of(keys : List[str]) -> Optional[Shape] :
+
+    # final shape of an object literal with these keys, known before any object 
+    # is built. None when a key repeats, since the later one overwrites the earlier
+    if(len(set(keys)) != len(keys)) :
+        return None
+
+    shape = EMPTY_SHAPE
+    for key in keys :
+        shape = shape.with_key(key)
+
+    return shape
+
+# how many shapes one access site remembers before it gives up and falls back
+# to a plain lookup in the shape (megamorphic)
+MAX_POLYMORPHIC = 4
+
+class InlineCache() :
+
+    # per access site (one MemberExpr) cache of (shape, key) -> slot. sites 
+    # almost always see one shape (monomorphic), which gets its own fields so 
+    # that callers can check it inline ; a few see a handful (polymorphic). 
+    # the key is part of each entry so that computed access (foo[expr]), 
+    # where it changes between evaluations, can use the cache too
+
+    __slots__ = ('shape', 'key', 'slot', 'more')
+
+    def __init__(self) -> None:
+        self.shape : Optional[Shape] = None
+        self.key : Optional[str] = None
+        self.slot : int = 0
+        self.more : List[tuple] = []
+
+    def get(self, obj, key : str) :
+
+        shape = obj.shape
+        if(shape is self.shape and key == self.key) :
+            return obj.values[self.slot]
+
+        for (cached_shape, cached_key, slot) in self.more :
+            if(cached_shape is shape and cached_key == key) :
+                return obj.values[slot]
+
+        # miss : find the slot the slow way and remember it
+        index = shape.keys.get(key)
+        if(index is None) :
+            raise PropertyError(f'Object has no property {key}')
+
+        if(self.shape is None) :
+            (self.shape, self.key, self.slot) = (shape, key, index)
+        elif(len(self.more) < MAX_POLYMORPHIC - 1) :
+            self.more.append((shape, key, index))
+
+        return obj.values[index]
+
+def property_key(value) -> Optional[str] :
+
+    # key used for computed access, foo[expr]. None if the value cannot be one
+    if(value.type == ValueType.Number) :
+        n = value.value
+        return str(int(n)) if float(n).is_integer() else str(n)
+    if(value.type == ValueType.String) :
+        return value.value
+
+    return None
@@ -0,0 +1,123 @@
+import sys
+from typing import List, Optional
+
+from .base import RuntimeVal, ValueType
+from .make import make_null
+
+'''
+
+    - strings : "text", joined with +
+    - a + b never copies the text of a or b once the result is long enough
+      (ROPE_MIN) : it is a rope node pointing at both, and the pieces are
+      joined in one pass the first time the text is read. building a
+      string piece by piece (s = s + piece, or a long chain of +) is then
+      linear in its length instead of quadratic. short results are joined
+      right away, a node would cost more than the copy
+    - + with a string on one side and a number, true / false or null on the
+      other turns that into text first : "n = " + 4 is "n = 4". with
+      anything else, and with any other operator, a string gives null, like
+      arithmetic on values that are not numbers
+    - the text of string literals and object keys is interned (sys.intern,
+      see frontend/lexer.py) and every literal builds its StringVal once,
+      so property lookups with them compare pointers, not characters.
+      strings built at run time are not interned, so a script cannot grow
+      the intern table without bound
+
+'''
+
+# results shorter than this are joined right away
+ROPE_MIN = 256
+
+class StringVal(RuntimeVal) :
+
+    __slots__ = ('text', 'left', 'right', 'length')
+
+    def __init__(self, text : Optional[str], left : 'StringVal' = None, right : 'StringVal' = None) :
+        super().__init__(ValueType.String)
+
+        # text is None for a rope node that was not read yet : its text is
+        # the text of left followed by the text of right
+        self.text = text
+        self.left = left
+        self.right = right
+        self.length = len(text) if text is not None else left.length + right.length
+
+    @property
+    def value(self) -> str :
+        if(self.text is None) :
+            self._flatten()
+        return self.text
+
+    def _flatten(self) -> None :
+
+        # in order, without recursion : a string built in a loop is a rope
+        # as deep as the loop is long
+        parts : List[str] = []
+        stack = [self]
+        while(stack) :
+            node = stack.pop()
+            if(node.text is not None) :
+                parts.append(node.text)
+            else :
+                stack.append(node.right)
+                stack.append(node.left)
+
+        self.text = ''.join(parts)
+        self.left = None
+        self.right = None
+
+    def __len__(self) -> int :
+        return self.length
+
+    def to_dict(self):
+        return {'type': self.type, 'value' : self.value }
+
+EMPTY = StringVal('')
+
+def make_string(text : str) -> StringVal :
+    return StringVal(text) if text else EMPTY
+
+def intern_string(text : str) -> StringVal :
+    # for literals : built once, by the parser or the engine
+    return make_string(sys.intern(text))
+
+def number_text(n : float) -> str :
+    # 4.0 is "4", like object keys (see shape.property_key)
+    return str(int(n)) if float(n).is_integer() else str(n)
+
+def _as_string(value : RuntimeVal) -> Optional[StringVal] :
+
+    kind = value.type
+    if(kind == ValueType.String) :
+        return value
+    if(kind == ValueType.Number) :
+        return make_string(number_text(value.value))
+    if(kind == ValueType.Boolean) :
+        return make_string('true' if value.value else 'false')
+    if(kind == ValueType.Null) :
+        return make_string('null')
+
+    return None
+
+def concat(left : RuntimeVal, right : RuntimeVal) -> RuntimeVal :
+
+    # left + right when at least one of them is a string
+    l = _as_string(left)
+    r = _as_string(right)
+
+    if(l is None or r is None) :
+        return make_null()
+
+    if(l.length == 0) :
+        return r
+    if(r.length == 0) :
+        return l
+
+    if(l.length + r.length < ROPE_MIN) :
+        return StringVal(l.value + r.value)
+
+    return StringVal(None, l, r)
+
+def string_binary(op : str, left : RuntimeVal, right : RuntimeVal) -> RuntimeVal :
+    # any operator with a string operand
+    return concat(left, right) if op == '+' else make_null()
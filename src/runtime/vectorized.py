@@ -0,0 +1,153 @@
+import math
+import operator
+from array import array
+from itertools import repeat
+from typing import Any, Callable, Dict, List
+
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
+from .values.base import RuntimeVal
+from .values.derived import NumberVal
+from .values.array import ArrayVal
+from .values.make import make_null, make_number, make_native_fn
+from utils.errors import InterpreterError, DivisionByZeroError, CallError
+
+'''
+
+    - elementwise arithmetic on arrays of numbers : + - * / % between two
+      arrays of the same length, or between an array and a number (the
+      number is used against every element). prices * 1.2 + fee is two
+      vectorized operations, not a loop over the elements
+    - the reductions sum, min, max and mean, registered as natives by
+      create_global_env
+    - with NumPy installed, the doubles of an ArrayVal are handed to NumPy
+      as they are (numpy.frombuffer, no copy) and the result array becomes
+      the storage of the new ArrayVal. without it, the same operations run
+      over the doubles in plain Python and give the same results (sum
+      excepted : NumPy adds pairwise, math.fsum exactly, so the last bits
+      can differ)
+    - like scalar arithmetic, anything else (objects, arrays that do not
+      hold only numbers ...) gives null. dividing by an array holding a 0
+      raises, like dividing by 0 does
+
+'''
+
+NULL = make_null()
+
+OPERATORS : Dict[str, Callable] = {
+    '+' : operator.add,
+    '-' : operator.sub,
+    '*' : operator.mul,
+    '/' : operator.truediv,
+    '%' : operator.mod,
+}
+
+UFUNCS : Dict[str, Any] = {
+    '+' : numpy.add,
+    '-' : numpy.subtract,
+    '*' : numpy.multiply,
+    '/' : numpy.true_divide,
+    '%' : numpy.remainder,
+} if numpy is not None else {}
+
+def _operand(value : RuntimeVal) -> Any :
+    # the float of a number, the doubles of an array of numbers, else None
+    if(value.__class__ is NumberVal) :
+        return value.value
+    if(value.__class__ is ArrayVal and value.numeric) :
+        return value.items
+    return None
+
+def _numpy(op : str, left : Any, right : Any) -> memoryview :
+
+    if(type(left) is memoryview) :
+        left = numpy.frombuffer(left, dtype=numpy.float64)
+    if(type(right) is memoryview) :
+        right = numpy.frombuffer(right, dtype=numpy.float64)
+
+    # overflow gives inf like float arithmetic does, without a warning
+    with numpy.errstate(all='ignore') :
+        result = UFUNCS[op](left, right, dtype=numpy.float64)
+
+    return memoryview(result)
+
+def _python(op : str, left : Any, right : Any) -> memoryview :
+
+    fn = OPERATORS[op]
+
+    if(type(left) is not memoryview) :
+        left = repeat(left)
+    elif(type(right) is not memoryview) :
+        right = repeat(right)
+
+    return memoryview(array('d', map(fn, left, right)))
+
+def elementwise(op : str, left : RuntimeVal, right : RuntimeVal) -> RuntimeVal :
+
+    # left <op> right when at least one of them is an array
+    l = _operand(left)
+    r = _operand(right)
+
+    if(l is None or r is None) :
+        return NULL
+
+    length = len(l) if type(l) is memoryview else len(r)
+
+    if(type(l) is memoryview and type(r) is memoryview and len(l) != len(r)) :
+        raise InterpreterError(f'Cannot apply {op} to arrays of length {len(l)} and {len(r)}')
+
+    if(op in ('/', '%') and (r == 0 if type(r) is not memoryview else 0.0 in r)) :
+        raise DivisionByZeroError('Division by 0')
+
+    if(length == 0) :
+        return ArrayVal.of_numbers(())
+
+    if(numpy is not None) :
+        return ArrayVal(_numpy(op, l, r))
+    return ArrayVal(_python(op, l, r))
+
+# ------------------------------------------------------------------------------
+# Reductions
+# ------------------------------------------------------------------------------
+
+def _numbers(name : str, args : List[RuntimeVal], empty : bool) -> Any :
+
+    # the doubles of the one array a reduction is called with
+    if(len(args) != 1) :
+        raise CallError(f'{name} expects 1 arguments, got {len(args)}')
+
+    items = _operand(args[0])
+    if(type(items) is not memoryview) :
+        raise CallError(f'{name} expects an array of numbers, got {args[0].to_dict()}')
+
+    if(len(items) == 0 and not empty) :
+        raise CallError(f'{name} of an empty array')
+
+    return numpy.frombuffer(items, dtype=numpy.float64) if numpy is not None and len(items) > 0 else items
+
+def _sum(args : List[RuntimeVal], env) -> RuntimeVal :
+    items = _numbers('sum', args, True)
+    return make_number(float(items.sum()) if type(items) is not memoryview else math.fsum(items))
+
+def _min(args : List[RuntimeVal], env) -> RuntimeVal :
+    items = _numbers('min', args, False)
+    return make_number(float(items.min()) if type(items) is not memoryview else min(items))
+
+def _max(args : List[RuntimeVal], env) -> RuntimeVal :
+    items = _numbers('max', args, False)
+    return make_number(float(items.max()) if type(items) is not memoryview else max(items))
+
+def _mean(args : List[RuntimeVal], env) -> RuntimeVal :
+    items = _numbers('mean', args, False)
+    return make_number(float(items.mean()) if type(items) is not memoryview else math.fsum(items) / len(items))
+
+# natives declared in every global env
+REDUCTIONS : Dict[str, RuntimeVal] = {
+    'sum' : make_native_fn(_sum),
+    'min' : make_native_fn(_min),
+    'max' : make_native_fn(_max),
+    'mean' : make_native_fn(_mean),
+}
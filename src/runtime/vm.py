@@ -0,0 +1,359 @@
+import weakref
+from typing import List, cast
+
+from frontend.ast import Program
+from .values.base import RuntimeVal, ValueType
+from .values.derived import ObjectVal, NumberVal
+from .values.advanced import FunctionVal
+from .values.make import make_null, make_number
+from .values.shape import property_key
+from .values.array import make_array, array_index, array_slice, array_property
+from .values.string import string_binary
+from .vectorized import elementwise
+from .environment import Environment
+from .loops import counter, numbers, range_bound, truthy
+from .bytecode import OpCode, CodeObject, FunctionCode, Compiler, BINARY_OPERATORS
+from .governor import Governor
+from utils.errors import InterpreterError, DivisionByZeroError, CallError, CallDepthError, PropertyError
+
+'''
+
+    - stack based virtual machine for the bytecode in runtime/bytecode.py
+    - drop-in alternative to the tree walking Interpreter : same constructor
+      and the same evaluate(program) entry point
+    - calls between NanoScript functions push a Frame instead of recursing
+      in Python, so the whole program runs inside a single loop. how deep
+      the frames can go is set by max_depth, not by Python's recursion limit
+    - calls in tail position (TAIL_CALL) reuse the caller's frame, so a
+      function whose last statement calls another function (or itself)
+      runs in constant space, however long the chain of calls is
+    - pass a Governor (runtime/governor.py) to enforce a Budget : it is
+      charged the cost of each CodeObject as the VM enters it, and the cost
+      of one more iteration every time a loop jumps back. without one the
+      only extra work is a None check per call and per iteration
+
+'''
+
+# frames a program can stack up before the VM gives up. each one is a Frame,
+# an Environment and whatever is left on its stack, so this bounds memory too
+MAX_DEPTH = 100_000
+
+class Frame() :
+
+    __slots__ = ('code', 'env', 'pc', 'stack')
+
+    def __init__(self, code : CodeObject, env : Environment) -> None:
+        self.code = code
+        self.env = env
+        self.pc = 0
+        self.stack : List[RuntimeVal] = []
+
+class VM() :
+
+    def __init__(self, env : Environment, max_depth : int = MAX_DEPTH, governor : Governor = None) -> None:
+        self.global_env = env
+        self.compiler = Compiler()
+        self.max_depth = max_depth
+        self.governor = governor
+
+        # programs are compiled once. evaluating the same Program again
+        # (eg. from a host that keeps it around) reuses its code
+        self._compiled : 'weakref.WeakKeyDictionary[Program, CodeObject]' = weakref.WeakKeyDictionary()
+        return
+
+    def compile(self, program : Program) -> CodeObject :
+        if(program not in self._compiled) :
+            self._compiled[program] = self.compiler.compile_program(program)
+        return self._compiled[program]
+
+    def evaluate(self, program : Program, env : Environment = None) -> RuntimeVal :
+        current_env = env if env is not None else self.global_env
+        return self.run(self.compile(program), current_env)
+
+    def run(self, code : CodeObject, env : Environment) -> RuntimeVal :
+
+        frames : List[Frame] = []
+        frame = Frame(code, env)
+
+        # plain ints compare a lot faster than looking up OpCode members
+        LOAD_CONST, LOAD_NAME, STORE_NAME = int(OpCode.LOAD_CONST), int(OpCode.LOAD_NAME), int(OpCode.STORE_NAME)
+        DECLARE_LET, DECLARE_CONST, BINARY_OP = int(OpCode.DECLARE_LET), int(OpCode.DECLARE_CONST), int(OpCode.BINARY_OP)
+        BUILD_OBJECT, MAKE_FUNCTION, CALL = int(OpCode.BUILD_OBJECT), int(OpCode.MAKE_FUNCTION), int(OpCode.CALL)
+        POP, RETURN, FAIL = int(OpCode.POP), int(OpCode.RETURN), int(OpCode.FAIL)
+        GET_PROPERTY, GET_COMPUTED = int(OpCode.GET_PROPERTY), int(OpCode.GET_COMPUTED)
+        TAIL_CALL, BUILD_ARRAY, GET_SLICE = int(OpCode.TAIL_CALL), int(OpCode.BUILD_ARRAY), int(OpCode.GET_SLICE)
+        ENTER_SCOPE, EXIT_SCOPE, RESET_SCOPE = int(OpCode.ENTER_SCOPE), int(OpCode.EXIT_SCOPE), int(OpCode.RESET_SCOPE)
+        JUMP, JUMP_IF_FALSE = int(OpCode.JUMP), int(OpCode.JUMP_IF_FALSE)
+        FOR_RANGE, FOR_NEXT, BIND_COUNTER = int(OpCode.FOR_RANGE), int(OpCode.FOR_NEXT), int(OpCode.BIND_COUNTER)
+        RENEW_SCOPE, BIND_NUMBER = int(OpCode.RENEW_SCOPE), int(OpCode.BIND_NUMBER)
+        OBJECT, ARRAY, STRING = ValueType.Object, ValueType.Array, ValueType.String
+        max_depth = self.max_depth
+        governor = self.governor
+
+        if(governor is not None) :
+            governor.charge(code.fuel, code.allocations)
+
+        # hot loop : everything the dispatch needs lives in locals
+        instructions = frame.code.code
+        consts = frame.code.consts
+        names = frame.code.names
+        stack = frame.stack
+        env = frame.env
+        pc = 0
+
+        while(True) :
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if(op == LOAD_CONST) :
+                stack.append(consts[arg])
+
+            elif(op == LOAD_NAME) :
+                stack.append(env.lookup_var(names[arg]))
+
+            elif(op == BINARY_OP) :
+                right = stack.pop()
+                left = stack.pop()
+
+                if(isinstance(left, NumberVal) and isinstance(right, NumberVal)) :
+                    if(arg == 0) :
+                        res = left.value + right.value
+                    elif(arg == 1) :
+                        res = left.value - right.value
+                    elif(arg == 2) :
+                        res = left.value * right.value
+                    elif(arg == 3) :
+                        if(right.value == 0) :
+                            raise DivisionByZeroError('Division by 0')
+                        res = left.value / right.value
+                    else :
+                        if(right.value == 0) :
+                            raise DivisionByZeroError('Division by 0')
+                        res = left.value % right.value
+
+                    stack.append(make_number(res))
+                elif(left.type is STRING or right.type is STRING) :
+                    stack.append(string_binary(BINARY_OPERATORS[arg], left, right))
+                elif(left.type is ARRAY or right.type is ARRAY) :
+                    stack.append(elementwise(BINARY_OPERATORS[arg], left, right))
+                else :
+                    stack.append(make_null())
+
+            elif(op == GET_PROPERTY) :
+                obj = stack[-1]
+
+                # reading a property of something that is not an object
+                # gives back that value unchanged
+                if(obj.type is OBJECT) :
+                    (key, cache) = consts[arg]
+                    if(obj.shape is cache.shape) :
+                        stack[-1] = obj.values[cache.slot]
+                    else :
+                        stack[-1] = cache.get(obj, key)
+                elif(obj.type is ARRAY) :
+                    stack[-1] = array_property(obj, consts[arg][0])
+
+            elif(op == GET_COMPUTED) :
+                (cache, node) = consts[arg]
+                index = stack.pop()
+                obj = stack[-1]
+
+                # arrays are indexed by the number itself, not by a key
+                if(obj.type is ARRAY) :
+                    stack[-1] = array_index(obj, index, node)
+                    continue
+
+                key = property_key(index)
+                if(key is None) :
+                    raise PropertyError(f'Invalid computed property in member expression : {node.to_dict()}')
+
+                if(obj.type == ValueType.Object) :
+                    stack[-1] = cache.get(obj, key)
+
+            elif(op == GET_SLICE) :
+                (has_start, has_end, node) = consts[arg]
+                end = stack.pop() if has_end else None
+                start = stack.pop() if has_start else None
+                stack[-1] = array_slice(stack[-1], start, end, node)
+
+            elif(op == POP) :
+                stack.pop()
+
+            elif(op == FOR_NEXT) :
+                value = next(stack[-1], None)
+                if(value is None) :
+                    stack.pop()
+                    pc = arg
+                else :
+                    stack.append(value)
+
+            elif(op == RESET_SCOPE) :
+                if(env.variables) :
+                    env.variables.clear()
+                    env.constants.clear()
+
+            elif(op == BIND_COUNTER) :
+                name = names[arg]
+                env.variables[name] = make_number(stack.pop())
+                env.constants.add(name)
+
+            elif(op == BIND_NUMBER) :
+                name = names[arg]
+                env.variables[name] = stack.pop()
+                env.constants.add(name)
+
+            elif(op == RENEW_SCOPE) :
+                # functions declared in the last iteration keep its scope
+                if(env.variables) :
+                    env = Environment(parent=env.parent)
+                    frame.env = env
+
+            elif(op == JUMP) :
+                if(governor is not None and arg < pc) :
+                    # back to the top of a loop : one more iteration
+                    (fuel, allocations) = frame.code.loops[pc - 2]
+                    governor.charge(fuel, allocations)
+                pc = arg
+
+            elif(op == JUMP_IF_FALSE) :
+                if(not truthy(stack.pop())) :
+                    pc = arg
+
+            elif(op == FOR_RANGE) :
+                (start_node, end_node, shared) = consts[arg]
+                end = stack.pop()
+                start = range_bound(stack.pop(), start_node)
+                end = range_bound(end, end_node)
+                stack.append(numbers(start, end) if shared else counter(start, end))
+
+            elif(op == ENTER_SCOPE) :
+                # the frame keeps the env, for calls that return to it
+                env = Environment(parent=env)
+                frame.env = env
+
+            elif(op == EXIT_SCOPE) :
+                env = env.parent
+                frame.env = env
+
+            elif(op == STORE_NAME) :
+                env.assign_var(names[arg], stack[-1])
+
+            elif(op == DECLARE_LET) :
+                stack.append(env.decl_var(names[arg], stack.pop(), False))
+
+            elif(op == DECLARE_CONST) :
+                stack.append(env.decl_var(names[arg], stack.pop(), True))
+
+            elif(op == BUILD_OBJECT) :
+                (keys, shape) = consts[arg]
+                values = stack[len(stack) - len(keys):]
+                del stack[len(stack) - len(keys):]
+
+                if(shape is not None) :
+                    res = ObjectVal.with_shape(shape, values)
+                else :
+                    res = ObjectVal()
+                    for (key, value) in zip(keys, values) :
+                        res.set(key, value)
+
+                stack.append(res)
+
+            elif(op == BUILD_ARRAY) :
+                values = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                stack.append(make_array(values))
+
+            elif(op == MAKE_FUNCTION) :
+                fn_code = cast(FunctionCode, consts[arg])
+                stack.append(FunctionVal(
+                    name=fn_code.name,
+                    parameters=fn_code.parameters,
+                    body=fn_code.decl.body,
+                    decl_env=env,
+                    code=fn_code.code
+                ))
+
+            elif(op == CALL or op == TAIL_CALL) :
+                func = stack.pop()
+                args = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+
+                if(func.type == ValueType.NativeFunction) :
+                    # natives return straight away. in tail position the
+                    # RETURN that follows hands the result to the caller
+                    stack.append(func.callback(args, env))
+
+                elif(func.type == ValueType.Function) :
+                    fn = cast(FunctionVal, func)
+                    scope = Environment(parent=fn.decl_env)
+
+                    if(len(fn.parameters) != len(args)) :
+                        raise CallError(f'{fn.name} expects {len(fn.parameters)} arguments, got {len(args)}')
+
+                    for i in range(len(fn.parameters)) :
+                        scope.decl_var(fn.parameters[i], args[i], False)
+
+                    if(governor is not None) :
+                        # the callee's instructions and allocations, plus its scope
+                        governor.fuel -= fn.code.fuel
+                        governor.allocations += fn.code.allocations + 1
+                        if(governor.fuel <= governor.next_check or governor.allocations > governor.max_allocations) :
+                            governor.check()
+
+                        if(op != TAIL_CALL) :
+                            governor.depth += 1
+                            if(governor.depth > governor.max_depth) :
+                                governor.depth_error(fn.name)
+
+                    if(op == TAIL_CALL) :
+                        # nothing is left to run in the current frame (and its
+                        # stack is empty), so the callee takes it over
+                        frame.code = fn.code
+                        frame.env = scope
+                    else :
+                        if(len(frames) >= max_depth) :
+                            raise CallDepthError(f'Maximum call depth of {max_depth} exceeded while calling {fn.name}')
+
+                        # suspend the caller and switch to the callee
+                        frame.pc = pc
+                        frames.append(frame)
+
+                        frame = Frame(fn.code, scope)
+
+                    instructions = frame.code.code
+                    consts = frame.code.consts
+                    names = frame.code.names
+                    stack = frame.stack
+                    env = scope
+                    pc = 0
+
+                else :
+                    raise CallError(f'Cannot call value that is not a function : {func}')
+
+            elif(op == RETURN) :
+                result = stack.pop()
+
+                if(len(frames) == 0) :
+                    return result
+
+                if(governor is not None) :
+                    governor.depth -= 1
+
+                # resume the caller with the result on its stack
+                frame = frames.pop()
+                instructions = frame.code.code
+                consts = frame.code.consts
+                names = frame.code.names
+                stack = frame.stack
+                env = frame.env
+                pc = frame.pc
+
+                stack.append(result)
+
+            elif(op == FAIL) :
+                (error, message) = consts[arg]
+                raise error(message)
+
+            else :
+                raise InterpreterError(f'Unknown opcode {op} in {frame.code.name}')
@@ -0,0 +1,69 @@
+'''
+
+    - every error NanoScript reports is raised as one of these, so that a
+      host embedding the engine can catch them and carry on (the REPL just
+      prints them)
+    - str(error) is the message the REPL shows, prefixed with the stage
+      that failed, eg. [PARSER ERROR] : ...
+
+'''
+
+class NanoScriptError(Exception) :
+
+    prefix = '[NANOSCRIPT ERROR]'
+
+    def __init__(self, message : str) -> None:
+        super().__init__(message)
+        self.message = message
+
+    def __str__(self) -> str :
+        return f'{self.prefix} : {self.message}' if self.prefix else self.message
+
+class LexerError(NanoScriptError) :
+    prefix = '[LEXER ERROR]'
+
+class ParserError(NanoScriptError) :
+    prefix = '[PARSER ERROR]'
+
+class OptimizerError(NanoScriptError) :
+    prefix = '[OPTIMIZER ERROR]'
+
+class ScopeError(NanoScriptError) :
+    # variable that does not exist, is declared twice or is a constant that
+    # is re-assigned. reported by the Environment at run time, or by the
+    # resolver before running
+    prefix = ''
+
+class InterpreterError(NanoScriptError) :
+    prefix = '[INTERPRETER ERROR]'
+
+class DivisionByZeroError(InterpreterError) :
+    pass
+
+class CallError(InterpreterError) :
+    # calling something that is not a function, or with the wrong number of arguments
+    pass
+
+class PropertyError(InterpreterError) :
+    # invalid member expression, or a property the object does not have
+    pass
+
+class CallDepthError(InterpreterError) :
+    pass
+
+class LoopError(InterpreterError) :
+    # a bound of a for loop that is not a number
+    pass
+
+class BudgetExceededError(InterpreterError) :
+    # a script went over one of the limits of its Budget (runtime/governor.py)
+    pass
+
+class FuelExhaustedError(BudgetExceededError) :
+    pass
+
+class DeadlineExceededError(BudgetExceededError) :
+    pass
+
+class AllocationLimitError(BudgetExceededError) :
+    pass